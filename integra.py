@@ -2,6 +2,8 @@
 """
 integra App - macOS Launcher
 uses Homebrew Python 3.11 which provides stable Qt6 support on macOS
+
+    python integra.py stats      # headless subcommands, see src/cli.py
 """
 
 import os
@@ -19,7 +21,13 @@ os.environ["PYTHONPATH"] = str(src_dir)
 # change to app directory
 os.chdir(app_dir)
 
-# import and run
+# import and run, subcommands go to the headless cli without loading qt
 if __name__ == "__main__":
+    from utils import self_replace
+    if self_replace.is_apply_invocation(sys.argv[1:]):
+        sys.exit(self_replace.main(sys.argv[1:]))
+    import cli
+    if cli.is_cli_invocation(sys.argv[1:]):
+        sys.exit(cli.main(sys.argv[1:]))
     from main import main
     main()
\ No newline at end of file
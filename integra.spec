@@ -1,29 +1,55 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+import subprocess
+import sys
+
 block_cipher = None
 
+# compile icons and svgs into the resources_rc module so the frozen app
+# reads them from memory instead of probing the extraction folder
+subprocess.check_call([sys.executable, 'tools/build_resources.py'])
+
 a = Analysis(
     ['src/main.py'],
     pathex=['src'],
     binaries=[],
-    datas=[
-        ('src/assets/*', 'assets'),
-        ('src/utils/*.svg', 'utils'),
-    ],
+    datas=[],
     hiddenimports=[
+        'resources_rc',
         'models',
         'models.database',
         'models.client',
+        'models.client_store',
+        'models.instrumentation',
         'ui',
         'ui.main_window',
         'ui.client_list_view',
+        'ui.progressive_loader',
         'ui.client_form_dialog',
         'ui.about_dialog',
+        'ui.bulk_edit_dialog',
+        'ui.filter_builder_dialog',
+        'ui.diagnostics_dialog',
         'ui.simple_update_dialog',
+        'services',
+        'services.client_service',
+        'services.filters',
+        'services.write_queue',
         'controllers',
         'controllers.client_controller',
         'utils',
+        'utils.assets',
+        'utils.delta',
+        'utils.diagnostics',
+        'utils.download',
+        'utils.progress',
         'utils.simple_updater',
+        'utils.update_archive',
+        'utils.self_replace',
+        'utils.update_staging',
+        'utils.tracing',
+        'utils.update_state',
+        'utils.watchdog',
         'utils.version',
     ],
     hookspath=[],
@@ -0,0 +1 @@
+# performance benchmarks, run from the src folder with python -m benchmarks.<name>
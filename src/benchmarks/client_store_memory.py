@@ -0,0 +1,100 @@
+# memory benchmark: ClientStore vs the old name-keyed dict of ORM objects
+#
+#     python -m benchmarks.client_store_memory [--clients 100000]
+
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from typing import Callable, List, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from models.base import Base
+from models.client import Client
+from models.client_store import ClientStore
+
+
+def _make_session(count: int) -> Session:
+    # in-memory database with `count` clients
+    engine = create_engine("sqlite://", poolclass=StaticPool, future=True)
+    Base.metadata.create_all(engine)
+    rows = [
+        {
+            "first_name": f"Nombre{i % 500}",
+            "last_name": f"Apellido{i}",
+            "phone": f"6{i:08d}",
+            "email": f"cliente{i}@example.com",
+            "occupation": "Fisioterapeuta",
+            "sports": "Correr",
+            "background": "Sin antecedentes relevantes",
+            "observations": "Revisión en tres semanas",
+        }
+        for i in range(count)
+    ]
+    with Session(engine) as session:
+        session.execute(insert(Client), rows)
+        session.commit()
+    return Session(engine, expire_on_commit=False)
+
+
+def _measure(build: Callable[[], object]) -> tuple[object, int]:
+    # bytes still allocated by the structure `build` returns
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def run(count: int) -> dict:
+    session = _make_session(count)
+
+    def build_dict() -> dict:
+        # previous approach: ORM objects keyed by display name
+        data_map = {}
+        for client in session.query(Client).all():
+            data_map[f"{client.first_name} {client.last_name}"] = client
+        return data_map
+
+    def build_store() -> ClientStore:
+        store = ClientStore()
+        for client_id, first_name, last_name in session.query(Client.id, Client.first_name, Client.last_name):
+            store.append(client_id, first_name, last_name)
+        return store
+
+    data_map, dict_bytes = _measure(build_dict)
+    del data_map
+    session.expunge_all()
+    store, store_bytes = _measure(build_store)
+    session.close()
+
+    return {
+        "clients": count,
+        "dict_of_orm_bytes": dict_bytes,
+        "client_store_bytes": store_bytes,
+        "ratio": dict_bytes / store_bytes if store_bytes else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Memoria de ClientStore frente al dict de objetos ORM")
+    parser.add_argument("--clients", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    result = run(args.clients)
+    print(f"clientes:          {result['clients']}")
+    print(f"dict de ORM:       {result['dict_of_orm_bytes'] / 1_048_576:8.1f} MB")
+    print(f"ClientStore:       {result['client_store_bytes'] / 1_048_576:8.1f} MB")
+    print(f"reduccion:         {result['ratio']:8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# deterministic generator of realistic spanish client datasets
+#
+#     python -m benchmarks.datagen 10k --output /tmp/integra_10k.db
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+
+from models.base import Base
+from models.client import Client
+
+# dataset sizes accepted on the command line
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+FIRST_NAMES = [
+    "María", "José", "Antonio", "Carmen", "Lucía", "Sofía", "Martín", "Hugo", "Álvaro", "Jesús",
+    "Ángela", "Inés", "Raúl", "Iñigo", "Nuria", "Begoña", "Óscar", "Rocío", "Joaquín", "Marta",
+    "Pablo", "Elena", "Javier", "Ana", "David", "Laura", "Sergio", "Paula", "Adrián", "Irene",
+    "Julián", "Noemí", "Andrés", "Mónica", "Rubén", "Beatriz", "Víctor", "Almudena", "Ramón", "Lourdes",
+]
+LAST_NAMES = [
+    "García", "Fernández", "González", "Rodríguez", "López", "Martínez", "Sánchez", "Pérez", "Gómez",
+    "Martín", "Jiménez", "Ruiz", "Hernández", "Díaz", "Moreno", "Muñoz", "Álvarez", "Romero", "Alonso",
+    "Gutiérrez", "Navarro", "Torres", "Domínguez", "Vázquez", "Ramos", "Gil", "Ramírez", "Serrano",
+    "Blanco", "Molina", "Morales", "Suárez", "Ortega", "Delgado", "Castro", "Ortiz", "Rubio", "Marín",
+    "Sanz", "Núñez", "Iglesias", "Medina", "Garrido", "Cortés", "Castillo", "Santos", "Lozano", "Guerrero",
+    "Cano", "Prieto", "Méndez", "Cruz", "Calvo", "Gallego", "Vidal", "León", "Márquez", "Herrera",
+    "Peña", "Flores", "Cabrera", "Campos", "Vega", "Fuentes", "Carrasco", "Diez", "Caballero", "Reyes",
+    "Nieto", "Aguilar", "Pascual", "Santana", "Herrero", "Lorenzo", "Montero", "Hidalgo", "Giménez",
+    "Ibáñez", "Ferrer", "Durán", "Santiago", "Benítez", "Mora", "Vicente", "Vargas", "Arias", "Carmona",
+    "Crespo", "Román", "Pastor", "Soto", "Sáez", "Velasco", "Moya", "Soler", "Parra", "Esteban", "Bravo",
+    "Gallardo", "Rojas", "Echevarría", "Goñi", "Urrutia", "Zubizarreta",
+]
+OCCUPATIONS = [
+    "Enfermera", "Profesor de secundaria", "Administrativo", "Ingeniera de software", "Camarero",
+    "Fisioterapeuta", "Abogada", "Conductor de autobús", "Jubilado", "Estudiante", "Arquitecto",
+    "Dependienta", "Cocinero", "Médica de familia", "Electricista", "Diseñadora gráfica", "Autónomo",
+    "Policía local", "Bombero", "Peluquera",
+]
+SPORTS = [
+    "Running", "Pádel", "Fútbol", "Natación", "Ciclismo", "Yoga", "Pilates", "Crossfit", "Tenis",
+    "Baloncesto", "Senderismo", "Escalada", "Running y natación", "Gimnasio", "Trail running",
+]
+NOTE_SENTENCES = [
+    "Refiere dolor lumbar de tres semanas de evolución.",
+    "Contractura en trapecio derecho tras sesión de pádel.",
+    "Esguince de tobillo izquierdo grado I hace dos meses.",
+    "Molestias cervicales asociadas a trabajo de oficina.",
+    "Tendinopatía rotuliana, mejora con ejercicio excéntrico.",
+    "Cirugía de menisco en 2019, sin complicaciones.",
+    "Fascitis plantar bilateral, peor por las mañanas.",
+    "Se recomienda revisión en quince días.",
+    "Buena evolución, reducir frecuencia de sesiones.",
+    "Derivado por su médico de cabecera para valoración.",
+    "Cefaleas tensionales frecuentes, estrés laboral.",
+    "Hernia discal L5-S1 diagnosticada por resonancia.",
+    "Pendiente de pruebas de imagen, no forzar el hombro.",
+    "Practica deporte cuatro días por semana, carga alta.",
+]
+# probability that an optional field is left empty
+NULL_RATE = 0.15
+
+
+def _note(rng: random.Random, long: bool) -> str:
+    # clinical style free text, long notes get close to the 1000 character limit
+    count = rng.randint(8, 20) if long else rng.randint(1, 3)
+    text = " ".join(rng.choice(NOTE_SENTENCES) for _ in range(count))
+    return text[:1000]
+
+
+def generate(count: int, seed: int = 20250101) -> Iterator[Dict[str, object]]:
+    # yield `count` client rows, identical for the same seed
+    rng = random.Random(seed)
+    base_birth = date(1940, 1, 1)
+    for index in range(count):
+        first_name = rng.choice(FIRST_NAMES)
+        # compound surnames, small pools give many duplicate full names
+        last_name = f"{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+        def optional(value):
+            return None if rng.random() < NULL_RATE else value
+
+        # emails are unique in the schema, the index keeps them distinct
+        email_user = f"{first_name}.{last_name.split()[0]}".lower()
+        yield {
+            "first_name": first_name,
+            "last_name": last_name,
+            "phone": optional(f"6{rng.randint(0, 99_999_999):08d}"),
+            "email": optional(f"{email_user}.{index}@example.es"),
+            "birth_date": optional(base_birth + timedelta(days=rng.randint(0, 365 * 68))),
+            "occupation": optional(rng.choice(OCCUPATIONS)),
+            "therapy_price": optional(rng.choice((35, 40, 45, 50, 55, 60, 70))),
+            "sports": optional(rng.choice(SPORTS)),
+            "background": optional(_note(rng, long=rng.random() < 0.2)),
+            "observations": optional(_note(rng, long=rng.random() < 0.1)),
+        }
+
+
+def populate(engine: Engine, count: int, seed: int = 20250101, batch_size: int = 10_000) -> int:
+    # create the schema and insert `count` generated clients in batches
+    Base.metadata.create_all(engine)
+    batch: List[Dict[str, object]] = []
+    inserted = 0
+    with engine.begin() as conn:
+        for row in generate(count, seed):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.execute(insert(Client), batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Client), batch)
+            inserted += len(batch)
+    return inserted
+
+
+def parse_size(value: str) -> int:
+    # '10k' style preset or a plain number
+    return SIZES.get(value.lower()) or int(value)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Genera una base de datos de clientes sintetica")
+    parser.add_argument("size", help="1k, 10k, 100k, 1m o un numero")
+    parser.add_argument("--output", required=True, help="archivo .db de destino")
+    parser.add_argument("--seed", type=int, default=20250101)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(f"sqlite:///{args.output}", future=True)
+    inserted = populate(engine, parse_size(args.size), args.seed)
+    engine.dispose()
+    print(f"{inserted} clientes en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
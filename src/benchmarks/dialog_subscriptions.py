@@ -0,0 +1,154 @@
+# details dialog delete flow: handlers and memory over many dialogs
+#
+#     python -m benchmarks.dialog_subscriptions [--dialogs 1000]
+#
+# opens a ClientDetailsDialog per client and deletes through it, the way a
+# working day goes, then checks that the controller's signals have as many
+# receivers as at the start, that no per-request callbacks are left and that
+# memory stays flat. a second pass closes every dialog before its delete is
+# committed. exits with 1 when something accumulates
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QCoreApplication, QEvent
+from PyQt6.QtWidgets import QApplication, QMessageBox
+from sqlalchemy import create_engine
+
+from benchmarks import datagen
+from models import database
+from utils import tracing
+
+# memory that may still grow over the second half of the run (allocator noise)
+MEMORY_TOLERANCE = 256 * 1024
+
+
+def _receivers(controller) -> Dict[str, int]:
+    return {
+        name: controller.receivers(getattr(controller, name))
+        for name in ("client_deleted", "error_ocurred", "client_conflict")
+    }
+
+
+def _callbacks(controller) -> int:
+    # per-request callbacks still held, queued or taken over by a running write
+    held = [controller._write_callbacks, *controller._claimed_callbacks.values()]
+    return sum(len(waiting) for subscriptions in held for waiting in subscriptions.values())
+
+
+def _collect() -> None:
+    # run deleteLater and python's garbage collection
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+    QCoreApplication.processEvents()
+    gc.collect()
+
+
+def run(dialogs: int) -> dict:
+    from controllers.client_controller import ClientController
+    from ui.client_details_dialog import ClientDetailsDialog
+
+    workdir = Path(tempfile.mkdtemp(prefix="integra_bench_dialogs_"))
+    path = workdir / "dialogs.db"
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    datagen.populate(engine, dialogs * 2)
+    engine.dispose()
+    database.dispose_engine()
+    database.init_database(f"sqlite:///{path}")
+
+    app = QApplication.instance() or QApplication([])
+    # the trace buffer grows by design (up to its limit), it would hide leaks
+    tracing.TRACING_CONFIG["enabled"] = False
+    # nobody clicks the message boxes here
+    QMessageBox.question = staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.Yes)
+    QMessageBox.information = staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.Ok)
+    QMessageBox.critical = staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.Ok)
+
+    controller = ClientController()
+    controller.set_durability("immediate")
+    before = _receivers(controller)
+    results: dict = {"receivers_before": before}
+
+    # pass 1: delete through every dialog and wait for the result
+    memory: List[int] = []
+    timings: List[float] = []
+    tracemalloc.start()
+    for client_id in range(1, dialogs + 1):
+        client = controller.get_client(client_id)
+        dialog = ClientDetailsDialog(None, client, controller)
+        start = time.perf_counter()
+        dialog._confirm_delete_client()
+        controller.wait_idle()
+        app.processEvents()
+        timings.append((time.perf_counter() - start) * 1000.0)
+        dialog.close()
+        dialog.deleteLater()
+        _collect()
+        if client_id == dialogs // 2 or client_id == dialogs:
+            memory.append(tracemalloc.get_traced_memory()[0])
+
+    results["receivers_after"] = _receivers(controller)
+    results["callbacks_left"] = _callbacks(controller)
+    results["memory_growth"] = memory[-1] - memory[0]
+    tenth = max(dialogs // 10, 1)
+    results["first_ms"] = sum(timings[:tenth]) / tenth
+    results["last_ms"] = sum(timings[-tenth:]) / tenth
+
+    # pass 2: the dialog is gone before the delete is committed
+    controller.set_durability("grouped")
+    for client_id in range(dialogs + 1, dialogs * 2 + 1):
+        dialog = ClientDetailsDialog(None, controller.get_client(client_id), controller)
+        dialog._confirm_delete_client()
+        dialog.deleteLater()
+        _collect()
+    results["callbacks_pending_closed"] = _callbacks(controller)
+    controller.commit_pending()
+    results["receivers_closed"] = _receivers(controller)
+    tracemalloc.stop()
+
+    controller.shutdown()
+    database.dispose_engine()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Dialogo de detalles: manejadores y memoria al eliminar")
+    parser.add_argument("--dialogs", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    results = run(args.dialogs)
+    before = results["receivers_before"]
+    print(f"receptores al empezar:             {before}")
+    print(f"receptores tras {args.dialogs} dialogos:       {results['receivers_after']}")
+    print(f"receptores con dialogos cerrados:  {results['receivers_closed']}")
+    print(f"callbacks pendientes:              {results['callbacks_left']} (cerrados antes: {results['callbacks_pending_closed']})")
+    print(f"memoria en la segunda mitad:       {results['memory_growth'] / 1024:+.1f} KB")
+    print(f"eliminar, primeros / ultimos:      {results['first_ms']:.2f} ms / {results['last_ms']:.2f} ms")
+
+    leaked = (
+        results["receivers_after"] != before
+        or results["receivers_closed"] != before
+        or results["callbacks_left"]
+        or results["callbacks_pending_closed"]
+        or results["memory_growth"] > MEMORY_TOLERANCE
+    )
+    if leaked:
+        print("ACUMULACION detectada")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# update download benchmark: one stream vs parallel byte ranges
+#
+#     python -m benchmarks.download [--size-mb 16] [--rate-kb 1024] [--latency-ms 150]
+#
+# the local server throttles every connection and delays each response, the
+# way a distant server and per-connection limits behave on a clinic line
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.update_server import UpdateServer
+from utils.download import download
+
+
+def run(size: int, rate: float, latency: float, connections: List[int]) -> Dict[int, float]:
+    # seconds to download `size` bytes for each number of connections
+    payload = os.urandom(size)
+    workdir = Path(tempfile.mkdtemp(prefix="integra_bench_download_"))
+    results = {}
+    try:
+        with UpdateServer(payload, rate=rate, latency=latency, block_size=64 * 1024) as server:
+            for count in connections:
+                target = workdir / f"update_{count}.zip"
+                start = time.perf_counter()
+                download(server.url, target, expected_sha256=server.sha256, connections=count)
+                results[count] = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Descarga de actualizaciones: una conexion frente a varias")
+    parser.add_argument("--size-mb", type=float, default=16)
+    parser.add_argument("--rate-kb", type=float, default=1024, help="KB/s por conexion")
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--connections", default="1,2,4,8")
+    args = parser.parse_args(argv)
+
+    connections = [int(count) for count in args.connections.split(",") if count]
+    results = run(int(args.size_mb * 1_048_576), args.rate_kb * 1024, args.latency_ms / 1000.0, connections)
+    single = results.get(1)
+    for count, seconds in results.items():
+        speed = args.size_mb / seconds
+        ratio = f"   {single / seconds:5.1f}x" if single else ""
+        print(f"{count:>2} conexiones   {seconds:7.2f} s   {speed:6.2f} MB/s{ratio}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
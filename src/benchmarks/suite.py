@@ -0,0 +1,245 @@
+# benchmark suite for the service, search and list paths
+#
+#     python -m benchmarks.suite --sizes 1k,10k              # compare with baseline.json
+#     python -m benchmarks.suite --sizes 1k,10k --save-baseline
+#
+# runs headless (QT_QPA_PLATFORM=offscreen) against generated databases,
+# with --no-ui PyQt6 is never imported
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from sqlalchemy import create_engine
+
+from benchmarks import datagen
+from models import database
+from models.client import Client
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+# slower than baseline by more than this fraction counts as a regression
+REGRESSION_TOLERANCE = 0.25
+# searches covering a common surname, accents, an email fragment and no match
+SEARCH_TERMS = ("García", "Núñez", "maría", "example", "zzzz")
+
+
+def _measure(func: Callable[[], object], repeat: int) -> float:
+    # median wall time in ms over `repeat` runs
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples)
+
+
+def _prepare_database(directory: str, count: int) -> Path:
+    # generated dataset, reused between runs of the same size
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    path = Path(directory) / f"bench_{count}.db"
+    if not path.exists():
+        engine = create_engine(f"sqlite:///{path}", future=True)
+        datagen.populate(engine, count)
+        engine.dispose()
+    database.dispose_engine()
+    database.init_database(f"sqlite:///{path}")
+    return path
+
+
+def bench_service(count: int, repeat: int, workdir: str) -> Dict[str, float]:
+    # crud, search, export and backup through the qt-free ClientService
+    from services.client_service import ClientService
+
+    service = ClientService()
+    added: List[int] = []
+
+    results = {"load_all_clients": _measure(service.list_all, repeat)}
+    for term in SEARCH_TERMS:
+        results[f"search_clients[{term}]"] = _measure(lambda: service.search(term), repeat)
+
+    counter = iter(range(10 ** 9))
+    results["add_client"] = _measure(
+        lambda: added.append(service.add("Bench", f"Cliente {next(counter)}", therapy_price=45.0,
+                                         background=datagen.NOTE_SENTENCES[0]).id),
+        repeat
+    )
+    target = added[0]
+    results["update_client"] = _measure(
+        lambda: service.update(target, first_name="Bench", last_name=f"Editado {next(counter)}", sports="Yoga"),
+        repeat
+    )
+    results["delete_client"] = _measure(lambda: service.delete(added.pop()), min(repeat, len(added)))
+
+    # 100 phone edits: one transaction per edit vs one write-behind group commit
+    from services.write_queue import WriteBehindQueue, apply_batch
+
+    edit_ids = sorted(service.get_many(range(1, 101)))
+
+    def single_commits() -> None:
+        for client_id in edit_ids:
+            service.update(client_id, phone=f"6{next(counter):08d}")
+
+    def group_commit() -> None:
+        queue = WriteBehindQueue()
+        for client_id in edit_ids:
+            queue.update(client_id, {"phone": f"6{next(counter):08d}"})
+        apply_batch(service, queue.drain())
+
+    results["update_100_single_commits"] = _measure(single_commits, repeat)
+    results["update_100_group_commit"] = _measure(group_commit, repeat)
+
+    export_path = os.path.join(workdir, "export.csv")
+    results["export_clients"] = _measure(lambda: service.export_csv(export_path), repeat)
+    backup_path = os.path.join(workdir, "backup.db")
+    results["backup_database"] = _measure(lambda: service.backup(backup_path), repeat)
+
+    # remove the remaining benchmark rows so the dataset stays reusable
+    for client_id in added:
+        service.delete(client_id)
+    return results
+
+
+def bench_ui(count: int, repeat: int) -> Dict[str, float]:
+    # headless list population and dialog open timings
+    from PyQt6.QtCore import QEventLoop
+    from PyQt6.QtWidgets import QApplication
+
+    from ui.about_dialog import AboutDialog
+    from ui.client_details_dialog import ClientDetailsDialog
+    from ui.client_form_dialog import ClientFormDialog
+    from ui.client_list_view import ClientListView
+
+    app = QApplication.instance() or QApplication([])
+    with database.session_scope() as session:
+        clients = session.query(Client).all()
+    sample = clients[len(clients) // 2]
+
+    view = ClientListView()
+    view.resize(900, 600)
+    view.show()
+    app.processEvents()
+
+    first_screen: List[float] = []
+    total: List[float] = []
+    for _ in range(repeat):
+        loop = QEventLoop()
+        view.loader.finished.connect(loop.quit)
+        start = time.perf_counter()
+        view.populate_clients(clients)
+        first_screen.append((time.perf_counter() - start) * 1000.0)
+        if view.loader.is_loading():
+            loop.exec()
+        total.append((time.perf_counter() - start) * 1000.0)
+        view.loader.finished.disconnect(loop.quit)
+
+    def open_dialog(factory: Callable[[], object]) -> None:
+        dialog = factory()
+        dialog.show()
+        app.processEvents()
+        dialog.close()
+        dialog.deleteLater()
+
+    results = {
+        "list_first_screen": statistics.median(first_screen),
+        "list_populate_total": statistics.median(total),
+        "list_rows_per_second": view.loader.rows_per_second,
+        "open_details_dialog": _measure(lambda: open_dialog(lambda: ClientDetailsDialog(None, sample, None)), repeat),
+        "open_edit_dialog": _measure(lambda: open_dialog(lambda: ClientFormDialog(None, sample)), repeat),
+        "open_about_dialog": _measure(lambda: open_dialog(lambda: AboutDialog()), repeat),
+    }
+    view.close()
+    view.deleteLater()
+    app.processEvents()
+    return results
+
+
+def run(sizes: List[int], repeat: int, include_ui: bool = True, workdir: Optional[str] = None) -> dict:
+    workdir = workdir or tempfile.mkdtemp(prefix="integra_bench_")
+    results: Dict[str, float] = {}
+    for count in sizes:
+        _prepare_database(workdir, count)
+        label = next((name for name, value in datagen.SIZES.items() if value == count), str(count))
+        for name, value in bench_service(count, repeat, workdir).items():
+            results[f"{label}/{name}"] = value
+        if include_ui:
+            for name, value in bench_ui(count, repeat).items():
+                results[f"{label}/{name}"] = value
+    database.dispose_engine()
+    return {
+        "machine": platform.platform(),
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = REGRESSION_TOLERANCE) -> List[dict]:
+    # per-metric change against the baseline (throughput metrics are inverted)
+    rows = []
+    for name, value in sorted(current["results"].items()):
+        before = baseline.get("results", {}).get(name)
+        if before in (None, 0):
+            rows.append({"name": name, "value": value, "baseline": None, "change": None, "regression": False})
+            continue
+        change = (value - before) / before
+        if name.endswith("per_second"):
+            change = -change  # higher is better
+        rows.append({"name": name, "value": value, "baseline": before, "change": change,
+                     "regression": change > tolerance})
+    return rows
+
+
+def _print_report(rows: List[dict]) -> None:
+    for row in rows:
+        if row["baseline"] is None:
+            print(f"{row['name']:<42} {row['value']:10.2f}   (sin referencia)")
+        else:
+            flag = "  REGRESION" if row["regression"] else ""
+            print(f"{row['name']:<42} {row['value']:10.2f}   ref {row['baseline']:10.2f}   {row['change']:+7.1%}{flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de Integra (servicio, busqueda y lista)")
+    parser.add_argument("--sizes", default="1k,10k", help="tamaños separados por comas: 1k,10k,100k,1m")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-ui", action="store_true", help="omitir las pruebas de la interfaz")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--workdir", help="carpeta para reutilizar las bases de datos generadas")
+    args = parser.parse_args(argv)
+
+    sizes = [datagen.parse_size(size) for size in args.sizes.split(",") if size]
+    current = run(sizes, args.repeat, include_ui=not args.no_ui, workdir=args.workdir)
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    rows = compare(current, baseline)
+    _print_report(rows)
+
+    if args.save_baseline:
+        merged = dict(baseline)
+        merged.update({key: value for key, value in current.items() if key != "results"})
+        merged["results"] = {**baseline.get("results", {}), **current["results"]}
+        args.baseline.write_text(json.dumps(merged, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"referencia guardada en {args.baseline}")
+
+    if args.fail_on_regression and any(row["regression"] for row in rows):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+# local stand-in for the release download server
+#
+#     with UpdateServer(payload, drop_after=256 * 1024) as server:
+#         download(server.url, Path("update.zip"), expected_sha256=server.sha256)
+#
+# serves one payload with Range/If-Range support, can drop connections after a
+# number of bytes, throttle the transfer rate per connection and delay every
+# response to stand in for a high latency link
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self._serve(body=False)
+
+    def do_GET(self) -> None:
+        self._serve(body=True)
+
+    def _serve(self, body: bool) -> None:
+        owner: UpdateServer = self.server.owner
+        payload = owner.payload
+        start, end = 0, len(payload) - 1
+        status = 200
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and owner.ranges and (if_range is None or if_range == owner.etag):
+            first, _, last = range_header.replace("bytes=", "").partition("-")
+            start = int(first) if first else 0
+            end = min(int(last), end) if last else end
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(payload)}")
+                self.end_headers()
+                return
+            status = 206
+
+        if owner.latency:
+            time.sleep(owner.latency)
+        with owner.lock:
+            owner.requests += 1
+            drop = owner.drops_left > 0
+            if drop:
+                owner.drops_left -= 1
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", owner.etag)
+        if owner.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+        self.end_headers()
+        if not body:
+            return
+
+        sent = 0
+        position = start
+        began = time.perf_counter()
+        while position <= end:
+            block = payload[position:min(position + owner.block_size, end + 1)]
+            if drop and sent + len(block) > owner.drop_after:
+                # simulate a dropped connection part way through the body
+                self.wfile.write(block[:max(owner.drop_after - sent, 0)])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self.wfile.write(block)
+            sent += len(block)
+            position += len(block)
+            if owner.rate:
+                # sleep until this connection is back under its byte rate
+                delay = sent / owner.rate - (time.perf_counter() - began)
+                if delay > 0:
+                    time.sleep(delay)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    owner: "UpdateServer"
+
+    def handle_error(self, request, client_address) -> None:
+        # clients hanging up mid-transfer are part of the tests
+        pass
+
+
+class UpdateServer(object):
+
+    def __init__(
+        self,
+        payload: bytes,
+        drop_after: int = 0,
+        drops: int = 1,
+        rate: Optional[float] = None,
+        ranges: bool = True,
+        block_size: int = 16 * 1024,
+        latency: float = 0.0,
+    ) -> None:
+        self.payload = payload
+        self.sha256 = hashlib.sha256(payload).hexdigest()
+        self.etag = f'"{self.sha256[:16]}"'
+        # bytes sent before dropping a connection, for the first `drops` requests
+        self.drop_after = drop_after
+        self.drops_left = drops if drop_after else 0
+        # bytes per second per connection, None for unlimited
+        self.rate = rate
+        # False makes the server ignore Range like a plain static host
+        self.ranges = ranges
+        self.block_size = block_size
+        # seconds before each response starts
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.owner = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="update-server", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/integra_update.zip"
+
+    def start(self) -> "UpdateServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "UpdateServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,160 @@
+# headless command line for batch jobs, never imports PyQt6
+#
+#     python integra.py search garcia
+#     python integra.py export clientes.csv --db /ruta/database.db
+#     python integra.py stats --json
+#     python integra.py filter '{"field": "birth_month", "op": "eq", "value": 3}'
+#
+# the gui stays the default when no subcommand is given
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+COMMANDS = ("search", "filter", "export", "import", "backup", "stats", "vacuum", "bench")
+
+
+def _service(args: argparse.Namespace):
+    from models.database import init_database
+    from services.client_service import ClientService
+
+    init_database(f"sqlite:///{args.db}" if args.db else None)
+    return ClientService()
+
+
+def _output(args: argparse.Namespace, data: object, text: str) -> None:
+    if args.json:
+        print(json.dumps(data, indent=2, ensure_ascii=False, default=str))
+    else:
+        print(text)
+
+
+def _print_clients(args: argparse.Namespace, clients) -> None:
+    rows = [
+        {"id": c.id, "first_name": c.first_name, "last_name": c.last_name, "email": c.email, "phone": c.phone}
+        for c in clients
+    ]
+    text = "\n".join(
+        f"{row['id']:>7}  {row['first_name']} {row['last_name']}  {row['email'] or ''}" for row in rows
+    )
+    _output(args, rows, text or "Sin resultados")
+
+
+def cmd_search(args: argparse.Namespace) -> int:
+    _print_clients(args, _service(args).search(args.query))
+    return 0
+
+
+def cmd_filter(args: argparse.Namespace) -> int:
+    from services.filters import SavedFilters, from_dict
+
+    service = _service(args)
+    node = SavedFilters().get(args.filter)
+    if node is None:
+        try:
+            node = from_dict(json.loads(args.filter))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise ValueError(f"'{args.filter}' no es un filtro guardado ni JSON valido") from None
+    _print_clients(args, service.filter(node))
+    return 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    count = _service(args).export_csv(args.path)
+    _output(args, {"exported": count, "path": args.path}, f"{count} clientes exportados a {args.path}")
+    return 0
+
+
+def cmd_import(args: argparse.Namespace) -> int:
+    result = _service(args).import_csv(args.path)
+    _output(args, result._asdict(), f"{result.imported} clientes importados, {result.skipped} omitidos")
+    return 0
+
+
+def cmd_backup(args: argparse.Namespace) -> int:
+    _service(args).backup(args.path)
+    _output(args, {"backup": args.path}, f"Copia de seguridad creada en {args.path}")
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    stats = _service(args).stats()
+    text = "\n".join(f"{key:<16} {value}" for key, value in stats._asdict().items())
+    _output(args, stats._asdict(), text)
+    return 0
+
+
+def cmd_vacuum(args: argparse.Namespace) -> int:
+    result = _service(args).vacuum()
+    _output(args, result._asdict(), f"Base de datos compactada: {result.before_bytes} -> {result.after_bytes} bytes")
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    from benchmarks import suite
+
+    # the cli stays qt-free, so the interface benchmarks are left out
+    return suite.main(["--no-ui", *args.extra])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="integra", description="Integra sin interfaz grafica")
+    parser.add_argument("--db", help="archivo de base de datos (por defecto data/database.db)")
+    parser.add_argument("--json", action="store_true", help="salida en formato JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="buscar clientes por nombre, apellidos o email")
+    search.add_argument("query")
+    search.set_defaults(handler=cmd_search)
+
+    filter_ = commands.add_parser("filter", help="filtrar clientes con un filtro guardado o en JSON")
+    filter_.add_argument("filter", help="nombre de un filtro guardado o filtro en JSON")
+    filter_.set_defaults(handler=cmd_filter)
+
+    export = commands.add_parser("export", help="exportar todos los clientes a CSV")
+    export.add_argument("path")
+    export.set_defaults(handler=cmd_export)
+
+    import_ = commands.add_parser("import", help="importar clientes desde un CSV exportado")
+    import_.add_argument("path")
+    import_.set_defaults(handler=cmd_import)
+
+    backup = commands.add_parser("backup", help="copiar la base de datos")
+    backup.add_argument("path")
+    backup.set_defaults(handler=cmd_backup)
+
+    stats = commands.add_parser("stats", help="estadisticas de los clientes y de la base de datos")
+    stats.set_defaults(handler=cmd_stats)
+
+    vacuum = commands.add_parser("vacuum", help="compactar la base de datos")
+    vacuum.set_defaults(handler=cmd_vacuum)
+
+    bench = commands.add_parser("bench", help="benchmarks sin interfaz (opciones de benchmarks.suite)")
+    bench.set_defaults(handler=cmd_bench)
+    return parser
+
+
+def is_cli_invocation(argv: List[str]) -> bool:
+    # true when the arguments ask for a subcommand instead of the gui
+    return any(arg in COMMANDS for arg in argv) or any(arg in ("-h", "--help") for arg in argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    # everything after `bench` is handed to benchmarks.suite untouched
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command != "bench":
+        parser.error(f"argumentos no reconocidos: {' '.join(extra)}")
+    args.extra = extra
+    try:
+        return args.handler(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,17 +2,52 @@
 
 from __future__ import annotations
 
+import itertools
+import logging
 from datetime import date
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
-from PyQt6.QtCore import QObject, pyqtSignal as Signal
-from sqlalchemy.exc import SQLAlchemyError
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QObject, QThread, QTimer, pyqtSignal as Signal, pyqtSlot as Slot
 
+from models import database
 from models.client import Client
-from models.database import session_scope
+from services.client_service import EXPORT_HEADER, ClientService, ConcurrentModificationError
+from services.write_queue import DURABILITY_MODES, WRITE_QUEUE_CONFIG, FlushResult, WriteBehindQueue, apply_batch
+from utils import tracing
+
+logger = logging.getLogger(__name__)
+
+
+class _ServiceWorker(QObject):
+    # runs queued service calls on the database thread, one at a time and in order
+    finished = Signal(int, object)
+    failed = Signal(int, object)  # the exception
+
+    @Slot(int, object)
+    def run(self, ticket: int, call: Callable[[], object]) -> None:
+        tracing.name_thread(QThread.currentThread().objectName())
+        try:
+            result = call()
+        except Exception as e:
+            logger.debug("service call %s failed", ticket, exc_info=True)
+            self.failed.emit(ticket, e)
+            return
+        self.finished.emit(ticket, result)
+
+
+class WriteCallbacks(NamedTuple):
+    # result of one queued write, for whoever asked for it: unlike the
+    # controller's signals these reach only that caller, once, and are
+    # dropped with the owner passed along (e.g. a dialog closed meanwhile)
+    done: Optional[Callable[[object], None]] = None  # the updated client, or the deleted id
+    error: Optional[Callable[[str], None]] = None
+    conflict: Optional[Callable[[int, object, object], None]] = None  # as client_conflict
+
 
 class ClientController(QObject):
     # controller for client ooperations between ui and db
+    # thin async adapter: ClientService does the database work on a worker
+    # thread and the results come back to the gui thread as signals
     
     # signals to notify ui of changes
     clients_loaded = Signal(list)
@@ -20,21 +55,274 @@ class ClientController(QObject):
     client_updated = Signal(object)
     client_deleted = Signal(int)
     error_ocurred = Signal(str)
+    # someone else changed the client first: (client id, row as it is now,
+    # the rejected changes or None for a delete)
+    client_conflict = Signal(int, object, object)
+    # bulk operations: ids removed, rows changed and (done, total) progress,
+    # the latter emitted from the database thread and delivered queued
+    clients_deleted = Signal(list)
+    clients_updated = Signal(list)
+    bulk_progress = Signal(int, int)
+    # writes waiting in the write-behind queue (including the one being committed)
+    pending_writes_changed = Signal(int)
+    durability_changed = Signal(str)
+
+    # csv columns used by the export
+    EXPORT_HEADER = EXPORT_HEADER
+
+    _submit = Signal(int, object)
     
-    def __init__(self, parent: QObject | None = None) -> None:
+    def __init__(self, parent: QObject | None = None, service: ClientService | None = None) -> None:
         super().__init__(parent)
+        self.service = service or ClientService()
+        self._tickets = itertools.count(1)
+        # ticket -> (callback with the result, error message prefix, rejected changes)
+        self._pending: Dict[int, Tuple[Callable[[object], None], str, Optional[dict]]] = {}
+        # only the newest load or search may replace the list
+        self._latest_listing = 0
+        # (write kind, client id) -> callbacks of the requests waiting for a
+        # queued write; kinds are "update" and "delete", so an edit's result
+        # never reaches a dialog waiting for a delete of the same client
+        self._write_callbacks: Dict[Tuple[str, int], List[WriteCallbacks]] = {}
+        # ticket -> callbacks taken over by the call committing those writes,
+        # so later requests for the same clients wait for their own writes
+        self._claimed_callbacks: Dict[int, Dict[Tuple[str, int], List[WriteCallbacks]]] = {}
+        self._in_flight_callbacks: Dict[Tuple[str, int], List[WriteCallbacks]] = {}  # of the flush
+        # trace flows from the actions that queued writes to the flush committing them
+        self._flush_links: List[int] = []
+
+        # adds, edits and deletes wait here and are committed in groups
+        self.write_queue = WriteBehindQueue()
+        self._in_flight = 0  # writes of the batch being committed
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self.flush)
+        self.durability = "grouped"
+        self.set_durability(WRITE_QUEUE_CONFIG["mode"])
+
+        self._thread = QThread(self)
+        self._thread.setObjectName("integra-db")
+        self._worker = _ServiceWorker()
+        self._worker.moveToThread(self._thread)
+        self._thread.finished.connect(self._worker.deleteLater)
+        self._submit.connect(self._worker.run)
+        self._worker.finished.connect(self._on_finished)
+        self._worker.failed.connect(self._on_failed)
+        self._thread.start()
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def _run(self, call: Callable[[], object], on_done: Callable[[object], None], error_prefix: str,
+             changes: Optional[dict] = None) -> int:
+        # queue a service call, on_done receives its result on the gui thread
+        # both run in the trace of the action that made the call
+        ticket = next(self._tickets)
+        self._pending[ticket] = (tracing.bind(on_done, "result", "controller"), error_prefix, changes)
+        self._submit.emit(ticket, tracing.bind(call, "worker", "controller"))
+        return ticket
+
+    def _on_finished(self, ticket: int, result: object) -> None:
+        on_done, _, _ = self._pending.pop(ticket, (None, "", None))
+        if on_done is not None:
+            on_done(result)
+        self._claimed_callbacks.pop(ticket, None)
+
+    def _on_failed(self, ticket: int, error: Exception) -> None:
+        on_done, error_prefix, changes = self._pending.pop(ticket, (None, "Error", None))
+        if isinstance(error, ConcurrentModificationError):
+            self.client_conflict.emit(error.client_id, error.current, changes)
+        else:
+            self.error_ocurred.emit(f"{error_prefix}: {error}")
+        if getattr(on_done, "__wrapped__", on_done) == self._on_flushed:
+            self._in_flight = 0
+            self._in_flight_callbacks = {}
+        claimed = self._claimed_callbacks.pop(ticket, {})
+        for kind, client_id in list(claimed):
+            self._notify(claimed, kind, client_id, "error", f"{error_prefix}: {error}")
+
+    def _subscribe(self, kind: str, client_id: int, callbacks: Optional[WriteCallbacks],
+                   owner: Optional[QObject]) -> None:
+        # hold callbacks until the client's queued write of this kind reports back
+        if callbacks is None:
+            return
+        key = (kind, client_id)
+        self._write_callbacks.setdefault(key, []).append(callbacks)
+        if owner is not None:
+            owner.destroyed.connect(lambda: self._unsubscribe(key, callbacks))
+
+    def _unsubscribe(self, key: Tuple[str, int], callbacks: WriteCallbacks) -> None:
+        for subscriptions in (self._write_callbacks, *self._claimed_callbacks.values()):
+            waiting = subscriptions.get(key, [])
+            if callbacks in waiting:
+                waiting.remove(callbacks)
+            if not waiting:
+                subscriptions.pop(key, None)
+
+    def _claim(self, ticket: int, keys: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], List[WriteCallbacks]]:
+        # hand the callbacks of these queued writes to the call committing them
+        claimed = {key: self._write_callbacks.pop(key) for key in keys if key in self._write_callbacks}
+        self._claimed_callbacks[ticket] = claimed
+        return claimed
+
+    def _notify(self, subscriptions: Dict[Tuple[str, int], List[WriteCallbacks]], kind: str, client_id: int,
+                outcome: str, *args: object) -> None:
+        # hand a write result to the requests waiting for it, once
+        for callbacks in subscriptions.pop((kind, client_id), []):
+            callback = getattr(callbacks, outcome)
+            if callback is not None:
+                callback(*args)
+
+    def _run_listing(self, call: Callable[[], object], error_prefix: str) -> None:
+        # like _run for loads and searches, results of a superseded request are dropped
+        ticket = next(self._tickets)
+        self._latest_listing = ticket
+
+        def done(clients: object) -> None:
+            if ticket == self._latest_listing:
+                self.clients_loaded.emit(clients)
+
+        self._pending[ticket] = (tracing.bind(done, "result", "controller"), error_prefix, None)
+        self._submit.emit(ticket, tracing.bind(call, "worker", "controller"))
+
+    def is_busy(self) -> bool:
+        return bool(self._pending) or bool(self.write_queue)
+
+    def pending_writes(self) -> int:
+        return len(self.write_queue) + self._in_flight
+
+    def set_durability(self, mode: str) -> None:
+        # pick how often queued writes are committed, see DURABILITY_MODES
+        if mode not in DURABILITY_MODES:
+            logger.warning("unknown write mode %r, using grouped", mode)
+            mode = "grouped"
+        self.durability = mode
+        database.set_synchronous(DURABILITY_MODES[mode]["synchronous"])
+        self.durability_changed.emit(mode)
+        if not DURABILITY_MODES[mode]["grouped"]:
+            self.flush()
+
+    def _queue_changed(self) -> None:
+        # commit now or arm the flush timer, depending on the durability mode
+        flow_id = tracing.link()
+        if flow_id is not None:
+            self._flush_links.append(flow_id)
+        self.pending_writes_changed.emit(self.pending_writes())
+        if not DURABILITY_MODES[self.durability]["grouped"] \
+                or len(self.write_queue) >= WRITE_QUEUE_CONFIG["batch_size"]:
+            self.flush()
+        elif not self._flush_timer.isActive():
+            self._flush_timer.start(WRITE_QUEUE_CONFIG["flush_interval_ms"])
+
+    def flush(self) -> None:
+        # commit the queued writes in one transaction on the database thread
+        # only one batch is committed at a time, the next waits for its result
+        if self._in_flight or not self.write_queue:
+            return
+        self._flush_timer.stop()
+        batch = self.write_queue.drain()
+        self._in_flight = len(batch)
+        links, self._flush_links = self._flush_links, []
+
+        def commit() -> FlushResult:
+            for flow_id in links:
+                tracing.follow(flow_id)
+            return apply_batch(self.service, batch)
+
+        # a timer flush is not part of an action: its worker and result share this trace
+        with tracing.span("flush", "controller", writes=len(batch)):
+            ticket = self._run(commit, self._on_flushed, "No se han podido guardar los cambios")
+        self._in_flight_callbacks = self._claim(
+            ticket,
+            [("update", client_id) for client_id in batch.updates]
+            + [("delete", client_id) for client_id in batch.deletes]
+        )
+
+    def commit_pending(self, timeout_ms: int = 30000) -> bool:
+        # commit every queued write now, processing events until it is done
+        while self.write_queue or self._in_flight:
+            self.flush()
+            if not self.wait_idle(timeout_ms):
+                return False
+        return True
+
+    def _on_flushed(self, result: FlushResult) -> None:
+        self._in_flight = 0
+        claimed, self._in_flight_callbacks = self._in_flight_callbacks, {}
+        # a batch writes each client once, as an update or as a delete
+        kinds = {client_id: kind for kind, client_id in claimed}
+        for client in result.added:
+            self.client_added.emit(client)
+        for client in result.updated:
+            self.write_queue.note_written(client)
+            self.client_updated.emit(client)
+            self._notify(claimed, "update", client.id, "done", client)
+        for client_id in result.deleted:
+            self.client_deleted.emit(client_id)
+            self._notify(claimed, "delete", client_id, "done", client_id)
+        for client_id in result.missing:
+            self.error_ocurred.emit(f"Client with ID {client_id} not found")
+            self._notify(claimed, kinds.get(client_id, ""), client_id, "error",
+                         f"Client with ID {client_id} not found")
+        for client_id, current, changes in result.conflicts:
+            self.client_conflict.emit(client_id, current, changes)
+            self._notify(claimed, kinds.get(client_id, ""), client_id, "conflict", client_id, current, changes)
+        for client_id, message in result.errors:
+            self.error_ocurred.emit(f"No se han podido guardar los cambios: {message}")
+            if client_id is not None:
+                self._notify(claimed, kinds.get(client_id, ""), client_id, "error",
+                             f"No se han podido guardar los cambios: {message}")
+        self.pending_writes_changed.emit(self.pending_writes())
+        if self.write_queue:
+            self._queue_changed()
+
+    def wait_idle(self, timeout_ms: int = 30000) -> bool:
+        # process events until every queued call has reported back
+        if not self._pending:
+            return True
+        loop = QEventLoop()
+        poll = QTimer()
+        poll.timeout.connect(lambda: loop.quit() if not self._pending else None)
+        poll.start(5)
+        QTimer.singleShot(timeout_ms, loop.quit)
+        loop.exec()
+        poll.stop()
+        return not self._pending
+
+    def shutdown(self) -> None:
+        # finish the queued calls, commit pending writes and stop the database thread
+        self._flush_timer.stop()
+        if self._thread.isRunning():
+            self.commit_pending()
+            self._thread.quit()
+            self._thread.wait()
+        if self.write_queue:
+            result = apply_batch(self.service, self.write_queue.drain())
+            for _, message in result.errors:
+                logger.error("write lost on exit: %s", message)
         
     def load_all_clients(self) -> None:
         # load all clients from database and send signal
-        
+        self.flush()  # the worker runs in order, so the list includes queued writes
+        self._run_listing(self.service.list_all, "No se ha conseguido cargar el cliente")
+            
+    def get_client(self, client_id: int) -> Optional[Client]:
+        # fetch the full row of one client by id (primary key lookup, stays synchronous)
+        # writes still in the queue are applied on top so dialogs show them
+        if self.write_queue.is_pending_delete(client_id):
+            return None
         try:
-            with session_scope() as session:
-                clients = session.query(Client).all()
-                self.clients_loaded.emit(clients)
-        except SQLAlchemyError as e:
+            client = self.service.get(client_id)
+            changes = self.write_queue.pending_changes(client_id)
+            if client is not None and changes:
+                for name, value in changes.items():
+                    setattr(client, name, value)
+            return client
+        except Exception as e:
             self.error_ocurred.emit(f"No se ha conseguido cargar el cliente: {str(e)}")
-            
-            
+            return None
+
     def add_client(self, 
                    first_name: str, 
                    last_name: str,
@@ -48,83 +336,124 @@ class ClientController(QObject):
                    observations: Optional[str] = None) -> None:
         
         # add new client
-        try:
-            with session_scope() as session:
-                client = Client(
-                    first_name=first_name,
-                    last_name=last_name,
-                    phone=phone,
-                    email=email,
-                    birth_date=birth_date,
-                    occupation=occupation,
-                    therapy_price=therapy_price,
-                    sports=sports,
-                    background=background,
-                    observations=observations
-                )
-                session.add(client)
-                session.flush() # get the id before the commit
-                self.client_added.emit(client)
-        except SQLAlchemyError as e:
-            self.error_ocurred.emit(f"No se ha conseguido añadir el cliente : {str(e)}")
+        self.write_queue.add({
+            "first_name": first_name,
+            "last_name": last_name,
+            "phone": phone,
+            "email": email,
+            "birth_date": birth_date,
+            "occupation": occupation,
+            "therapy_price": therapy_price,
+            "sports": sports,
+            "background": background,
+            "observations": observations,
+        })
+        self._queue_changed()
             
     def update_client(self, client_id: int, first_name: str, last_name: str,
                       phone: Optional[str] = None, email: Optional[str] = None,
                       birth_date: Optional[date] = None, occupation: Optional[str] = None, 
                       therapy_price: Optional[float] = None, sports: Optional[str] = None, 
                       background: Optional[str] = None, observations: Optional[str] = None) -> None:
-        # update existing client
-        print(f"UPDATE CLIENT CALLED: ID={client_id}, name={first_name} {last_name}") # debugging
-        try:
-            with session_scope() as session:
-                client = session.query(Client).filter(Client.id == client_id).first()
-                print(f"Found client: {client}")
-                if client:
-                    print(f"Before update: {client.first_name} {client.last_name}")
-                    client.first_name = first_name
-                    client.last_name = last_name
-                    client.phone = phone
-                    client.email = email
-                    client.birth_date = birth_date
-                    client.occupation = occupation
-                    client.therapy_price = therapy_price
-                    client.sports = sports
-                    client.background = background
-                    client.observations = observations
-                    print(f"After update: {client.first_name} {client.last_name}")
-                    # Force commit
-                    session.commit()
-                    print("Session committed")
-                    self.client_updated.emit(client)
-                    print("Signal emitted")
-                else:
-                    print("Client not found!")
-                    self.error_ocurred.emit(f"Client with ID {client_id} not found")
-        except SQLAlchemyError as e:
-            self.error_ocurred.emit(f"Failed to update client: {str(e)}")
+        # update existing client, overwriting every column
+        self.update_client_fields(client_id, {
+            "first_name": first_name,
+            "last_name": last_name,
+            "phone": phone,
+            "email": email,
+            "birth_date": birth_date,
+            "occupation": occupation,
+            "therapy_price": therapy_price,
+            "sports": sports,
+            "background": background,
+            "observations": observations,
+        })
+
+    def update_client_fields(self, client_id: int, changes: Dict[str, object],
+                             expected_version: Optional[int] = None,
+                             callbacks: Optional[WriteCallbacks] = None, owner: Optional[QObject] = None) -> bool:
+        # write only the changed columns, False (and no query at all) when there are none
+        # with expected_version a concurrent edit is reported through client_conflict
+        # callbacks get this write's result, until owner is destroyed
+        if not changes:
+            return False
+        logger.debug("update_client id=%s fields=%s", client_id, sorted(changes))
+        if not self.write_queue.is_pending_delete(client_id):  # else the queue drops the edit
+            self._subscribe("update", client_id, callbacks, owner)
+        self.write_queue.update(client_id, changes, expected_version)
+        self._queue_changed()
+        return True
             
-    def delete_client(self, client_id: int) -> None:
+    def delete_client(self, client_id: int, expected_version: Optional[int] = None,
+                      callbacks: Optional[WriteCallbacks] = None, owner: Optional[QObject] = None) -> None:
         # delete a client from the database
-        try:
-            with session_scope() as session:
-                client = session.query(Client).filter(Client.id == client_id).first()
-                if client:
-                    session.delete(client)
-                    self.client_deleted.emit(client_id)
-                else:
-                    self.error_ocurred.emit(f"Client with ID {client_id} not found")
-        except SQLAlchemyError as e:
-            self.error_ocurred.emit(f"Failed to delete client: {str(e)}")
+        # with expected_version a concurrent edit is reported through client_conflict
+        # callbacks get this delete's result, until owner is destroyed
+        # a queued edit of the client is merged into the delete and never reports back
+        self._write_callbacks.pop(("update", client_id), None)
+        self._subscribe("delete", client_id, callbacks, owner)
+        self.write_queue.delete(client_id, expected_version)
+        self._queue_changed()
+
+    def delete_clients(self, client_ids: Iterable[int]) -> None:
+        # bulk delete off the gui thread, one DELETE ... WHERE id IN (...) per chunk
+        ids = list(client_ids)
+        if not ids:
+            return
+        self.write_queue.discard(ids)
+        for client_id in ids:
+            self._write_callbacks.pop(("update", client_id), None)  # discarded edits
+        self.flush()  # earlier queued writes go first
+        self.pending_writes_changed.emit(self.pending_writes())
+
+        def done(result: object) -> None:
+            if result.applied:
+                self.clients_deleted.emit(result.applied)
+            for client_id in result.applied:
+                self._notify(claimed, "delete", client_id, "done", client_id)
+
+        ticket = self._run(
+            lambda: self.service.delete_many(ids, progress=self.bulk_progress.emit),
+            done,
+            "No se han podido eliminar los clientes"
+        )
+        # requests waiting for a discarded delete get this one's result
+        claimed = self._claim(ticket, [("delete", client_id) for client_id in ids])
+
+    def update_clients_fields(self, client_ids: Iterable[int], fields: Dict[str, object]) -> None:
+        # set the same values on many clients with a set-based UPDATE off the gui thread
+        ids = list(client_ids)
+        if not ids or not fields:
+            return
+        self.flush()
+
+        def done(clients: List[Client]) -> None:
+            for client in clients:
+                self.write_queue.note_written(client)
+            self.clients_updated.emit(clients)
+
+        self._run(
+            lambda: self.service.bulk_update(ids, fields, progress=self.bulk_progress.emit),
+            done,
+            "No se han podido actualizar los clientes"
+        )
 
     def search_clients(self, query: str) -> None:
         # search clients for name or email
-        try:
-            with session_scope() as session:
-                clients = session.query(Client).filter(
-                    (Client.first_name.ilike(f"%{query}%")) |
-                    (Client.last_name.ilike(f"%{query}%")) |
-                    (Client.email.ilike(f"%{query}%"))
-                ).all()
-                self.clients_loaded.emit(clients)
-        except SQLAlchemyError as e:
-            self.error_ocurred.emit(f"Failed to search clients: {str(e)}")
\ No newline at end of file
+        self.flush()
+        self._run_listing(lambda: self.service.search(query), "Failed to search clients")
+
+    def filter_clients(self, node) -> None:
+        # clients matching a structured filter (services.filters), replaces the list
+        self.flush()
+        self._run_listing(lambda: self.service.filter(node), "No se ha podido aplicar el filtro")
+
+    def export_clients_csv(self, export_path: str) -> int:
+        # write every client to a csv file and return how many were written
+        self.commit_pending()
+        return self.service.export_csv(export_path)
+
+    def backup_database(self, backup_path: str) -> None:
+        # copy the database file to backup_path, queued writes included
+        self.commit_pending()
+        self.service.backup(backup_path)
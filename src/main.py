@@ -1,16 +1,26 @@
 import sys
-import os
 
+from utils import diagnostics  # first, so startup timings start here
+
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QApplication
-from PyQt6.QtGui import QIcon
 
 from models.database import init_database
 from  ui.main_window import MainWindow
+from utils import assets, self_replace, tracing, update_staging, watchdog
 
 
 def main() -> None:
+    # the frozen build is also the updater's helper process, no window then
+    if self_replace.is_apply_invocation(sys.argv):
+        sys.exit(self_replace.main(sys.argv))
+    # an update downloaded by an earlier run is installed before starting
+    if update_staging.activate_pending(sys.argv):
+        sys.exit(0)
+    diagnostics.mark_phase("imports")
     
     app = QApplication(sys.argv)
+    diagnostics.mark_phase("qapplication")
     
     # set application properties for proper Windows taskbar integration
     app.setApplicationName("Integra Client Manager")
@@ -19,14 +29,7 @@ def main() -> None:
     app.setOrganizationName("Integra")
     
     # set application icon BEFORE setting app user model id
-    ico_path = os.path.join(os.path.dirname(__file__), "assets", "app_icon.ico")
-    png_path = os.path.join(os.path.dirname(__file__), "assets", "integra_icon.jpeg")
-    
-    icon = None
-    if os.path.exists(ico_path):
-        icon = QIcon(ico_path)
-    elif os.path.exists(png_path):
-        icon = QIcon(png_path)
+    icon = assets.app_icon()
     
     if icon and not icon.isNull():
         app.setWindowIcon(icon)
@@ -52,15 +55,29 @@ def main() -> None:
     except:
         pass  # ignore if not on windows or if ctypes fails
     
+    # optional ui stall watchdog (INTEGRA_WATCHDOG=1)
+    watchdog.install()
+    app.aboutToQuit.connect(watchdog.uninstall)
+    
     init_database()
+    diagnostics.mark_phase("database")
+    assets.preload()
+    diagnostics.mark_phase("assets")
 
     window = MainWindow()
+    # after the controller's shutdown, so the last writes are in the trace
+    app.aboutToQuit.connect(tracing.save)
     
     # ensure the icon is set on the window as well
     if icon and not icon.isNull():
         window.setWindowIcon(icon)
     
     window.show()
+    diagnostics.mark_phase("main_window")
+    # runs once the event loop has processed the first paint
+    QTimer.singleShot(0, lambda: diagnostics.mark_phase("event_loop"))
+    # tell a pending update's helper this version starts fine
+    QTimer.singleShot(0, self_replace.confirm_started)
     
     sys.exit(app.exec())
 
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import date
 from typing import Optional
 
-from sqlalchemy import Date, Integer, Numeric, String
+from sqlalchemy import Date, Index, Integer, Numeric, String, func, literal_column
 from sqlalchemy.orm import Mapped, mapped_column
 
 from models.base import Base
@@ -19,9 +19,20 @@ class Client(Base):
     last_name: Mapped[str] = mapped_column(String(100), nullable=False)
     phone: Mapped[Optional[str]] = mapped_column(String(30), nullable=True)
     email: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, unique=True)
-    birth_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    birth_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True, index=True)
     occupation: Mapped[Optional[str]] = mapped_column(String(150), nullable=True)
-    therapy_price: Mapped[Optional[float]] = mapped_column(Numeric(10, 2), nullable=True)
+    therapy_price: Mapped[Optional[float]] = mapped_column(Numeric(10, 2), nullable=True, index=True)
     sports: Mapped[Optional[str]] = mapped_column(String(200), nullable=True)
     background: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
     observations: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    # row version for optimistic concurrency, bumped on every write
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+# birth month and day as 'MM-DD' for birthday filters; queries render the
+# format as a literal (not a bound parameter) so sqlite matches the index
+BIRTH_MONTH_DAY = func.strftime(literal_column("'%m-%d'"), Client.__table__.c.birth_date)
+
+Index("ix_clients_birth_month_day", func.strftime("%m-%d", Client.__table__.c.birth_date))
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class ClientStore(object):
+    # compact id-keyed index of the clients shown in the list
+    #
+    # rows mirror the list widget order. only what the list needs is kept:
+    # ids in a typed array, interned display names and the offset where the
+    # last name starts, so full rows are fetched by id when a dialog needs them
+
+    def __init__(self) -> None:
+        self._ids = array('q')
+        self._names: List[str] = []
+        self._last_name_offsets = array('I')
+        self._rows: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, client_id: int) -> bool:
+        return client_id in self._rows
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def clear(self) -> None:
+        self._ids = array('q')
+        self._names = []
+        self._last_name_offsets = array('I')
+        self._rows = {}
+
+    def append(self, client_id: int, first_name: str, last_name: str) -> int:
+        # add a client at the end and return its row
+        if client_id in self._rows:
+            raise ValueError(f"Cliente duplicado en la lista: {client_id}")
+        row = len(self._ids)
+        self._ids.append(client_id)
+        self._names.append(sys.intern(f"{first_name} {last_name}"))
+        self._last_name_offsets.append(len(first_name) + 1)
+        self._rows[client_id] = row
+        return row
+
+    def update(self, client_id: int, first_name: str, last_name: str) -> Optional[int]:
+        # rename a client in place and return its row
+        row = self._rows.get(client_id)
+        if row is not None:
+            self._names[row] = sys.intern(f"{first_name} {last_name}")
+            self._last_name_offsets[row] = len(first_name) + 1
+        return row
+
+    def remove(self, client_id: int) -> Optional[int]:
+        # drop a client and return the row it occupied
+        row = self._rows.pop(client_id, None)
+        if row is None:
+            return None
+        del self._ids[row]
+        del self._names[row]
+        del self._last_name_offsets[row]
+        # rows after the removed one shift up by one
+        for index in range(row, len(self._ids)):
+            self._rows[self._ids[index]] = index
+        return row
+
+    def remove_many(self, client_ids: Iterable[int]) -> List[int]:
+        # drop several clients in one compaction pass, returns removed rows
+        removed = sorted(row for row in (self._rows.get(client_id) for client_id in client_ids)
+                         if row is not None)
+        if not removed:
+            return []
+        dropped = set(removed)
+        keep = [row for row in range(len(self._ids)) if row not in dropped]
+        self._ids = array('q', (self._ids[row] for row in keep))
+        self._names = [self._names[row] for row in keep]
+        self._last_name_offsets = array('I', (self._last_name_offsets[row] for row in keep))
+        self._rows = {client_id: row for row, client_id in enumerate(self._ids)}
+        return removed
+
+    def row_of(self, client_id: int) -> Optional[int]:
+        return self._rows.get(client_id)
+
+    def id_at(self, row: int) -> Optional[int]:
+        if 0 <= row < len(self._ids):
+            return self._ids[row]
+        return None
+
+    def display_name(self, row: int) -> str:
+        return self._names[row]
+
+    def first_name(self, row: int) -> str:
+        return self._names[row][:self._last_name_offsets[row] - 1]
+
+    def last_name(self, row: int) -> str:
+        return self._names[row][self._last_name_offsets[row]:]
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Iterator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
 
+from models import instrumentation
 from models.base import Base
 
 # default SQLite path; can be overridden via configuration.
@@ -15,6 +18,12 @@ DEFAULT_DB_PATH = Path(__file__).resolve().parents[2] / "data" / "database.db"
 
 _engine: Engine | None = None
 _SessionFactory: sessionmaker[Session] | None = None
+# PRAGMA synchronous applied whenever a connection is taken from the pool
+_synchronous = "FULL"
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+# dedicated connection for PRAGMA data_version, see data_version()
+_version_probe: sqlite3.Connection | None = None
+_version_lock = threading.Lock()
 
 
 def get_engine(url: str | None = None) -> Engine:
@@ -25,13 +34,104 @@ def get_engine(url: str | None = None) -> Engine:
         if database_url.startswith("sqlite"):
             DEFAULT_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
         _engine = create_engine(database_url, echo=False, future=True)
+        # per-statement timing, slow query log and n+1 detection
+        instrumentation.install(_engine)
+        # next to the database file in use (--db, benchmarks), none in memory
+        database = _engine.url.database
+        if database and database != ":memory:":
+            instrumentation.configure_log_file(Path(database).resolve().parent / "logs" / "slow_queries.log")
+        if _engine.dialect.name == "sqlite":
+            event.listen(_engine, "checkout", _apply_synchronous)
     return _engine
 
 
+def _apply_synchronous(dbapi_connection, connection_record, connection_proxy) -> None:
+    if connection_record.info.get("synchronous") != _synchronous:
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA synchronous = {_synchronous}")
+        cursor.close()
+        connection_record.info["synchronous"] = _synchronous
+
+
+def set_synchronous(level: str) -> None:
+    # durability of commits: FULL fsyncs every commit, NORMAL skips the last one
+    global _synchronous
+    level = level.upper()
+    if level not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Nivel de sincronizacion invalido: {level}")
+    _synchronous = level
+
+
+def database_path() -> Path:
+    # file of the database the engine is connected to
+    database = get_engine().url.database
+    return Path(database) if database else DEFAULT_DB_PATH
+
+
+def data_version() -> int:
+    # changes whenever a commit is made by any other connection, including
+    # this process's pooled ones, so cached query results can be validated
+    global _version_probe
+    with _version_lock:
+        if _version_probe is None:
+            _version_probe = sqlite3.connect(str(database_path()), check_same_thread=False)
+        return _version_probe.execute("PRAGMA data_version").fetchone()[0]
+
+
+def dispose_engine() -> None:
+    # drop the cached engine and session factory (e.g. to switch database files)
+    global _engine, _SessionFactory, _version_probe
+    with _version_lock:
+        if _version_probe is not None:
+            _version_probe.close()
+        _version_probe = None
+    if _engine is not None:
+        _engine.dispose()
+    _engine = None
+    _SessionFactory = None
+
+
+def _add_client_version(conn) -> None:
+    columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(clients)")}
+    if "version" not in columns:
+        conn.exec_driver_sql("ALTER TABLE clients ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+def _create_client_indexes(conn) -> None:
+    # filter indexes (price, birth date and the birth month-day expression)
+    # sqlalchemy cannot reflect expression indexes, so check sqlite_master by name
+    from models.client import Client
+    existing = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    for index in Client.__table__.indexes:
+        if index.name not in existing:
+            index.create(conn)
+
+
+# schema changes for databases created by older releases, in order
+# PRAGMA user_version records how many have run; each step is idempotent
+MIGRATIONS = [
+    _add_client_version,
+    _create_client_indexes,
+]
+
+
+def migrate(engine: Engine) -> int:
+    # bring an existing database up to date, returns the number of steps applied
+    with engine.begin() as conn:
+        applied = conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+        for step in MIGRATIONS[applied:]:
+            step(conn)
+        if applied < len(MIGRATIONS):
+            conn.exec_driver_sql(f"PRAGMA user_version = {len(MIGRATIONS)}")
+    return max(len(MIGRATIONS) - applied, 0)
+
+
 def init_database(url: str | None = None) -> None:
-    # initialize database by creating all tables
+    # initialize database by creating all tables and migrating older schemas
+    import models.client  # noqa: F401 - registers the tables with Base.metadata
     engine = get_engine(url=url)
     Base.metadata.create_all(engine)
+    migrate(engine)
 
 
 def get_session_factory(url: str | None = None) -> sessionmaker[Session]:
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Deque, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from utils import tracing
+
+# query instrumentation configuration
+INSTRUMENTATION_CONFIG = {
+    "slow_query_ms": float(os.environ.get("INTEGRA_SLOW_QUERY_MS", "100")),
+    # same statement repeated this often inside one operation looks like n+1
+    "n_plus_one_threshold": 10,
+    "slow_query_history": 50,
+    "latency_samples": 500,
+    "log_max_bytes": 1024 * 1024,
+    "log_backups": 3,
+}
+
+logger = logging.getLogger("integra.sql")
+
+_current_operation: contextvars.ContextVar[Optional['_OperationRun']] = contextvars.ContextVar(
+    "integra_sql_operation", default=None
+)
+
+
+class _OperationRun(object):
+    # queries issued while one controller operation is running
+
+    def __init__(self, name: str, parent: Optional['_OperationRun'] = None):
+        self.name = name
+        self.parent = parent
+        self.queries = 0
+        self.statement_counts: Dict[str, int] = {}
+        self.flagged: set = set()
+
+
+class QueryStats(object):
+    # thread safe counters fed by the engine events
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.total_queries = 0
+            self.total_ms = 0.0
+            self.total_rows = 0
+            self.statements: Dict[str, Dict[str, float]] = {}
+            self.operations: Dict[str, Dict[str, float]] = {}
+            self.latencies: Dict[str, Deque[float]] = {}
+            self.slow_queries: Deque[dict] = deque(maxlen=INSTRUMENTATION_CONFIG["slow_query_history"])
+            self.n_plus_one: Deque[dict] = deque(maxlen=INSTRUMENTATION_CONFIG["slow_query_history"])
+
+    def record_query(self, statement: str, elapsed_ms: float, rows: int) -> None:
+        with self._lock:
+            self.total_queries += 1
+            self.total_ms += elapsed_ms
+            self.total_rows += max(rows, 0)
+            entry = self.statements.setdefault(
+                statement, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0}
+            )
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["rows"] += max(rows, 0)
+
+    def record_rows(self, statement: str, rows: int) -> None:
+        # orm rows loaded for the statement that was executed last
+        with self._lock:
+            self.total_rows += rows
+            entry = self.statements.get(statement)
+            if entry is not None:
+                entry["rows"] += rows
+
+    def record_operation(self, name: str, elapsed_ms: float, queries: int) -> None:
+        with self._lock:
+            entry = self.operations.setdefault(
+                name, {"calls": 0, "queries": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            entry["calls"] += 1
+            entry["queries"] += queries
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            samples = self.latencies.setdefault(
+                name, deque(maxlen=INSTRUMENTATION_CONFIG["latency_samples"])
+            )
+            samples.append(elapsed_ms)
+
+    def record_slow(self, report: dict) -> None:
+        with self._lock:
+            self.slow_queries.append(report)
+
+    def record_n_plus_one(self, report: dict) -> None:
+        with self._lock:
+            self.n_plus_one.append(report)
+
+    def snapshot(self) -> dict:
+        # copy of every counter, safe to read from any thread
+        with self._lock:
+            return {
+                "total_queries": self.total_queries,
+                "total_ms": self.total_ms,
+                "total_rows": self.total_rows,
+                "statements": {sql: dict(values) for sql, values in self.statements.items()},
+                "operations": {name: dict(values) for name, values in self.operations.items()},
+                "latencies": {name: list(samples) for name, samples in self.latencies.items()},
+                "slow_queries": list(self.slow_queries),
+                "n_plus_one": list(self.n_plus_one),
+            }
+
+
+stats = QueryStats()
+_local = threading.local()
+_installed_engines: set = set()
+# file handler set by configure_log_file()
+_log_handler: Optional[RotatingFileHandler] = None
+
+
+def snapshot() -> dict:
+    return stats.snapshot()
+
+
+def reset() -> None:
+    stats.reset()
+
+
+@contextmanager
+def operation(name: str) -> Iterator[None]:
+    # group the queries of one controller operation (usable as a decorator)
+    run = _OperationRun(name, _current_operation.get())
+    token = _current_operation.set(run)
+    start = time.perf_counter()
+    try:
+        with tracing.span(name, "service"):
+            yield
+    finally:
+        _current_operation.reset(token)
+        stats.record_operation(name, (time.perf_counter() - start) * 1000.0, run.queries)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("integra_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    end = time.perf_counter()
+    start = conn.info["integra_query_start"].pop()
+    elapsed_ms = (end - start) * 1000.0
+    # rowcount covers writes, selects are counted as the orm loads rows
+    rows = cursor.rowcount if cursor.rowcount is not None else -1
+    stats.record_query(statement, elapsed_ms, rows)
+    if tracing.enabled():
+        tracing.record(statement.split(None, 1)[0].upper(), "sql", start, end,
+                       statement=tracing.short_sql(statement), rows=rows)
+    _local.last_statement = statement
+
+    run = _current_operation.get()
+    # nested operations also count towards the ones enclosing them
+    enclosing = run
+    while enclosing is not None:
+        _count_in_operation(enclosing, statement)
+        enclosing = enclosing.parent
+
+    if elapsed_ms >= INSTRUMENTATION_CONFIG["slow_query_ms"]:
+        plan = _explain(cursor, statement, parameters, executemany)
+        report = {
+            "statement": statement,
+            "elapsed_ms": elapsed_ms,
+            "operation": run.name if run is not None else None,
+            "plan": plan,
+            "at": time.time(),
+        }
+        stats.record_slow(report)
+        logger.warning("consulta lenta %.1f ms (%s)\n%s\nplan:\n%s", elapsed_ms,
+                       report["operation"] or "-", statement, "\n".join(plan) or "  -")
+
+
+def _count_in_operation(run: _OperationRun, statement: str) -> None:
+    run.queries += 1
+    count = run.statement_counts.get(statement, 0) + 1
+    run.statement_counts[statement] = count
+    if count >= INSTRUMENTATION_CONFIG["n_plus_one_threshold"] and statement not in run.flagged:
+        run.flagged.add(statement)
+        stats.record_n_plus_one({"operation": run.name, "statement": statement, "count": count})
+        logger.warning("posible N+1 en %s: %d ejecuciones de\n%s", run.name, count, statement)
+
+
+def _explain(cursor, statement: str, parameters, executemany: bool) -> List[str]:
+    # EXPLAIN QUERY PLAN on a separate cursor of the same sqlite connection
+    if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+        return []
+    if executemany and parameters:
+        parameters = parameters[0]
+    try:
+        explain_cursor = cursor.connection.cursor()
+        try:
+            explain_cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+            return [str(row[-1]) for row in explain_cursor.fetchall()]
+        finally:
+            explain_cursor.close()
+    except Exception:
+        return []  # the plan is diagnostic only
+
+
+def _loaded_as_persistent(session, instance) -> None:
+    statement = getattr(_local, "last_statement", None)
+    if statement is not None:
+        stats.record_rows(statement, 1)
+
+
+def install(engine: Engine) -> None:
+    # hook the cursor events of an engine (once)
+    if id(engine) in _installed_engines:
+        return
+    _installed_engines.add(id(engine))
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    if not event.contains(Session, "loaded_as_persistent", _loaded_as_persistent):
+        event.listen(Session, "loaded_as_persistent", _loaded_as_persistent)
+
+
+def configure_log_file(path) -> None:
+    # write slow query and n+1 reports to a rotating log file; replaces the
+    # file set up before, so re-created engines do not write every line twice
+    global _log_handler
+    if _log_handler is not None and _log_handler.baseFilename == os.path.abspath(path):
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=INSTRUMENTATION_CONFIG["log_max_bytes"],
+                                      backupCount=INSTRUMENTATION_CONFIG["log_backups"], encoding="utf-8")
+    except OSError:
+        return
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    if _log_handler is not None:
+        logger.removeHandler(_log_handler)
+        _log_handler.close()
+    _log_handler = handler
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
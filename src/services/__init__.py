@@ -0,0 +1 @@
+# qt-free service layer shared by the gui controllers and the cli
@@ -0,0 +1,434 @@
+# client operations without any qt dependency
+
+from __future__ import annotations
+
+import csv
+import shutil
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional
+
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from models.client import Client
+from models.database import data_version, database_path, get_engine, session_scope
+from models.instrumentation import operation
+from services.filters import FilterCache, FilterNode, cache_key, compile_filter
+
+# csv columns used by export and import
+EXPORT_HEADER = [
+    'ID', 'Nombre', 'Apellidos', 'Teléfono', 'Email', 'Fecha de nacimiento',
+    'Profesión', 'Precio Terapia', 'Deportes', 'Antecedentes', 'Observaciones'
+]
+
+# csv column -> client attribute for imports
+IMPORT_COLUMNS = {
+    'Nombre': 'first_name',
+    'Apellidos': 'last_name',
+    'Teléfono': 'phone',
+    'Email': 'email',
+    'Fecha de nacimiento': 'birth_date',
+    'Profesión': 'occupation',
+    'Precio Terapia': 'therapy_price',
+    'Deportes': 'sports',
+    'Antecedentes': 'background',
+    'Observaciones': 'observations',
+}
+
+# editable client columns
+CLIENT_FIELDS = (
+    "first_name", "last_name", "phone", "email", "birth_date",
+    "occupation", "therapy_price", "sports", "background", "observations",
+)
+
+# ids per IN (...) clause, below sqlite's bound parameter limit
+IN_CHUNK_SIZE = 500
+
+# progress callback of the bulk operations: (ids processed, total ids)
+ProgressCallback = Callable[[int, int], None]
+
+
+class BatchResult(NamedTuple):
+    # ids a batch operation applied to, ids that were not found and ids
+    # whose row version no longer matched the expected one
+    applied: List[int]
+    missing: List[int]
+    conflicts: List[int] = []
+
+
+class ConcurrentModificationError(Exception):
+    # the client was changed by someone else since the caller read it
+    # `current` is the row as it is now in the database
+
+    def __init__(self, client_id: int, current: Optional[Client] = None):
+        super().__init__(f"El cliente {client_id} ha sido modificado por otro usuario")
+        self.client_id = client_id
+        self.current = current
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    skipped: int
+
+
+class VacuumResult(NamedTuple):
+    before_bytes: int
+    after_bytes: int
+
+
+class ClientStats(NamedTuple):
+    clients: int
+    with_email: int
+    with_phone: int
+    with_price: int
+    average_price: Optional[float]
+    duplicate_names: int
+    database: str
+    database_bytes: int
+
+
+def _chunks(ids: List[int], size: int = IN_CHUNK_SIZE) -> Iterator[List[int]]:
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _check_fields(fields: Mapping[str, object]) -> None:
+    unknown = set(fields) - set(CLIENT_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos de cliente desconocidos: {', '.join(sorted(unknown))}")
+
+
+class ClientService(object):
+    # crud, search, export and maintenance operations on clients
+    #
+    # every method accepts an optional session; pass the one yielded by
+    # transaction() to run several calls in a single commit:
+    #
+    #     with service.transaction() as session:
+    #         service.update_many(changes, session=session)
+    #         service.delete_many(ids, session=session)
+
+    def __init__(self) -> None:
+        # results of structured filters, valid until the database changes
+        self.filter_cache = FilterCache()
+
+    def transaction(self):
+        # one session and one commit for several service calls
+        return session_scope()
+
+    @contextmanager
+    def _scope(self, session: Optional[Session]) -> Iterator[Session]:
+        # reuse the caller's transaction or open a short one of our own
+        if session is not None:
+            yield session
+        else:
+            with session_scope() as own:
+                yield own
+
+    @operation("load_all_clients")
+    def list_all(self, session: Optional[Session] = None) -> List[Client]:
+        with self._scope(session) as session:
+            return session.query(Client).all()
+
+    @operation("get_client")
+    def get(self, client_id: int, session: Optional[Session] = None) -> Optional[Client]:
+        with self._scope(session) as session:
+            return session.get(Client, client_id)
+
+    @operation("get_clients")
+    def get_many(self, client_ids: Iterable[int], session: Optional[Session] = None) -> Dict[int, Client]:
+        # clients by id with one query per chunk of ids, unknown ids are left out
+        ids = list(dict.fromkeys(client_ids))
+        found: Dict[int, Client] = {}
+        with self._scope(session) as session:
+            for chunk in _chunks(ids):
+                for client in session.scalars(select(Client).where(Client.id.in_(chunk))):
+                    found[client.id] = client
+        return found
+
+    @operation("search_clients")
+    def search(self, query: str, session: Optional[Session] = None) -> List[Client]:
+        # search clients for name or email
+        with self._scope(session) as session:
+            return session.query(Client).filter(
+                (Client.first_name.ilike(f"%{query}%")) |
+                (Client.last_name.ilike(f"%{query}%")) |
+                (Client.email.ilike(f"%{query}%"))
+            ).all()
+
+    @operation("filter_clients")
+    def filter(self, node: FilterNode, session: Optional[Session] = None) -> List[Client]:
+        # clients matching a structured filter (see services.filters)
+        # outside a caller's transaction results are cached per PRAGMA data_version
+        statement = select(Client).where(compile_filter(node))
+        if session is not None:
+            return list(session.scalars(statement))
+        key = cache_key(node)
+        version = data_version()
+        cached = self.filter_cache.get(key, version)
+        if cached is None:
+            with session_scope() as session:
+                cached = list(session.scalars(statement))
+            self.filter_cache.put(key, version, cached)
+        return list(cached)
+
+    @operation("add_client")
+    def add(self, first_name: str, last_name: str, session: Optional[Session] = None, **fields) -> Client:
+        _check_fields(fields)
+        with self._scope(session) as session:
+            client = Client(first_name=first_name, last_name=last_name, **fields)
+            session.add(client)
+            session.flush()  # get the id before the commit
+            return client
+
+    @operation("update_client")
+    def update(self, client_id: int, session: Optional[Session] = None,
+               expected_version: Optional[int] = None, **fields) -> Optional[Client]:
+        # write only the given columns with a single UPDATE ... RETURNING, no prior SELECT
+        # returns the updated row, None when the client does not exist
+        # with expected_version the write only happens if nobody changed the row
+        # since it was read, otherwise ConcurrentModificationError is raised
+        _check_fields(fields)
+        with self._scope(session) as session:
+            if not fields:
+                return session.get(Client, client_id)  # nothing to write
+            statement = update(Client).where(Client.id == client_id)
+            if expected_version is not None:
+                statement = statement.where(Client.version == expected_version)
+            client = session.scalars(
+                statement.values(**fields, version=Client.version + 1).returning(Client)
+            ).one_or_none()
+            if client is None and expected_version is not None:
+                self._raise_if_exists(session, client_id)
+            return client
+
+    @operation("update_clients")
+    def update_many(self, changes: Mapping[int, Mapping[str, object]],
+                    session: Optional[Session] = None,
+                    versions: Optional[Mapping[int, int]] = None) -> BatchResult:
+        # apply per-client column changes {id: {column: value}} in one transaction
+        # clients whose version differs from versions[id] are left untouched
+        for fields in changes.values():
+            _check_fields(fields)
+        versions = versions or {}
+        with self._scope(session) as session:
+            clients = self.get_many(changes.keys(), session=session)
+            conflicts = [
+                client_id for client_id, client in clients.items()
+                if client_id in versions and client.version != versions[client_id]
+            ]
+            for client_id, client in clients.items():
+                if client_id in conflicts:
+                    continue
+                for name, value in changes[client_id].items():
+                    setattr(client, name, value)
+            # the mapper's version_id_col adds WHERE version = ? to each UPDATE
+            session.flush()
+        return BatchResult(
+            applied=[client_id for client_id in changes if client_id in clients and client_id not in conflicts],
+            missing=[client_id for client_id in changes if client_id not in clients],
+            conflicts=conflicts,
+        )
+
+    @operation("delete_client")
+    def delete(self, client_id: int, session: Optional[Session] = None,
+               expected_version: Optional[int] = None) -> bool:
+        # False when the client does not exist, ConcurrentModificationError
+        # when expected_version is given and the row changed in the meantime
+        versions = {client_id: expected_version} if expected_version is not None else None
+        with self._scope(session) as session:
+            result = self.delete_many([client_id], session=session, versions=versions)
+            if result.conflicts:
+                self._raise_if_exists(session, client_id)
+        return bool(result.applied)
+
+    @operation("delete_clients")
+    def delete_many(self, client_ids: Iterable[int], session: Optional[Session] = None,
+                    versions: Optional[Mapping[int, int]] = None,
+                    progress: Optional[ProgressCallback] = None) -> BatchResult:
+        # delete by id without loading the rows, one statement per chunk of ids
+        # ids present in versions are only deleted while their version matches
+        ids = list(dict.fromkeys(client_ids))
+        done = 0
+        versions = versions or {}
+        deleted = set()
+        conflicts: List[int] = []
+        with self._scope(session) as session:
+            for chunk in _chunks(ids):
+                plain = [client_id for client_id in chunk if client_id not in versions]
+                pinned = [(client_id, versions[client_id]) for client_id in chunk if client_id in versions]
+                if plain:
+                    deleted.update(session.scalars(
+                        delete(Client).where(Client.id.in_(plain)).returning(Client.id)
+                    ))
+                if pinned:
+                    deleted.update(session.scalars(
+                        delete(Client).where(tuple_(Client.id, Client.version).in_(pinned)).returning(Client.id)
+                    ))
+                    leftover = [client_id for client_id, _ in pinned if client_id not in deleted]
+                    if leftover:
+                        conflicts.extend(session.scalars(select(Client.id).where(Client.id.in_(leftover))))
+                done += len(chunk)
+                if progress is not None:
+                    progress(done, len(ids))
+        return BatchResult(
+            applied=[client_id for client_id in ids if client_id in deleted],
+            missing=[client_id for client_id in ids if client_id not in deleted and client_id not in conflicts],
+            conflicts=conflicts,
+        )
+
+    @operation("bulk_update_clients")
+    def bulk_update(self, client_ids: Iterable[int], fields: Mapping[str, object],
+                    session: Optional[Session] = None,
+                    progress: Optional[ProgressCallback] = None) -> List[Client]:
+        # set the same column values on many clients with one set-based
+        # UPDATE ... WHERE id IN (...) per chunk; returns the updated rows
+        _check_fields(fields)
+        ids = list(dict.fromkeys(client_ids))
+        updated: List[Client] = []
+        if not fields:
+            return updated
+        with self._scope(session) as session:
+            for done, chunk in enumerate(_chunks(ids), start=1):
+                updated.extend(session.scalars(
+                    update(Client).where(Client.id.in_(chunk))
+                    .values(**fields, version=Client.version + 1)
+                    .returning(Client)
+                ))
+                if progress is not None:
+                    progress(min(done * IN_CHUNK_SIZE, len(ids)), len(ids))
+        return updated
+
+    def _raise_if_exists(self, session: Session, client_id: int) -> None:
+        # a versioned write matched no row: conflict if the client is still there
+        current = session.get(Client, client_id, populate_existing=True)
+        if current is not None:
+            session.expunge(current)  # keep it loaded through the rollback
+            raise ConcurrentModificationError(client_id, current)
+
+    @operation("export_clients")
+    def export_csv(self, export_path: str) -> int:
+        # write every client to a csv file and return how many were written
+        with session_scope() as session:
+            clients = session.query(Client).all()
+            if not clients:
+                return 0
+
+            with open(export_path, 'w', newline='', encoding='utf-8') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(EXPORT_HEADER)
+                for client in clients:
+                    writer.writerow([
+                        client.id,
+                        client.first_name or '',
+                        client.last_name or '',
+                        client.phone or '',
+                        client.email or '',
+                        client.birth_date.isoformat() if client.birth_date else '',
+                        client.occupation or '',
+                        client.therapy_price or '',
+                        client.sports or '',
+                        client.background or '',
+                        client.observations or ''
+                    ])
+            return len(clients)
+
+    @operation("import_clients")
+    def import_csv(self, import_path: str, session: Optional[Session] = None) -> ImportResult:
+        # add the clients of a csv in the export format, in one transaction
+        # rows without a name or with an email already on file are skipped
+        with self._scope(session) as session:
+            known_emails = {email.lower() for (email,) in session.query(Client.email).filter(Client.email.isnot(None))}
+            imported = skipped = 0
+            with open(import_path, newline='', encoding='utf-8-sig') as csvfile:
+                for row in csv.DictReader(csvfile):
+                    fields = {}
+                    for column, attribute in IMPORT_COLUMNS.items():
+                        value = (row.get(column) or '').strip()
+                        fields[attribute] = value or None
+                    if not fields["first_name"] or not fields["last_name"]:
+                        skipped += 1
+                        continue
+                    email = fields["email"]
+                    if email and email.lower() in known_emails:
+                        skipped += 1
+                        continue
+                    fields["therapy_price"] = _parse_price(fields["therapy_price"])
+                    fields["birth_date"] = _parse_date(fields["birth_date"])
+                    session.add(Client(**fields))
+                    if email:
+                        known_emails.add(email.lower())
+                    imported += 1
+            return ImportResult(imported=imported, skipped=skipped)
+
+    @operation("backup_database")
+    def backup(self, backup_path: str) -> None:
+        # copy the database file to backup_path
+        source = database_path()
+        if not source.exists():
+            raise FileNotFoundError(str(source))
+        shutil.copy2(source, backup_path)
+
+    @operation("stats")
+    def stats(self, session: Optional[Session] = None) -> ClientStats:
+        # row counts and simple aggregates for reports
+        with self._scope(session) as session:
+            total, with_email, with_phone, priced, avg_price = session.execute(select(
+                func.count(Client.id),
+                func.count(Client.email),
+                func.count(Client.phone),
+                func.count(Client.therapy_price),
+                func.avg(Client.therapy_price),
+            )).one()
+            duplicates = session.execute(
+                select(func.count()).select_from(
+                    select(Client.first_name, Client.last_name)
+                    .group_by(Client.first_name, Client.last_name)
+                    .having(func.count() > 1)
+                    .subquery()
+                )
+            ).scalar()
+        path = database_path()
+        return ClientStats(
+            clients=total,
+            with_email=with_email,
+            with_phone=with_phone,
+            with_price=priced,
+            average_price=round(float(avg_price), 2) if avg_price is not None else None,
+            duplicate_names=duplicates,
+            database=str(path),
+            database_bytes=path.stat().st_size if path.exists() else 0,
+        )
+
+    @operation("vacuum")
+    def vacuum(self) -> VacuumResult:
+        # rebuild the database file and refresh planner statistics
+        path = database_path()
+        before = path.stat().st_size if path.exists() else 0
+        with get_engine().connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            conn.exec_driver_sql("VACUUM")
+            conn.exec_driver_sql("PRAGMA optimize")
+        after = path.stat().st_size if path.exists() else 0
+        return VacuumResult(before_bytes=before, after_bytes=after)
+
+
+def _parse_price(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value.replace("€", "").replace(",", ".").strip())
+    except ValueError:
+        return None
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
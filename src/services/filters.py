@@ -0,0 +1,346 @@
+# structured client filters: model, compiler to sqlalchemy core, saved filters
+# and a result cache that lives until the database changes
+#
+#     price = Condition("therapy_price", "between", [40, 60])
+#     march = Condition("birth_month", "eq", 3)
+#     no_email = Condition("email", "is_empty")
+#     node = Group("and", (price, Group("or", (march, no_email))))
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from sqlalchemy import and_, not_, or_, true
+from sqlalchemy.sql.elements import ColumnElement
+
+from models.client import BIRTH_MONTH_DAY, Client
+
+# field -> (label, kind)
+FIELDS: Dict[str, Tuple[str, str]] = {
+    "first_name": ("Nombre", "text"),
+    "last_name": ("Apellidos", "text"),
+    "phone": ("Teléfono", "text"),
+    "email": ("Email", "text"),
+    "occupation": ("Profesión", "text"),
+    "sports": ("Deportes", "text"),
+    "background": ("Antecedentes", "text"),
+    "observations": ("Observaciones", "text"),
+    "therapy_price": ("Precio terapia", "number"),
+    "birth_date": ("Fecha de nacimiento", "date"),
+    "birth_month": ("Mes de nacimiento", "month"),
+    "birthday": ("Cumpleaños (dd/mm)", "day"),
+}
+
+# operator -> label
+OPERATORS: Dict[str, str] = {
+    "contains": "contiene",
+    "not_contains": "no contiene",
+    "starts_with": "empieza por",
+    "eq": "es igual a",
+    "ne": "es distinto de",
+    "lt": "menor que",
+    "le": "menor o igual que",
+    "gt": "mayor que",
+    "ge": "mayor o igual que",
+    "between": "entre",
+    "is_empty": "está vacío",
+    "is_not_empty": "no está vacío",
+}
+
+# operators allowed for each kind of field
+KIND_OPERATORS: Dict[str, Tuple[str, ...]] = {
+    "text": ("contains", "not_contains", "starts_with", "eq", "ne", "is_empty", "is_not_empty"),
+    "number": ("eq", "ne", "lt", "le", "gt", "ge", "between", "is_empty", "is_not_empty"),
+    "date": ("eq", "lt", "gt", "between", "is_empty", "is_not_empty"),
+    "month": ("eq", "between"),
+    "day": ("eq", "between"),
+}
+
+# operators without a value
+UNARY_OPERATORS = ("is_empty", "is_not_empty")
+
+MONTHS = (
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+)
+
+
+class Condition(NamedTuple):
+    # one comparison: field, operator and a json friendly value
+    # (number, 'YYYY-MM-DD', month 1-12, 'MM-DD' or a [low, high] pair)
+    field: str
+    op: str
+    value: Any = None
+
+
+class Group(NamedTuple):
+    # conditions and nested groups joined by 'and' or 'or'
+    mode: str
+    items: Tuple[Union[Condition, "Group"], ...]
+
+
+FilterNode = Union[Condition, Group]
+
+
+def validate(node: FilterNode) -> None:
+    # raise ValueError describing the first invalid part of a filter
+    if isinstance(node, Group):
+        if node.mode not in ("and", "or"):
+            raise ValueError(f"Modo de grupo invalido: {node.mode}")
+        for item in node.items:
+            validate(item)
+        return
+    if node.field not in FIELDS:
+        raise ValueError(f"Campo desconocido: {node.field}")
+    kind = FIELDS[node.field][1]
+    if node.op not in KIND_OPERATORS[kind]:
+        raise ValueError(f"Operador '{node.op}' no valido para {FIELDS[node.field][0]}")
+    if node.op in UNARY_OPERATORS:
+        return
+    if node.op == "between":
+        if not isinstance(node.value, (list, tuple)) or len(node.value) != 2:
+            raise ValueError(f"'entre' necesita dos valores para {FIELDS[node.field][0]}")
+    elif node.value is None or node.value == "":
+        raise ValueError(f"Falta el valor para {FIELDS[node.field][0]}")
+
+
+def to_dict(node: FilterNode) -> dict:
+    if isinstance(node, Group):
+        return {"mode": node.mode, "items": [to_dict(item) for item in node.items]}
+    data = {"field": node.field, "op": node.op}
+    if node.op not in UNARY_OPERATORS:
+        data["value"] = list(node.value) if isinstance(node.value, (list, tuple)) else node.value
+    return data
+
+
+def from_dict(data: dict) -> FilterNode:
+    if "items" in data:
+        return Group(data.get("mode", "and"), tuple(from_dict(item) for item in data["items"]))
+    value = data.get("value")
+    return Condition(data["field"], data["op"], tuple(value) if isinstance(value, list) else value)
+
+
+def cache_key(node: FilterNode) -> str:
+    return json.dumps(to_dict(node), sort_keys=True, ensure_ascii=False)
+
+
+def describe(node: FilterNode) -> str:
+    # short human readable text of a filter
+    if isinstance(node, Group):
+        joiner = " y " if node.mode == "and" else " o "
+        text = joiner.join(
+            f"({describe(item)})" if isinstance(item, Group) else describe(item) for item in node.items
+        )
+        return text or "todos"
+    label = FIELDS.get(node.field, (node.field,))[0].lower()
+    operator = OPERATORS.get(node.op, node.op)
+    if node.op in UNARY_OPERATORS:
+        return f"{label} {operator}"
+    if node.op == "between":
+        return f"{label} {operator} {format_value(node, node.value[0])} y {format_value(node, node.value[1])}"
+    return f"{label} {operator} {format_value(node, node.value)}"
+
+
+def format_value(node: Condition, value: Any) -> str:
+    # a stored value as shown to the user (month name, dd/mm, dd/mm/aaaa)
+    kind = FIELDS[node.field][1]
+    if kind == "month":
+        return MONTHS[int(value) - 1]
+    if kind == "day":
+        month, day = str(value).split("-")
+        return f"{day}/{month}"
+    if kind == "date":
+        return datetime.strptime(str(value), "%Y-%m-%d").strftime("%d/%m/%Y")
+    if kind == "number":
+        return f"{float(value):g}"
+    return str(value)
+
+
+def parse_value(field: str, text: str) -> Any:
+    # user input to the json friendly value of a field, ValueError if invalid
+    kind = FIELDS[field][1]
+    text = text.strip()
+    if kind == "text":
+        return text
+    if kind == "number":
+        try:
+            return float(text.replace("€", "").replace(",", ".").strip())
+        except ValueError:
+            raise ValueError(f"'{text}' no es un numero") from None
+    if kind == "date":
+        for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(text, fmt).date().isoformat()
+            except ValueError:
+                continue
+        raise ValueError(f"'{text}' no es una fecha (dd/mm/aaaa)")
+    if kind == "month":
+        lowered = text.lower()
+        if lowered in MONTHS:
+            return MONTHS.index(lowered) + 1
+        if lowered.isdigit() and 1 <= int(lowered) <= 12:
+            return int(lowered)
+        raise ValueError(f"'{text}' no es un mes")
+    # day of the year as dd/mm
+    try:
+        parsed = datetime.strptime(f"{text}/2000", "%d/%m/%Y")  # leap year, 29/02 is valid
+    except ValueError:
+        raise ValueError(f"'{text}' no es un dia (dd/mm)") from None
+    return parsed.strftime("%m-%d")
+
+
+def compile_filter(node: FilterNode) -> ColumnElement:
+    # filter to a sqlalchemy core boolean expression over the clients table
+    validate(node)
+    return _compile(node)
+
+
+def _compile(node: FilterNode) -> ColumnElement:
+    if isinstance(node, Group):
+        parts = [_compile(item) for item in node.items]
+        if not parts:
+            return true()
+        return and_(*parts) if node.mode == "and" else or_(*parts)
+
+    kind = FIELDS[node.field][1]
+    if kind == "month":
+        return _compile_month(node)
+    if kind == "day":
+        if node.op == "eq":
+            return BIRTH_MONTH_DAY == node.value
+        return _month_day_range(node.value[0], node.value[1])
+
+    column = getattr(Client, node.field)
+    value = node.value
+    if kind == "date" and node.op not in UNARY_OPERATORS:
+        value = [date.fromisoformat(v) for v in value] if node.op == "between" else date.fromisoformat(value)
+
+    if node.op == "is_empty":
+        return or_(column.is_(None), column == "") if kind == "text" else column.is_(None)
+    if node.op == "is_not_empty":
+        return and_(column.isnot(None), column != "") if kind == "text" else column.isnot(None)
+    if node.op == "contains":
+        return column.ilike(f"%{_escape_like(value)}%", escape="\\")
+    if node.op == "not_contains":
+        return or_(column.is_(None), not_(column.ilike(f"%{_escape_like(value)}%", escape="\\")))
+    if node.op == "starts_with":
+        return column.ilike(f"{_escape_like(value)}%", escape="\\")
+    if node.op == "eq":
+        return column.ilike(_escape_like(value), escape="\\") if kind == "text" else column == value
+    if node.op == "ne":
+        if kind == "text":
+            return or_(column.is_(None), not_(column.ilike(_escape_like(value), escape="\\")))
+        return or_(column.is_(None), column != value)
+    if node.op == "lt":
+        return column < value
+    if node.op == "le":
+        return column <= value
+    if node.op == "gt":
+        return column > value
+    if node.op == "ge":
+        return column >= value
+    if node.op == "between":
+        low, high = sorted(value)
+        return column.between(low, high)
+    raise ValueError(f"Operador desconocido: {node.op}")
+
+
+def _compile_month(node: Condition) -> ColumnElement:
+    # months become ranges over the indexed month-day expression
+    if node.op == "eq":
+        month = int(node.value)
+        return _month_day_range(f"{month:02d}-01", f"{month:02d}-31")
+    first, last = int(node.value[0]), int(node.value[1])
+    return _month_day_range(f"{first:02d}-01", f"{last:02d}-31")
+
+
+def _month_day_range(low: str, high: str) -> ColumnElement:
+    # 'MM-DD' range, wrapping over new year (e.g. 11-15 to 02-10)
+    if low <= high:
+        return BIRTH_MONTH_DAY.between(low, high)
+    return or_(BIRTH_MONTH_DAY >= low, BIRTH_MONTH_DAY <= high)
+
+
+def _escape_like(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class FilterCache(object):
+    # filter results keyed by the canonical filter json, valid while the
+    # database data_version they were read at is still current
+
+    def __init__(self, max_entries: int = 32) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, list]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: int) -> Optional[list]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, version: int, rows: list) -> None:
+        with self._lock:
+            self._entries[key] = (version, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SavedFilters(object):
+    # named filters persisted as json in the data folder
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        if path is None:
+            from models.database import DEFAULT_DB_PATH
+            path = DEFAULT_DB_PATH.parent / "saved_filters.json"
+        self.path = Path(path)
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, data: Dict[str, dict]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_suffix(".tmp")
+        temp.write_text(json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(temp, self.path)
+
+    def names(self) -> List[str]:
+        return sorted(self._load(), key=str.lower)
+
+    def get(self, name: str) -> Optional[FilterNode]:
+        data = self._load().get(name)
+        return from_dict(data) if data is not None else None
+
+    def save(self, name: str, node: FilterNode) -> None:
+        validate(node)
+        data = self._load()
+        data[name] = to_dict(node)
+        self._write(data)
+
+    def delete(self, name: str) -> bool:
+        data = self._load()
+        if data.pop(name, None) is None:
+            return False
+        self._write(data)
+        return True
@@ -0,0 +1,201 @@
+# write-behind queue: coalesces pending client writes and commits them together
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from models.client import Client
+from services.client_service import ClientService, ConcurrentModificationError
+
+logger = logging.getLogger(__name__)
+
+# durability modes: how often pending writes are committed and the sqlite
+# PRAGMA synchronous level used for the commit
+DURABILITY_MODES = {
+    # every write is its own transaction, as before the queue existed
+    "immediate": {"label": "Inmediato", "grouped": False, "synchronous": "FULL"},
+    # writes are committed together every flush interval or batch size
+    "grouped": {"label": "Agrupado", "grouped": True, "synchronous": "FULL"},
+    # grouped, and sqlite skips the last fsync: a power cut may lose the latest commit
+    "fast": {"label": "Rápido", "grouped": True, "synchronous": "NORMAL"},
+}
+
+WRITE_QUEUE_CONFIG = {
+    "mode": os.environ.get("INTEGRA_WRITE_MODE", "grouped"),
+    "flush_interval_ms": int(os.environ.get("INTEGRA_WRITE_FLUSH_MS", "500")),
+    "batch_size": int(os.environ.get("INTEGRA_WRITE_BATCH", "100")),
+}
+
+
+class WriteBatch(object):
+    # writes drained from the queue, committed in one transaction
+
+    def __init__(self) -> None:
+        self.adds: List[Dict[str, object]] = []
+        # client id -> (changed columns, version the change was based on)
+        self.updates: Dict[int, Tuple[Dict[str, object], Optional[int]]] = {}
+        # client id -> version the delete was based on
+        self.deletes: Dict[int, Optional[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.adds) + len(self.updates) + len(self.deletes)
+
+
+class FlushResult(NamedTuple):
+    added: List[Client]
+    updated: List[Client]
+    deleted: List[int]
+    missing: List[int]
+    # (client id, row as it is now, rejected changes or None for a delete)
+    conflicts: List[Tuple[int, Optional[Client], Optional[dict]]]
+    # (client id or None for an add, error message)
+    errors: List[Tuple[Optional[int], str]]
+
+
+class WriteBehindQueue(object):
+    # pending writes keyed by client id; later writes to a row are merged into
+    # the pending one, so a row edited five times between flushes is written once
+
+    def __init__(self) -> None:
+        self._batch = WriteBatch()
+        # client id -> (first, current): our own flushes moved the row from
+        # version first up to current with nobody else writing in between.
+        # one entry per client, overwritten on each write
+        self._superseded: Dict[int, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._batch)
+
+    def add(self, fields: Dict[str, object]) -> None:
+        self._batch.adds.append(dict(fields))
+
+    def update(self, client_id: int, changes: Dict[str, object], expected_version: Optional[int] = None) -> None:
+        if client_id in self._batch.deletes:
+            return  # the row is going away anyway
+        pending = self._batch.updates.get(client_id)
+        if pending is None:
+            self._batch.updates[client_id] = (dict(changes), expected_version)
+        else:
+            merged, version = pending
+            merged.update(changes)
+            # the first read is what the whole edit sequence was based on
+            self._batch.updates[client_id] = (merged, version if version is not None else expected_version)
+
+    def delete(self, client_id: int, expected_version: Optional[int] = None) -> None:
+        pending = self._batch.updates.pop(client_id, None)
+        if pending is not None and pending[1] is not None:
+            expected_version = pending[1]
+        self._batch.deletes[client_id] = expected_version
+
+    def discard(self, client_ids) -> None:
+        # forget queued edits and deletes of clients that are being removed
+        for client_id in client_ids:
+            self._batch.updates.pop(client_id, None)
+            self._batch.deletes.pop(client_id, None)
+
+    def pending_changes(self, client_id: int) -> Optional[Dict[str, object]]:
+        # queued column changes for a client, None if there are none
+        pending = self._batch.updates.get(client_id)
+        return dict(pending[0]) if pending else None
+
+    def is_pending_delete(self, client_id: int) -> bool:
+        return client_id in self._batch.deletes
+
+    def note_written(self, client: Client) -> None:
+        # our flush moved the row one version forward; edits that were based
+        # on the version before it are not conflicts
+        replaced = client.version - 1
+        first, current = self._superseded.get(client.id, (replaced, replaced))
+        if current != replaced:
+            first = replaced  # someone else wrote in between
+        self._superseded[client.id] = (first, client.version)
+
+    def _resolve(self, client_id: int, version: Optional[int]) -> Optional[int]:
+        superseded = self._superseded.get(client_id)
+        if version is not None and superseded is not None and superseded[0] <= version < superseded[1]:
+            return superseded[1]
+        return version
+
+    def drain(self) -> WriteBatch:
+        # hand over everything pending and start an empty batch
+        batch, self._batch = self._batch, WriteBatch()
+        batch.updates = {
+            client_id: (changes, self._resolve(client_id, version))
+            for client_id, (changes, version) in batch.updates.items()
+        }
+        batch.deletes = {client_id: self._resolve(client_id, version) for client_id, version in batch.deletes.items()}
+        return batch
+
+
+def _apply(service: ClientService, batch: WriteBatch, session, result: FlushResult) -> None:
+    for fields in batch.adds:
+        fields = dict(fields)
+        result.added.append(service.add(fields.pop("first_name"), fields.pop("last_name"), session=session, **fields))
+
+    for client_id, (changes, version) in batch.updates.items():
+        try:
+            client = service.update(client_id, session=session, expected_version=version, **changes)
+        except ConcurrentModificationError as e:
+            result.conflicts.append((client_id, e.current, changes))
+            continue
+        if client is None:
+            result.missing.append(client_id)
+        else:
+            result.updated.append(client)
+
+    if batch.deletes:
+        versions = {client_id: version for client_id, version in batch.deletes.items() if version is not None}
+        deleted = service.delete_many(batch.deletes.keys(), session=session, versions=versions)
+        result.deleted.extend(deleted.applied)
+        result.missing.extend(deleted.missing)
+        if deleted.conflicts:
+            current = service.get_many(deleted.conflicts, session=session)
+            for client_id in deleted.conflicts:
+                session.expunge(current[client_id])
+                result.conflicts.append((client_id, current[client_id], None))
+
+
+def _empty_result() -> FlushResult:
+    return FlushResult(added=[], updated=[], deleted=[], missing=[], conflicts=[], errors=[])
+
+
+def apply_batch(service: ClientService, batch: WriteBatch) -> FlushResult:
+    # commit a batch in one transaction (one fsync); if any write fails the
+    # batch is retried one write per transaction so only the bad one is lost
+    result = _empty_result()
+    try:
+        with service.transaction() as session:
+            _apply(service, batch, session, result)
+        return result
+    except Exception:
+        logger.warning("group commit failed, retrying %d writes one by one", len(batch), exc_info=True)
+
+    result = _empty_result()
+    # (client id or None for an add, batch with that one write)
+    singles: List[Tuple[Optional[int], WriteBatch]] = []
+    for fields in batch.adds:
+        single = WriteBatch()
+        single.adds.append(fields)
+        singles.append((None, single))
+    for client_id, update in batch.updates.items():
+        single = WriteBatch()
+        single.updates[client_id] = update
+        singles.append((client_id, single))
+    for client_id, version in batch.deletes.items():
+        single = WriteBatch()
+        single.deletes[client_id] = version
+        singles.append((client_id, single))
+
+    for client_id, single in singles:
+        partial = _empty_result()
+        try:
+            with service.transaction() as session:
+                _apply(service, single, session, partial)
+        except Exception as e:
+            result.errors.append((client_id, str(e)))
+            continue
+        for collected, values in zip(result, partial):
+            collected.extend(values)
+    return result
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-import os
 from PyQt6.QtCore import Qt, QUrl
-from PyQt6.QtGui import QDesktopServices, QPixmap
+from PyQt6.QtGui import QDesktopServices
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton, QHBoxLayout
 
+from utils import assets
+
 
 
 class AboutDialog(QDialog):
@@ -85,35 +86,11 @@ class AboutDialog(QDialog):
         self.accept()
         
     def _load_developer_icon(self) -> None:
-        # load ico - handle both development and bundled app paths
-        import sys
-        
-        # try multiple possible paths
-        if getattr(sys, 'frozen', False):
-            # running pyinstaller bundle
-            base_path = sys._MEIPASS
-            icon_paths = [
-                os.path.join(base_path, 'assets', 'FSakuraIco.jpeg'),
-                os.path.join(base_path, 'FSakuraIco.jpeg')
-            ]
-        else:
-            # running in development
-            icon_paths = [
-                os.path.join(os.path.dirname(__file__), '..', 'assets', 'FSakuraIco.jpeg')
-            ]
-        
-        for icon_path in icon_paths:
-            if os.path.exists(icon_path):
-                pixmap = QPixmap(icon_path)
-                if not pixmap.isNull():
-                    # scale the image to fit while maintaining aspect ratio
-                    scaled_pixmap = pixmap.scaled(
-                        80, 80, 
-                        Qt.AspectRatioMode.KeepAspectRatio, 
-                        Qt.TransformationMode.SmoothTransformation
-                    )
-                    self.iconLabel.setPixmap(scaled_pixmap)
-                    return
+        # load ico from the shared asset cache (scaled once per pixel ratio)
+        pixmap = assets.pixmap(assets.DEVELOPER_ICON, 80, 80, self.devicePixelRatioF())
+        if not pixmap.isNull():
+            self.iconLabel.setPixmap(pixmap)
+            return
         
         # fallback: create a simple placeholder with initials
         self.iconLabel.setText("CG")
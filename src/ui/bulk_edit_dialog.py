@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from PyQt6.QtWidgets import (
+    QCheckBox,
+    QDialog,
+    QDoubleSpinBox,
+    QFormLayout,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QPushButton,
+    QVBoxLayout,
+)
+
+
+class BulkEditDialog(QDialog):
+    # set shared fields on several selected clients at once
+    # only the fields whose checkbox is ticked are written
+
+    def __init__(self, parent=None, count: int = 0) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Editar clientes seleccionados")
+        self.setModal(True)
+        self.resize(420, 260)
+
+        self.summary_label = QLabel(f"Los cambios se aplicarán a {count} clientes.", self)
+
+        self.therapy_price_check = QCheckBox("Precio terapia", self)
+        self.therapy_price_input = QDoubleSpinBox(self)
+        self.therapy_price_input.setPrefix("€")
+        self.therapy_price_input.setMaximum(9999.99)
+        self.therapy_price_input.setDecimals(2)
+
+        self.occupation_check = QCheckBox("Profesión", self)
+        self.occupation_input = QLineEdit(self)
+        self.occupation_input.setPlaceholderText("Vacío para borrarla")
+
+        self.sports_check = QCheckBox("Deportes", self)
+        self.sports_input = QLineEdit(self)
+        self.sports_input.setPlaceholderText("Vacío para borrarlos")
+
+        self.save_button = QPushButton("Aplicar", self)
+        self.cancel_button = QPushButton("Cancelar", self)
+
+        self._build_layout()
+        self._connect_signals()
+        self._apply_styling()
+        self._update_enabled()
+
+    def _build_layout(self) -> None:
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary_label)
+
+        form_layout = QFormLayout()
+        form_layout.setSpacing(12)
+        form_layout.addRow(self.therapy_price_check, self.therapy_price_input)
+        form_layout.addRow(self.occupation_check, self.occupation_input)
+        form_layout.addRow(self.sports_check, self.sports_input)
+        layout.addLayout(form_layout)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.cancel_button)
+        button_layout.addWidget(self.save_button)
+        layout.addLayout(button_layout)
+
+    def _connect_signals(self) -> None:
+        for check in (self.therapy_price_check, self.occupation_check, self.sports_check):
+            check.toggled.connect(self._update_enabled)
+        self.save_button.clicked.connect(self.accept)
+        self.cancel_button.clicked.connect(self.reject)
+
+    def _update_enabled(self) -> None:
+        self.therapy_price_input.setEnabled(self.therapy_price_check.isChecked())
+        self.occupation_input.setEnabled(self.occupation_check.isChecked())
+        self.sports_input.setEnabled(self.sports_check.isChecked())
+        self.save_button.setEnabled(bool(self.get_fields()))
+
+    def get_fields(self) -> dict:
+        # the ticked fields with the value to set on every client
+        fields = {}
+        if self.therapy_price_check.isChecked():
+            price = self.therapy_price_input.value()
+            fields["therapy_price"] = price if price > 0 else None
+        if self.occupation_check.isChecked():
+            fields["occupation"] = self.occupation_input.text().strip() or None
+        if self.sports_check.isChecked():
+            fields["sports"] = self.sports_input.text().strip() or None
+        return fields
+
+    def _apply_styling(self) -> None:
+        # apply theme styling
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #0F172A;
+                color: #E2E8F0;
+            }
+            QLabel, QCheckBox {
+                color: #E2E8F0;
+                font-weight: bold;
+            }
+            QLineEdit, QDoubleSpinBox {
+                background-color: #1E293B;
+                border: 1px solid #334155;
+                border-radius: 6px;
+                padding: 8px;
+                color: #E2E8F0;
+                font-size: 13px;
+            }
+            QLineEdit:disabled, QDoubleSpinBox:disabled {
+                color: #64748B;
+            }
+            QPushButton {
+                background-color: #334155;
+                border: 1px solid #475569;
+                border-radius: 6px;
+                padding: 10px 16px;
+                color: #E2E8F0;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #475569;
+            }
+            QPushButton:pressed {
+                background-color: #1E293B;
+            }
+            QPushButton:disabled {
+                color: #64748B;
+            }
+        """)
@@ -14,7 +14,9 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from controllers.client_controller import WriteCallbacks
 from ui.client_form_dialog import ClientFormDialog
+from utils import tracing
 
 
 
@@ -111,28 +113,14 @@ class ClientDetailsDialog(QDialog):
         edit_dialog = ClientFormDialog(self, self.client_data)
         if edit_dialog.exec() == edit_dialog.DialogCode.Accepted:
             if edit_dialog.is_valid():
-                # get updated data from form
-                updated_data = edit_dialog.get_form_data()
-                
-                # update client through controller
+                # update client through controller, only the fields that changed
                 if self.controller:
-                    print(f"Calling controller.update_client for ID: {self.client_data.id}")
-                    self.controller.update_client(
-                        self.client_data.id,
-                        updated_data["first_name"],
-                        updated_data["last_name"],
-                        updated_data["phone"],
-                        updated_data["email"],
-                        updated_data["birth_date"],
-                        updated_data["occupation"],
-                        updated_data["therapy_price"],
-                        updated_data["sports"],
-                        updated_data["background"],
-                        updated_data["observations"]
-                    )
-                    print("Update completed, closing dialog")
-                else:
-                    print("No controller available")
+                    with tracing.action("save"):
+                        self.controller.update_client_fields(
+                            self.client_data.id,
+                            edit_dialog.changed_fields(),
+                            expected_version=self.client_data.version
+                        )
                         
                 self.accept()  # close details dialog after edit
     
@@ -219,27 +207,30 @@ class ClientDetailsDialog(QDialog):
 
         if reply == QMessageBox.StandardButton.Yes:
             if self.controller:
-                # connect to the controller's signals to handle success/error
-                self.controller.client_deleted.connect(self._on_deletion_success)
-                self.controller.error_ocurred.connect(self._on_deletion_error)
-                
-                # perform deletion
-                self.controller.delete_client(self.client_data.id)
+                # perform deletion, refused if someone else changed the client meanwhile
+                # only this delete's result comes back here, and not once the dialog is gone
+                with tracing.action("delete"):
+                    self.controller.delete_client(
+                        self.client_data.id,
+                        expected_version=self.client_data.version,
+                        callbacks=WriteCallbacks(
+                            done=self._on_deletion_success,
+                            error=self._on_deletion_error,
+                            conflict=self._on_deletion_conflict,
+                        ),
+                        owner=self,
+                    )
             else:
                 QMessageBox.critical(self, "Error", "No se pudo eliminar el cliente: controlador no disponible.")
     
     def _on_deletion_success(self, client_id: int) -> None:
-        # disconnect signals to avoid duplicate connections
-        self.controller.client_deleted.disconnect(self._on_deletion_success)
-        self.controller.error_ocurred.disconnect(self._on_deletion_error)
-        
         client_name = f"{self.client_data.first_name} {self.client_data.last_name}"
         QMessageBox.information(self, "Eliminado", f"Cliente '{client_name}' eliminado con éxito.")
         self.accept()  # close dialog after successful deletion
     
     def _on_deletion_error(self, error_message: str) -> None:
-        # disconnect signals
-        self.controller.client_deleted.disconnect(self._on_deletion_success)
-        self.controller.error_ocurred.disconnect(self._on_deletion_error)
-        
-        QMessageBox.critical(self, "Error de eliminación", error_message)
\ No newline at end of file
+        QMessageBox.critical(self, "Error de eliminación", error_message)
+
+    def _on_deletion_conflict(self, client_id: int, current, changes) -> None:
+        # the main window asks whether to delete anyway, the details shown here are stale
+        self.accept()
\ No newline at end of file
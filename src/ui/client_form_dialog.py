@@ -19,8 +19,12 @@ class ClientFormDialog(QDialog):
         self.form_view = ClientFormView(self)
         
         # if editing, populate fields
+        # the original values go through get_form_data too, so an untouched
+        # form compares equal regardless of how the widgets normalise values
+        self._original_data = None
         if client_data:
             self._populate_form(client_data)
+            self._original_data = self.get_form_data()
 
         self._setup_dialog()
 
@@ -163,6 +167,13 @@ class ClientFormDialog(QDialog):
             "observations": self.form_view.observations_input.toPlainText().strip() or None,
         }
 
+    def changed_fields(self) -> dict:
+        # fields that differ from the client being edited (everything when adding)
+        data = self.get_form_data()
+        if self._original_data is None:
+            return data
+        return {key: value for key, value in data.items() if value != self._original_data.get(key)}
+
     def is_valid(self) -> bool:
         # validate form data
         data = self.get_form_data()
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 from PyQt6.QtCore import Qt, QPropertyAnimation, QTimer, pyqtProperty
-from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import (
     QHBoxLayout,
     QLabel,
@@ -10,11 +9,18 @@ from PyQt6.QtWidgets import (
     QListWidgetItem,
     QMenu,
     QMessageBox,
+    QProgressDialog,
     QPushButton,
     QVBoxLayout,
     QWidget,
 )
 
+from models.client_store import ClientStore
+from services.filters import describe
+from ui.filter_builder_dialog import FilterBuilderDialog
+from ui.progressive_loader import ProgressiveListLoader
+from utils import assets, tracing
+
 
 class ClientListView(QWidget):
     # displays clients with search and action controls
@@ -26,9 +32,13 @@ class ClientListView(QWidget):
 
         self.search_input = QLineEdit(self)
         self.search_input.setPlaceholderText("Buscar clientes...") 
+        self.filter_button = QPushButton("Filtros", self)
+        self.filter_button.setToolTip("Filtrar por campos, fechas y precio")
+        # structured filter applied to the list, None when showing all clients
+        self.active_filter = None
 
         self.client_list = QListWidget(self)
-        self.client_list.setSelectionMode(QListWidget.SelectionMode.SingleSelection)
+        self.client_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
         self.client_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         
         # make text bigger with white line separators
@@ -42,27 +52,18 @@ class ClientListView(QWidget):
             }
         """)
         
-        # store client data for access when showing details
-        self.client_data_map = {}
+        # id-keyed index of the listed clients, rows mirror the list widget
+        self.client_store = ClientStore()
+        
+        # fills the list in small slices so large loads keep the ui responsive
+        self.loader = ProgressiveListLoader(self.client_list, self._add_client_row, self)
 
         self.add_button = QPushButton("Añadir cliente", self)
         self.edit_button = QPushButton("Editar", self)
         self.delete_button = QPushButton("Eliminar", self)
         # create refresh button with SVG icon
-        import os
-        import sys
-        
-        # get the correct resource path for both development and bundled executable
-        if getattr(sys, 'frozen', False):
-            # running as bundled executable
-            base_path = sys._MEIPASS
-            refresh_icon_path = os.path.join(base_path, 'utils', 'refresh-svgrepo-com.svg')
-        else:
-            # running as script in development
-            refresh_icon_path = os.path.join(os.path.dirname(__file__), '..', 'utils', 'refresh-svgrepo-com.svg')
-        
         self.refresh_button = QPushButton(self)
-        self.refresh_button.setIcon(QIcon(refresh_icon_path))
+        self.refresh_button.setIcon(assets.icon(assets.REFRESH_ICON))
         self.refresh_button.setToolTip("Actualizar lista de clientes")
         self.refresh_button.setMaximumWidth(40)
         self.refresh_button.setMaximumHeight(40)
@@ -73,6 +74,9 @@ class ClientListView(QWidget):
         self._pulse_timer.timeout.connect(self._stop_pulse_animation)
         self._glow_opacity = 1.0
 
+        # progress of a running bulk delete or edit
+        self._bulk_progress: QProgressDialog | None = None
+
         self._build_layout()
         self._populate_placeholder()
         self._connect_signals()
@@ -90,7 +94,10 @@ class ClientListView(QWidget):
         header_layout.addWidget(self.refresh_button)
         
         layout.addLayout(header_layout)
-        layout.addWidget(self.search_input)
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(self.search_input, stretch=1)
+        search_layout.addWidget(self.filter_button)
+        layout.addLayout(search_layout)
         layout.addWidget(self.client_list, stretch=1)
 
         button_row = QHBoxLayout()
@@ -119,24 +126,84 @@ class ClientListView(QWidget):
 
     def clear_placeholder(self) -> None:
         # remove the data placeholderfs when real data is added
+        self.loader.cancel()
         self.client_list.clear()
-        self.client_data_map.clear()
+        self.client_store.clear()
+
+    def populate_clients(self, clients) -> None:
+        # replace the list contents with the given clients progressively
+        self.clear_placeholder()
+        self.loader.start(clients)
+
+    def _add_client_row(self, client) -> None:
+        self.add_client_to_list(f"{client.first_name} {client.last_name}", client)
 
     def add_client_to_list(self, client_name: str, client_data=None) -> None:
         # add a client to the list widget        
+        if client_data and client_data.id in self.client_store:
+            return  # already listed
         item = QListWidgetItem(client_name)
         item.setTextAlignment(Qt.AlignmentFlag.AlignVCenter)
         self.client_list.addItem(item)
         
-        # store client data for details view
+        # index the client by id, full data is fetched when a dialog needs it
         if client_data:
-            self.client_data_map[client_name] = client_data
+            self.client_store.append(client_data.id, client_data.first_name, client_data.last_name)
+
+    def update_client_in_list(self, client) -> bool:
+        # rename the row of an edited client, False when it is not listed
+        row = self.client_store.update(client.id, client.first_name, client.last_name)
+        if row is None:
+            return False
+        self.client_list.item(row).setText(f"{client.first_name} {client.last_name}")
+        return True
+
+    def remove_clients_from_list(self, client_ids) -> int:
+        # drop the rows of deleted clients without reloading the list
+        rows = self.client_store.remove_many(client_ids)
+        for row in reversed(rows):
+            self.client_list.takeItem(row)
+        return len(rows)
+
+    def selected_client_ids(self) -> list:
+        # ids of the selected clients in list order (placeholders excluded)
+        rows = sorted(self.client_list.row(item) for item in self.client_list.selectedItems())
+        return [client_id for client_id in (self.client_id_for_row(row) for row in rows) if client_id is not None]
+
+    def show_bulk_progress(self, label: str, total: int) -> None:
+        # progress dialog for a bulk operation, only shown if it takes a while
+        self.finish_bulk_progress()
+        self._bulk_progress = QProgressDialog(label, None, 0, total, self)
+        self._bulk_progress.setWindowTitle("Procesando")
+        self._bulk_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self._bulk_progress.setMinimumDuration(300)
+        self._bulk_progress.setValue(0)
+
+    def update_bulk_progress(self, done: int, total: int) -> None:
+        if self._bulk_progress is not None:
+            self._bulk_progress.setMaximum(total)
+            self._bulk_progress.setValue(done)
+
+    def finish_bulk_progress(self, *args) -> None:
+        if self._bulk_progress is not None:
+            self._bulk_progress.close()
+            self._bulk_progress.deleteLater()
+            self._bulk_progress = None
+
+    def client_id_for_row(self, row: int) -> int | None:
+        # id of the client shown at a list row (None for placeholders)
+        return self.client_store.id_at(row)
+
+    def _get_controller(self):
+        # controller lives on the main window
+        return getattr(self.window(), '_client_controller', None)
 
     def _connect_signals(self) -> None:
         # connect button signals to their handlers
         self.edit_button.clicked.connect(self._edit_selected_client)
         self.delete_button.clicked.connect(self._confirm_delete)
         self.refresh_button.clicked.connect(self._on_refresh_clicked)
+        self.filter_button.clicked.connect(self._open_filter_builder)
         self.client_list.itemDoubleClicked.connect(self._on_client_double_clicked)
         self.client_list.customContextMenuRequested.connect(self._show_context_menu)
         # connect search input
@@ -144,6 +211,9 @@ class ClientListView(QWidget):
 
     def _confirm_delete(self) -> None:
         # show confirmation dialog before deleting selected client
+        if len(self.client_list.selectedItems()) > 1:
+            self._confirm_bulk_delete()
+            return
         current_item = self.client_list.currentItem()
         if not current_item:
             msg = QMessageBox(self)
@@ -155,6 +225,7 @@ class ClientListView(QWidget):
             return
 
         client_name = current_item.text()
+        client_id = self.client_id_for_row(self.client_list.row(current_item))
         msg = QMessageBox(self)
         msg.setWindowTitle("Confirmar eliminacion")
         msg.setText(f"Seguro que quieres eliminar a '{client_name}'?\n\nEsta accion es definitiva y no se puede deshacer")
@@ -168,11 +239,10 @@ class ClientListView(QWidget):
 
         if reply == QMessageBox.StandardButton.Yes:
             # get controller from main window and delete through it
-            main_window = self.window()
-            controller = getattr(main_window, '_client_controller', None)
-            if controller and client_name in self.client_data_map:
-                client_data = self.client_data_map[client_name]
-                controller.delete_client(client_data.id)
+            controller = self._get_controller()
+            if controller and client_id is not None:
+                with tracing.action("delete"):
+                    controller.delete_client(client_id)
                 msg = QMessageBox(self)
                 msg.setWindowTitle("Eliminado")
                 msg.setText(f"Cliente '{client_name}' eliminado con exito.")
@@ -187,8 +257,43 @@ class ClientListView(QWidget):
                 msg.setStyleSheet(self._get_message_box_style())
                 msg.exec()
 
+    def _confirm_bulk_delete(self) -> None:
+        # one confirmation and one bulk delete for every selected client
+        client_ids = self.selected_client_ids()
+        controller = self._get_controller()
+        if not client_ids or not controller:
+            return
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Confirmar eliminacion")
+        msg.setText(f"Seguro que quieres eliminar {len(client_ids)} clientes?\n\nEsta accion es definitiva y no se puede deshacer")
+        msg.setIcon(QMessageBox.Icon.Question)
+        msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        msg.setDefaultButton(QMessageBox.StandardButton.No)
+        msg.setStyleSheet(self._get_message_box_style())
+        if msg.exec() != QMessageBox.StandardButton.Yes:
+            return
+        self.show_bulk_progress(f"Eliminando {len(client_ids)} clientes...", len(client_ids))
+        with tracing.action("delete", clients=len(client_ids)):
+            controller.delete_clients(client_ids)
+
+    def _edit_selected_clients(self) -> None:
+        # bulk edit of shared fields for every selected client
+        client_ids = self.selected_client_ids()
+        controller = self._get_controller()
+        if not client_ids or not controller:
+            return
+        from ui.bulk_edit_dialog import BulkEditDialog
+        dialog = BulkEditDialog(self, len(client_ids))
+        if dialog.exec() == dialog.DialogCode.Accepted and dialog.get_fields():
+            self.show_bulk_progress(f"Actualizando {len(client_ids)} clientes...", len(client_ids))
+            with tracing.action("save", clients=len(client_ids)):
+                controller.update_clients_fields(client_ids, dialog.get_fields())
+
     def _edit_selected_client(self) -> None:
         # edit the selected client
+        if len(self.client_list.selectedItems()) > 1:
+            self._edit_selected_clients()
+            return
         current_item = self.client_list.currentItem()
         if not current_item:
             msg = QMessageBox(self)
@@ -199,9 +304,10 @@ class ClientListView(QWidget):
             msg.exec()
             return
 
-        client_name = current_item.text()
-        if client_name in self.client_data_map:
-            client_data = self.client_data_map[client_name]
+        client_id = self.client_id_for_row(self.client_list.row(current_item))
+        controller = self._get_controller()
+        client_data = controller.get_client(client_id) if controller and client_id is not None else None
+        if client_data:
             # create client data dictionary for the form dialog
             client_form_data = {
                 'id': client_data.id,
@@ -209,11 +315,13 @@ class ClientListView(QWidget):
                 'last_name': client_data.last_name,
                 'phone': client_data.phone,
                 'email': client_data.email,
+                'birth_date': client_data.birth_date,
                 'occupation': client_data.occupation,
                 'therapy_price': client_data.therapy_price,
                 'sports': client_data.sports,
                 'background': client_data.background,
-                'observations': client_data.observations
+                'observations': client_data.observations,
+                'version': client_data.version
             }
             
             # get main window and call edit method directly
@@ -239,26 +347,38 @@ class ClientListView(QWidget):
             menu = QMenu(self)
             view_action = menu.addAction("Ver Cliente")
             view_action.triggered.connect(lambda: self._show_client_details(item))
+            selected = len(self.client_list.selectedItems())
+            if selected > 1:
+                menu.addSeparator()
+                edit_action = menu.addAction(f"Editar {selected} seleccionados...")
+                edit_action.triggered.connect(self._edit_selected_clients)
+                delete_action = menu.addAction(f"Eliminar {selected} seleccionados...")
+                delete_action.triggered.connect(self._confirm_bulk_delete)
             menu.exec(self.client_list.mapToGlobal(position))
 
     def _show_client_details(self, item: QListWidgetItem) -> None:
         # show client details dialog
-        client_name = item.text()
-        if client_name in self.client_data_map:
+        client_id = self.client_id_for_row(self.client_list.row(item))
+        # get controller from main window
+        controller = self._get_controller()
+        client_data = controller.get_client(client_id) if controller and client_id is not None else None
+        if client_data:
             from ui.client_details_dialog import ClientDetailsDialog
-            client_data = self.client_data_map[client_name]
-            # get controller from main window
-            main_window = self.window()
-            controller = getattr(main_window, '_client_controller', None)
             dialog = ClientDetailsDialog(self, client_data, controller)
             dialog.exec()
+            # children of the list otherwise, one more for every client opened
+            dialog.deleteLater()
     
     def _refresh_list(self) -> None:
         # refresh the client list by reloading from database
         main_window = self.window()
         controller = getattr(main_window, '_client_controller', None)
-        if controller:
-            controller.load_all_clients()
+        if controller and self.active_filter is not None:
+            with tracing.action("refresh", filtered=True):
+                controller.filter_clients(self.active_filter)
+        elif controller:
+            with tracing.action("refresh"):
+                controller.load_all_clients()
         else:
             msg = QMessageBox(self)
             msg.setWindowTitle("Error")
@@ -435,18 +555,45 @@ class ClientListView(QWidget):
             }
         """)
 
+    def _open_filter_builder(self) -> None:
+        # edit the structured filter and reload the list with it
+        dialog = FilterBuilderDialog(self, current=self.active_filter)
+        if dialog.exec() != FilterBuilderDialog.DialogCode.Accepted:
+            return
+        self.set_active_filter(dialog.get_filter())
+        self._refresh_list()
+
+    def set_active_filter(self, node) -> None:
+        self.active_filter = node
+        if node is None:
+            self.filter_button.setText("Filtros")
+            self.filter_button.setToolTip("Filtrar por campos, fechas y precio")
+        else:
+            self.filter_button.setText("Filtros (activo)")
+            self.filter_button.setToolTip(describe(node))
+        if node is not None and self.search_input.text():
+            # a filter replaces the text search
+            self.search_input.blockSignals(True)
+            self.search_input.clear()
+            self.search_input.blockSignals(False)
+
     def _on_search_changed(self, text: str) -> None:
         # handle search input changes
         # get controller from main window
         main_window = self.window()
         controller = getattr(main_window, '_client_controller', None)
+        if self.active_filter is not None:
+            # typing a search drops the structured filter
+            self.set_active_filter(None)
         
         if controller:
-            if text.strip():
-                # search with the entered text
-                controller.search_clients(text.strip())
-            else:
-                # if search is empty, load all clients
-                controller.load_all_clients()
+            # the length only, search text names clients
+            with tracing.action("search", chars=len(text.strip())):
+                if text.strip():
+                    # search with the entered text
+                    controller.search_clients(text.strip())
+                else:
+                    # if search is empty, load all clients
+                    controller.load_all_clients()
         else:
             print("Error de busqueda o controlador")
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import (
+    QDialog,
+    QFileDialog,
+    QHBoxLayout,
+    QMessageBox,
+    QPushButton,
+    QTextEdit,
+    QVBoxLayout,
+)
+
+from utils import diagnostics
+
+
+class DiagnosticsDialog(QDialog):
+    # performance diagnostics for support staff
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Diagnóstico de rendimiento")
+        self.setModal(True)
+        self.resize(760, 600)
+        self._report = None
+
+        self.report_view = QTextEdit(self)
+        self.report_view.setReadOnly(True)
+        self.report_view.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        font = QFont("Monospace")
+        font.setStyleHint(QFont.StyleHint.TypeWriter)
+        self.report_view.setFont(font)
+
+        self.refresh_button = QPushButton("Actualizar", self)
+        self.export_button = QPushButton("Exportar paquete de diagnóstico...", self)
+        self.close_button = QPushButton("Cerrar", self)
+
+        self._build_layout()
+        self._connect_signals()
+        self._apply_styling()
+        self._refresh()
+
+    def _build_layout(self) -> None:
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.report_view, stretch=1)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.refresh_button)
+        button_layout.addWidget(self.export_button)
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.close_button)
+        layout.addLayout(button_layout)
+
+    def _connect_signals(self) -> None:
+        self.refresh_button.clicked.connect(self._refresh)
+        self.export_button.clicked.connect(self._export_bundle)
+        self.close_button.clicked.connect(self.accept)
+
+    def _refresh(self) -> None:
+        # collect a fresh report
+        self._report = diagnostics.collect()
+        self.report_view.setPlainText(diagnostics.format_report(self._report))
+
+    def _export_bundle(self) -> None:
+        # save report and logs to a zip file
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Exportar diagnóstico",
+            f"integra_diagnostico_{timestamp}.zip",
+            "Archivo ZIP (*.zip);;Todos los archivos (*)"
+        )
+        if not path:
+            return
+        try:
+            diagnostics.export_bundle(path, self._report)
+            QMessageBox.information(self, "Diagnóstico exportado", f"Paquete de diagnóstico guardado en:\n{path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo exportar el diagnóstico:\n{str(e)}")
+
+    def _apply_styling(self) -> None:
+        # apply theme styling
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #0F172A;
+                color: #E2E8F0;
+            }
+            QTextEdit {
+                background-color: #1E293B;
+                border: 1px solid #334155;
+                border-radius: 6px;
+                padding: 8px;
+                color: #E2E8F0;
+                font-size: 12px;
+            }
+            QPushButton {
+                background-color: #334155;
+                border: 1px solid #475569;
+                border-radius: 6px;
+                padding: 10px 16px;
+                color: #E2E8F0;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #475569;
+            }
+            QPushButton:pressed {
+                background-color: #1E293B;
+            }
+        """)
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+from PyQt6.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QHBoxLayout,
+    QInputDialog,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from services.filters import (
+    FIELDS,
+    KIND_OPERATORS,
+    OPERATORS,
+    UNARY_OPERATORS,
+    Condition,
+    FilterNode,
+    Group,
+    SavedFilters,
+    describe,
+    format_value,
+    parse_value,
+    validate,
+)
+
+# input hints for each kind of field
+PLACEHOLDERS = {
+    "text": "texto",
+    "number": "0.00",
+    "date": "dd/mm/aaaa",
+    "month": "mes (marzo o 3)",
+    "day": "dd/mm",
+}
+
+
+class ConditionRow(QWidget):
+    # one 'field operator value' line of the filter builder
+
+    def __init__(self, parent=None, condition: Condition | None = None) -> None:
+        super().__init__(parent)
+        self.field_combo = QComboBox(self)
+        for field, (label, _kind) in FIELDS.items():
+            self.field_combo.addItem(label, field)
+        self.operator_combo = QComboBox(self)
+        self.value_input = QLineEdit(self)
+        self.high_input = QLineEdit(self)
+        self.remove_button = QPushButton("✕", self)
+        self.remove_button.setToolTip("Quitar condición")
+        self.remove_button.setMaximumWidth(36)
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.field_combo, stretch=2)
+        layout.addWidget(self.operator_combo, stretch=2)
+        layout.addWidget(self.value_input, stretch=2)
+        layout.addWidget(self.high_input, stretch=2)
+        layout.addWidget(self.remove_button)
+
+        self.field_combo.currentIndexChanged.connect(self._on_field_changed)
+        self.operator_combo.currentIndexChanged.connect(self._update_inputs)
+        self._on_field_changed()
+        if condition is not None:
+            self.set_condition(condition)
+
+    def field(self) -> str:
+        return self.field_combo.currentData()
+
+    def _on_field_changed(self) -> None:
+        # offer only the operators that make sense for the field
+        kind = FIELDS[self.field()][1]
+        self.operator_combo.blockSignals(True)
+        self.operator_combo.clear()
+        for op in KIND_OPERATORS[kind]:
+            self.operator_combo.addItem(OPERATORS[op], op)
+        self.operator_combo.blockSignals(False)
+        self.value_input.setPlaceholderText(PLACEHOLDERS[kind])
+        self.high_input.setPlaceholderText(PLACEHOLDERS[kind])
+        self._update_inputs()
+
+    def _update_inputs(self) -> None:
+        op = self.operator_combo.currentData()
+        self.value_input.setVisible(op not in UNARY_OPERATORS)
+        self.high_input.setVisible(op == "between")
+
+    def set_condition(self, condition: Condition) -> None:
+        self.field_combo.setCurrentIndex(self.field_combo.findData(condition.field))
+        self.operator_combo.setCurrentIndex(self.operator_combo.findData(condition.op))
+        if condition.op == "between":
+            self.value_input.setText(format_value(condition, condition.value[0]))
+            self.high_input.setText(format_value(condition, condition.value[1]))
+        elif condition.op not in UNARY_OPERATORS:
+            self.value_input.setText(format_value(condition, condition.value))
+
+    def get_condition(self) -> Condition:
+        # raises ValueError when the typed value does not fit the field
+        field, op = self.field(), self.operator_combo.currentData()
+        if op in UNARY_OPERATORS:
+            return Condition(field, op)
+        if op == "between":
+            return Condition(field, op, (parse_value(field, self.value_input.text()),
+                                         parse_value(field, self.high_input.text())))
+        return Condition(field, op, parse_value(field, self.value_input.text()))
+
+
+class FilterBuilderDialog(QDialog):
+    # build a filter from conditions joined by 'and' / 'or' and manage saved
+    # filters; the model supports nested groups, the builder edits one level
+
+    def __init__(self, parent=None, current: FilterNode | None = None,
+                 saved: SavedFilters | None = None) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Filtrar clientes")
+        self.setModal(True)
+        self.resize(760, 420)
+
+        self.saved = saved or SavedFilters()
+        self.rows: list[ConditionRow] = []
+        self._filter: FilterNode | None = None
+
+        self.saved_combo = QComboBox(self)
+        self.save_as_button = QPushButton("Guardar como...", self)
+        self.delete_saved_button = QPushButton("Eliminar", self)
+
+        self.mode_combo = QComboBox(self)
+        self.mode_combo.addItem("todas las condiciones", "and")
+        self.mode_combo.addItem("cualquier condición", "or")
+
+        self.rows_layout = QVBoxLayout()
+        self.rows_layout.setSpacing(8)
+        self.add_row_button = QPushButton("Añadir condición", self)
+        self.summary_label = QLabel(self)
+        self.summary_label.setWordWrap(True)
+
+        self.clear_button = QPushButton("Quitar filtro", self)
+        self.cancel_button = QPushButton("Cancelar", self)
+        self.apply_button = QPushButton("Aplicar", self)
+
+        self._build_layout()
+        self._connect_signals()
+        self._apply_styling()
+        self._reload_saved()
+        self.set_filter(current)
+
+    def _build_layout(self) -> None:
+        layout = QVBoxLayout(self)
+
+        saved_layout = QHBoxLayout()
+        saved_layout.addWidget(QLabel("Filtros guardados:", self))
+        saved_layout.addWidget(self.saved_combo, stretch=1)
+        saved_layout.addWidget(self.save_as_button)
+        saved_layout.addWidget(self.delete_saved_button)
+        layout.addLayout(saved_layout)
+
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("Mostrar clientes que cumplan", self))
+        mode_layout.addWidget(self.mode_combo)
+        mode_layout.addStretch(1)
+        layout.addLayout(mode_layout)
+
+        layout.addLayout(self.rows_layout)
+        add_layout = QHBoxLayout()
+        add_layout.addWidget(self.add_row_button)
+        add_layout.addStretch(1)
+        layout.addLayout(add_layout)
+        layout.addWidget(self.summary_label)
+        layout.addStretch(1)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.clear_button)
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.cancel_button)
+        button_layout.addWidget(self.apply_button)
+        layout.addLayout(button_layout)
+
+    def _connect_signals(self) -> None:
+        self.add_row_button.clicked.connect(lambda: self._add_row())
+        self.saved_combo.activated.connect(self._on_saved_selected)
+        self.save_as_button.clicked.connect(self._save_as)
+        self.delete_saved_button.clicked.connect(self._delete_saved)
+        self.clear_button.clicked.connect(self._clear_filter)
+        self.cancel_button.clicked.connect(self.reject)
+        self.apply_button.clicked.connect(self._apply)
+
+    def _add_row(self, condition: Condition | None = None) -> None:
+        row = ConditionRow(self, condition)
+        row.remove_button.clicked.connect(lambda: self._remove_row(row))
+        self.rows.append(row)
+        self.rows_layout.addWidget(row)
+
+    def _remove_row(self, row: ConditionRow) -> None:
+        self.rows.remove(row)
+        row.deleteLater()
+        if not self.rows:
+            self._add_row()
+
+    def set_filter(self, node: FilterNode | None) -> None:
+        # show a filter in the builder, nested groups are listed as their conditions
+        for row in list(self.rows):
+            self.rows.remove(row)
+            row.deleteLater()
+        if isinstance(node, Condition):
+            node = Group("and", (node,))
+        if node is not None:
+            self.mode_combo.setCurrentIndex(self.mode_combo.findData(node.mode))
+            for condition in _conditions(node):
+                self._add_row(condition)
+            self.summary_label.setText(f"Filtro actual: {describe(node)}")
+        else:
+            self.summary_label.setText("")
+        if not self.rows:
+            self._add_row()
+
+    def build_filter(self) -> FilterNode:
+        # raises ValueError when a condition is incomplete
+        node = Group(self.mode_combo.currentData(), tuple(row.get_condition() for row in self.rows))
+        validate(node)
+        return node
+
+    def get_filter(self) -> FilterNode | None:
+        # the applied filter, None when the filter was removed
+        return self._filter
+
+    def _apply(self) -> None:
+        try:
+            self._filter = self.build_filter()
+        except ValueError as e:
+            self._show_error(str(e))
+            return
+        self.accept()
+
+    def _clear_filter(self) -> None:
+        self._filter = None
+        self.accept()
+
+    def _reload_saved(self, selected: str | None = None) -> None:
+        self.saved_combo.clear()
+        self.saved_combo.addItem("(ninguno)", None)
+        for name in self.saved.names():
+            self.saved_combo.addItem(name, name)
+        if selected is not None:
+            self.saved_combo.setCurrentIndex(self.saved_combo.findData(selected))
+        self.delete_saved_button.setEnabled(self.saved_combo.currentData() is not None)
+
+    def _on_saved_selected(self) -> None:
+        name = self.saved_combo.currentData()
+        self.delete_saved_button.setEnabled(name is not None)
+        if name is not None:
+            self.set_filter(self.saved.get(name))
+
+    def _save_as(self) -> None:
+        try:
+            node = self.build_filter()
+        except ValueError as e:
+            self._show_error(str(e))
+            return
+        name, ok = QInputDialog.getText(self, "Guardar filtro", "Nombre del filtro:",
+                                        text=self.saved_combo.currentData() or "")
+        if not ok or not name.strip():
+            return
+        try:
+            self.saved.save(name.strip(), node)
+        except OSError as e:
+            self._show_error(f"No se ha podido guardar el filtro: {e}")
+            return
+        self._reload_saved(name.strip())
+
+    def _delete_saved(self) -> None:
+        name = self.saved_combo.currentData()
+        if name is None:
+            return
+        try:
+            self.saved.delete(name)
+        except OSError as e:
+            self._show_error(f"No se ha podido eliminar el filtro: {e}")
+            return
+        self._reload_saved()
+
+    def _show_error(self, text: str) -> None:
+        QMessageBox.warning(self, "Filtro no válido", text)
+
+    def _apply_styling(self) -> None:
+        # apply theme styling
+        self.setStyleSheet("""
+            QDialog, QWidget {
+                background-color: #0F172A;
+                color: #E2E8F0;
+            }
+            QLabel {
+                color: #E2E8F0;
+                font-weight: bold;
+            }
+            QLineEdit, QComboBox {
+                background-color: #1E293B;
+                border: 1px solid #334155;
+                border-radius: 6px;
+                padding: 8px;
+                color: #E2E8F0;
+                font-size: 13px;
+            }
+            QPushButton {
+                background-color: #334155;
+                border: 1px solid #475569;
+                border-radius: 6px;
+                padding: 10px 16px;
+                color: #E2E8F0;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #475569;
+            }
+            QPushButton:pressed {
+                background-color: #1E293B;
+            }
+            QPushButton:disabled {
+                color: #64748B;
+            }
+        """)
+
+
+def _conditions(node: FilterNode):
+    # the conditions of a filter in order, flattening nested groups
+    if isinstance(node, Condition):
+        yield node
+        return
+    for item in node.items:
+        yield from _conditions(item)
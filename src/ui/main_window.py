@@ -1,19 +1,21 @@
 from __future__ import annotations
 
 import os
-import shutil
 from datetime import datetime
 from PyQt6.QtCore import Qt, QPropertyAnimation, QTimer, pyqtProperty
-from PyQt6.QtWidgets import QMainWindow, QMessageBox, QVBoxLayout, QWidget, QFileDialog, QHBoxLayout
-from PyQt6.QtGui import QAction, QDesktopServices, QIcon
+from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox, QVBoxLayout, QWidget, QFileDialog, QHBoxLayout, QLabel
+from PyQt6.QtGui import QAction, QActionGroup, QDesktopServices
 from PyQt6.QtCore import QUrl
 
 from ui.client_list_view import ClientListView
 from ui.client_form_dialog import ClientFormDialog
 from ui.about_dialog import AboutDialog
+from ui.diagnostics_dialog import DiagnosticsDialog
 from ui.simple_update_dialog import SimpleUpdateDialog
 from controllers.client_controller import ClientController
+from services.write_queue import DURABILITY_MODES
 from utils.simple_updater import SimpleUpdateManager
+from utils import assets, tracing
 from utils.version import CURRENT_VERSION
 
 
@@ -44,6 +46,7 @@ class MainWindow(QMainWindow):
         self._setup_update_system()
         self._connect_controller_signals()
         self._connect_ui_signals()
+        self._setup_save_status()
 
         self._central_container = QWidget(self)
         self._central_container.setObjectName("centralContainer")
@@ -83,6 +86,23 @@ class MainWindow(QMainWindow):
         data_folder_action.triggered.connect(self._open_data_folder)
         tools_menu.addAction(data_folder_action)
         
+        # durability of saved changes (write-behind queue mode)
+        durability_menu = tools_menu.addMenu('&Modo de guardado')
+        self._durability_actions = QActionGroup(self)
+        for mode, options in DURABILITY_MODES.items():
+            action = QAction(options["label"], self, checkable=True)
+            action.setData(mode)
+            action.setChecked(mode == self._client_controller.durability)
+            action.triggered.connect(lambda checked, mode=mode: self._client_controller.set_durability(mode))
+            self._durability_actions.addAction(action)
+            durability_menu.addAction(action)
+        
+        # performance diagnostics action
+        diagnostics_action = QAction('Diagnóstico de &rendimiento', self)
+        diagnostics_action.setStatusTip('Mostrar métricas de rendimiento y exportar un paquete de diagnóstico')
+        diagnostics_action.triggered.connect(self._show_diagnostics_dialog)
+        tools_menu.addAction(diagnostics_action)
+        
         # help menu
         help_menu = menubar.addMenu('&Ayuda')
         
@@ -124,7 +144,8 @@ class MainWindow(QMainWindow):
             )
             
             if backup_path:
-                shutil.copy2(DEFAULT_DB_PATH, backup_path)
+                with tracing.action("backup"):
+                    self._client_controller.backup_database(backup_path)
                 QMessageBox.information(
                     self, 
                     "Copia de seguridad completada", 
@@ -148,48 +169,17 @@ class MainWindow(QMainWindow):
             )
             
             if export_path:
-                # get all clients from database
-                from models.database import session_scope
-                from models.client import Client
+                with tracing.action("export"):
+                    count = self._client_controller.export_clients_csv(export_path)
+                if not count:
+                    QMessageBox.information(self, "Sin Datos", "No hay clientes para exportar.")
+                    return
                 
-                with session_scope() as session:
-                    clients = session.query(Client).all()
-                    
-                    if not clients:
-                        QMessageBox.information(self, "Sin Datos", "No hay clientes para exportar.")
-                        return
-                    
-                    # write to CSV
-                    import csv
-                    with open(export_path, 'w', newline='', encoding='utf-8') as csvfile:
-                        writer = csv.writer(csvfile)
-                        
-                        # write header
-                        writer.writerow([
-                            'ID', 'Nombre', 'Apellidos', 'Teléfono', 'Email', 
-                            'Profesión', 'Precio Terapia', 'Deportes', 'Antecedentes', 'Observaciones'
-                        ])
-                        
-                        # write client data
-                        for client in clients:
-                            writer.writerow([
-                                client.id,
-                                client.first_name or '',
-                                client.last_name or '',
-                                client.phone or '',
-                                client.email or '',
-                                client.occupation or '',
-                                client.therapy_price or '',
-                                client.sports or '',
-                                client.background or '',
-                                client.observations or ''
-                            ])
-                    
-                    QMessageBox.information(
-                        self, 
-                        "Exportación Completa", 
-                        f"Se exportaron {len(clients)} clientes a:\n{export_path}"
-                    )
+                QMessageBox.information(
+                    self, 
+                    "Exportación Completa", 
+                    f"Se exportaron {count} clientes a:\n{export_path}"
+                )
         except Exception as e:
             QMessageBox.critical(self, "Error de Exportación", f"Error al exportar clientes:\n{str(e)}")
     
@@ -211,6 +201,11 @@ class MainWindow(QMainWindow):
 
 
     
+    def _show_diagnostics_dialog(self) -> None:
+        # show performance diagnostics
+        dialog = DiagnosticsDialog(self)
+        dialog.exec()
+    
     def _show_about_dialog(self) -> None:
         # show the About dialog created with Qt Designer
         about_dialog = AboutDialog(self)
@@ -218,29 +213,22 @@ class MainWindow(QMainWindow):
     
     def _set_window_icon(self) -> None:
         # set the application window icon
-        import os
-        import sys
-        
-        # get the correct resource path for both development and bundled executable
-        if getattr(sys, 'frozen', False):
-            # running as bundled executable
-            base_path = sys._MEIPASS
-            icon_path = os.path.join(base_path, 'assets', 'app_icon.ico')
-        else:
-            # running as script in development
-            icon_path = os.path.join(os.path.dirname(__file__), '..', 'assets', 'app_icon.ico')
-        
-        if os.path.exists(icon_path):
-            self.setWindowIcon(QIcon(icon_path))
+        icon = assets.app_icon()
+        if not icon.isNull():
+            self.setWindowIcon(icon)
     
     def _setup_update_system(self) -> None:
         # connect update manager signals
         self.update_manager.update_available.connect(self._on_update_available)
+        self.update_manager.update_staged.connect(self._on_update_staged)
         self.update_manager.no_update_available.connect(self._on_no_update_available)
         self.update_manager.update_check_failed.connect(self._on_update_check_failed)
         
         # create update notification button (initially hidden)
         self._create_update_button()
+        self.update_manager.schedule_startup_check()
+        # a staged update is installed once the app has exited
+        QApplication.instance().aboutToQuit.connect(self.update_manager.shutdown)
     
     def _create_update_button(self) -> None:
         # create the glowing update notification button
@@ -328,6 +316,9 @@ class MainWindow(QMainWindow):
         # show a subtle notification
         self.statusBar().showMessage(f"Update available: v{update_info.version}", 3000)
     
+    def _on_update_staged(self, update_info) -> None:
+        self.statusBar().showMessage(f"Update v{update_info.version} ready - it will be installed when you close the app", 5000)
+    
     def _on_no_update_available(self) -> None:
         self.statusBar().showMessage("No updates available - you're on the latest version!", 3000)
     
@@ -411,6 +402,35 @@ class MainWindow(QMainWindow):
         self._client_controller.client_updated.connect(self._on_client_updated)
         self._client_controller.client_deleted.connect(self._on_client_deleted)
         self._client_controller.error_ocurred.connect(self._on_error)
+        self._client_controller.client_conflict.connect(self._on_client_conflict)
+        self._client_controller.clients_deleted.connect(self._on_clients_deleted)
+        self._client_controller.clients_updated.connect(self._on_clients_updated)
+        self._client_controller.bulk_progress.connect(self._client_list_view.update_bulk_progress)
+        self._client_controller.error_ocurred.connect(self._client_list_view.finish_bulk_progress)
+        self._client_controller.pending_writes_changed.connect(self._update_save_status)
+        self._client_controller.durability_changed.connect(self._update_save_status)
+
+    def _setup_save_status(self) -> None:
+        # permanent status bar label with the save mode and the queued writes
+        self._save_status_label = QLabel(self)
+        self._save_status_label.setToolTip(
+            "Inmediato: cada cambio se guarda al momento.\n"
+            "Agrupado: los cambios se guardan juntos cada medio segundo.\n"
+            "Rápido: agrupado y sin la última sincronización con el disco; "
+            "un corte de luz puede perder los últimos cambios."
+        )
+        self.statusBar().addPermanentWidget(self._save_status_label)
+        self._update_save_status()
+
+    def _update_save_status(self, *args) -> None:
+        mode = self._client_controller.durability
+        pending = self._client_controller.pending_writes()
+        text = f"Guardado: {DURABILITY_MODES[mode]['label']}"
+        if pending:
+            text += f"  ·  {pending} cambio{'s' if pending != 1 else ''} pendiente{'s' if pending != 1 else ''}"
+        self._save_status_label.setText(text)
+        for action in self._durability_actions.actions():
+            action.setChecked(action.data() == mode)
 
     def _connect_ui_signals(self) -> None:
         # connect UI button signals
@@ -418,50 +438,88 @@ class MainWindow(QMainWindow):
 
     def _load_initial_data(self) -> None:
         # load clients from database on startup
-        self._client_controller.load_all_clients()
+        with tracing.action("load"):
+            self._client_controller.load_all_clients()
 
     def _on_clients_loaded(self, clients) -> None:
         # handle loaded clients from controller
-        self._client_list_view.clear_placeholder()
-        # populate with real client data
-        for client in clients:
-            self._client_list_view.add_client_to_list(f"{client.first_name} {client.last_name}", client)
+        # populate with real client data, a newer load cancels a pending one
+        self._client_list_view.populate_clients(clients)
 
     def _on_client_added(self, client) -> None:
         # handle new client added
         self._client_list_view.add_client_to_list(f"{client.first_name} {client.last_name}", client)
 
     def _on_client_updated(self, client) -> None:
-        # handle client updated - refresh the entire list
-        self._load_initial_data()
+        # handle client updated - rename its row in place
+        self._client_list_view.update_client_in_list(client)
     
     def _on_client_deleted(self, client_id: int) -> None:
         # handle client deleted - show pulse animation to encourage manual refresh
         # note: auto-refresh disabled to show user-friendly pulse animation
         self._client_list_view.highlight_refresh_needed()
 
+    def _on_clients_deleted(self, client_ids: list) -> None:
+        # bulk delete finished - remove the rows in place
+        self._client_list_view.finish_bulk_progress()
+        removed = self._client_list_view.remove_clients_from_list(client_ids)
+        self.statusBar().showMessage(f"{removed} clientes eliminados", 4000)
+
+    def _on_clients_updated(self, clients: list) -> None:
+        # bulk edit finished - rename the affected rows in place
+        self._client_list_view.finish_bulk_progress()
+        for client in clients:
+            self._client_list_view.update_client_in_list(client)
+        self.statusBar().showMessage(f"{len(clients)} clientes actualizados", 4000)
+
     def _on_error(self, error_message: str) -> None:
         # handle controller errors
         QMessageBox.critical(self, "Error", error_message)
 
+    def _on_client_conflict(self, client_id: int, current, changes) -> None:
+        # another instance changed the client first: keep theirs or apply ours on top
+        self._client_list_view.update_client_in_list(current)
+        client_name = f"{current.first_name} {current.last_name}"
+        if changes is not None:
+            question = (f"Otro usuario ha modificado a '{client_name}' mientras lo editabas.\n\n"
+                        "¿Quieres sobrescribir sus cambios con los tuyos?")
+        else:
+            question = (f"Otro usuario ha modificado a '{client_name}' desde que lo abriste.\n\n"
+                        "¿Quieres eliminarlo igualmente?")
+        reply = QMessageBox.question(
+            self,
+            "Conflicto de edición",
+            question,
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        with tracing.action("save" if changes is not None else "delete", conflict=True):
+            if changes is not None:
+                self._client_controller.update_client_fields(client_id, changes, expected_version=current.version)
+            else:
+                self._client_controller.delete_client(client_id, expected_version=current.version)
+
     def _show_add_client_dialog(self) -> None:
         # show the add client form dialog
         dialog = ClientFormDialog(self)
         if dialog.exec() == dialog.DialogCode.Accepted:
             if dialog.is_valid():
                 data = dialog.get_form_data()
-                self._client_controller.add_client(
-                    data["first_name"],
-                    data["last_name"],
-                    data["phone"],
-                    data["email"],
-                    data["birth_date"],
-                    data["occupation"],
-                    data["therapy_price"],
-                    data["sports"],
-                    data["background"],
-                    data["observations"]
-                )
+                with tracing.action("save", new=True):
+                    self._client_controller.add_client(
+                        data["first_name"],
+                        data["last_name"],
+                        data["phone"],
+                        data["email"],
+                        data["birth_date"],
+                        data["occupation"],
+                        data["therapy_price"],
+                        data["sports"],
+                        data["background"],
+                        data["observations"]
+                    )
             else:
                 QMessageBox.warning(self, "Datos invalidos", "Nombre y apellidos es un campo obligatorio")
 
@@ -470,20 +528,12 @@ class MainWindow(QMainWindow):
         dialog = ClientFormDialog(self, client_data)
         if dialog.exec() == dialog.DialogCode.Accepted:
             if dialog.is_valid():
-                updated_data = dialog.get_form_data()
-                self._client_controller.update_client(
-                    client_data['id'],  # use the original ID
-                    updated_data["first_name"],
-                    updated_data["last_name"],
-                    updated_data["phone"],
-                    updated_data["email"],
-                    updated_data["birth_date"],
-                    updated_data["occupation"],
-                    updated_data["therapy_price"],
-                    updated_data["sports"],
-                    updated_data["background"],
-                    updated_data["observations"]
-                )
+                with tracing.action("save"):
+                    self._client_controller.update_client_fields(
+                        client_data['id'],
+                        dialog.changed_fields(),
+                        expected_version=client_data.get('version')
+                    )
             else:
                 QMessageBox.warning(self, "Datos invalidos", "Nombre y apellidos es un campo obligatorio")
 
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import time
+from typing import Callable, List, Sequence
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal as Signal
+from PyQt6.QtWidgets import QListWidget
+
+# time budget per slice, short enough to keep ~60 fps while loading
+SLICE_BUDGET_MS = 8.0
+# rows inserted at once when the row height is still unknown
+DEFAULT_FIRST_SCREEN_ROWS = 40
+
+
+class ProgressiveListLoader(QObject):
+    # inserts rows into a list widget in time-budgeted slices
+
+    # rows inserted, rows per second for that load
+    finished = Signal(int, float)
+
+    def __init__(self, list_widget: QListWidget, add_row: Callable[[object], None],
+                 parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._list_widget = list_widget
+        self._add_row = add_row
+        self._pending: List[object] = []
+        self._position = 0
+        self._started_at = 0.0
+
+        # zero timeout timer runs the next slice as soon as the event loop is idle
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._insert_slice)
+
+        # overall metric across every completed load
+        self.total_rows = 0
+        self.total_seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        # overall insertion throughput
+        if self.total_seconds <= 0:
+            return 0.0
+        return self.total_rows / self.total_seconds
+
+    def is_loading(self) -> bool:
+        return self._position < len(self._pending)
+
+    def start(self, rows: Sequence[object]) -> None:
+        # begin a new load, dropping whatever an older load had left
+        self.cancel()
+        self._pending = list(rows)
+        self._position = 0
+        self._started_at = time.perf_counter()
+
+        # fill the first screenful right away so the list never looks empty
+        self._insert_rows(self._first_screen_rows())
+        if self.is_loading():
+            self._timer.start()
+        else:
+            self._finish()
+
+    def cancel(self) -> None:
+        # stop a pending load without touching rows already inserted
+        self._timer.stop()
+        self._pending = []
+        self._position = 0
+
+    def _first_screen_rows(self) -> int:
+        # rows that fit in the visible viewport
+        if not self._pending:
+            return 0
+        self._insert_rows(1)
+        row_height = self._list_widget.sizeHintForRow(0)
+        if row_height <= 0:
+            return DEFAULT_FIRST_SCREEN_ROWS
+        return self._list_widget.viewport().height() // row_height + 1
+
+    def _insert_rows(self, count: int) -> None:
+        end = min(self._position + count, len(self._pending))
+        for index in range(self._position, end):
+            self._add_row(self._pending[index])
+        self._position = end
+
+    def _insert_slice(self) -> None:
+        # insert rows until the slice budget runs out, then yield to the event loop
+        deadline = time.perf_counter() + SLICE_BUDGET_MS / 1000.0
+        pending = self._pending
+        while self._position < len(pending):
+            self._add_row(pending[self._position])
+            self._position += 1
+            # checking the clock every few rows keeps the overhead negligible
+            if self._position % 16 == 0 and time.perf_counter() >= deadline:
+                break
+
+        if self.is_loading():
+            self._timer.start()
+        else:
+            self._finish()
+
+    def _finish(self) -> None:
+        rows = len(self._pending)
+        elapsed = time.perf_counter() - self._started_at
+        self.total_rows += rows
+        self.total_seconds += elapsed
+        self._pending = []
+        self._position = 0
+        self.finished.emit(rows, rows / elapsed if elapsed > 0 else 0.0)
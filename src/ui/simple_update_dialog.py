@@ -16,6 +16,7 @@ class SimpleUpdateDialog(QDialog):
         super().__init__(parent)
         self.update_info = update_info
         self.downloader = None
+        self._rate_text = ""
         self.setWindowTitle("Actualizacion disponible")
         self.setModal(True)
         self.resize(450, 350)
@@ -89,7 +90,9 @@ class SimpleUpdateDialog(QDialog):
             
             if self.downloader:
                 # connect all signals
+                self.downloader.download_rate.connect(self._on_download_rate)
                 self.downloader.download_progress.connect(self._on_download_progress)
+                self.downloader.patching_started.connect(self._on_patching_started)
                 self.downloader.extraction_started.connect(self._on_extraction_started)
                 self.downloader.installation_started.connect(self._on_installation_started)
                 self.downloader.update_completed.connect(self._on_update_completed)
@@ -110,16 +113,37 @@ class SimpleUpdateDialog(QDialog):
         else:
             QMessageBox.critical(self, "Error", "Actualizador no disponible.")
     
+    def _on_download_rate(self, bytes_per_second: float, eta_seconds: float):
+        # smoothed speed and time left, shown with the next progress update
+        if bytes_per_second <= 0:
+            self._rate_text = ""
+            return
+        self._rate_text = f" - {bytes_per_second / (1024 * 1024):.1f} MB/s"
+        if eta_seconds >= 0:
+            minutes, seconds = divmod(int(eta_seconds + 0.5), 60)
+            self._rate_text += f", quedan {minutes}:{seconds:02d}"
+    
     def _on_download_progress(self, downloaded: int, total: int):
-        # handle download progress updates
+        # handle download progress updates (already throttled by the downloader)
         if total > 0:
+            if self.progress_bar.maximum() == 0:
+                # a failed patch falls back to the full download
+                self.progress_bar.setRange(0, 100)
             progress = int((downloaded / total) * 100)
-            self.progress_bar.setValue(progress)
+            if self.progress_bar.value() != progress:
+                self.progress_bar.setValue(progress)
             
             # format file sizes
             downloaded_mb = downloaded / (1024 * 1024)
             total_mb = total / (1024 * 1024)
-            self.progress_label.setText(f"Descargando: {downloaded_mb:.1f} / {total_mb:.1f} MB ({progress}%)")
+            self.progress_label.setText(
+                f"Descargando: {downloaded_mb:.1f} / {total_mb:.1f} MB ({progress}%){self._rate_text}"
+            )
+    
+    def _on_patching_started(self):
+        # handle delta patch phase
+        self.progress_bar.setRange(0, 0)  # indeterminate progress
+        self.progress_label.setText("Aplicando parche...")
     
     def _on_extraction_started(self):
         # handle extraction phase
@@ -0,0 +1,219 @@
+# asset path resolution and pixmap/icon caching
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from PyQt6.QtCore import QFile, QIODevice, QRectF, QSize, Qt
+from PyQt6.QtGui import QGuiApplication, QIcon, QImage, QPainter, QPixmap, QPixmapCache
+
+# asset configuration
+ASSET_CONFIG = {
+    "disk_cache": os.environ.get("INTEGRA_ASSET_DISK_CACHE", "1") != "0",
+    "pixmap_cache_kb": 16 * 1024,
+    "icon_sizes": (16, 24, 32, 48),
+}
+
+# relative paths of the assets used by the ui
+APP_ICON = "assets/app_icon.ico"
+APP_ICON_FALLBACK = "assets/integra_icon.jpeg"
+DEVELOPER_ICON = "assets/FSakuraIco.jpeg"
+REFRESH_ICON = "utils/refresh-svgrepo-com.svg"
+
+_base_path: Optional[str] = None
+_use_resources: Optional[bool] = None
+_icon_cache: Dict[Tuple[str, float], QIcon] = {}
+_hash_cache: Dict[str, Tuple[float, int, str]] = {}
+
+
+def base_path() -> str:
+    # root folder the assets are resolved against (bundle or src folder)
+    global _base_path
+    if _base_path is None:
+        if getattr(sys, 'frozen', False):
+            # running as pyinstaller bundle
+            _base_path = sys._MEIPASS
+        else:
+            # running in development
+            _base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return _base_path
+
+
+def resources_available() -> bool:
+    # register the compiled qt resource bundle once, if it was built
+    global _use_resources
+    if _use_resources is None:
+        try:
+            import resources_rc  # noqa: F401 - generated by tools/build_resources.py
+            _use_resources = True
+        except ImportError:
+            # development checkout without a compiled bundle
+            _use_resources = False
+    return _use_resources
+
+
+def asset_path(relative: str) -> str:
+    # qt path of an asset such as 'assets/app_icon.ico' (':/' when bundled)
+    if resources_available():
+        return ":/" + relative
+    return os.path.join(base_path(), *relative.split("/"))
+
+
+def asset_exists(relative: str) -> bool:
+    # check whether an asset is available
+    return QFile.exists(asset_path(relative))
+
+
+def read_asset(relative: str) -> bytes:
+    # raw bytes of an asset, from the resource bundle or the filesystem
+    asset = QFile(asset_path(relative))
+    if not asset.open(QIODevice.OpenModeFlag.ReadOnly):
+        raise OSError(f"No se pudo abrir el recurso: {relative}")
+    try:
+        return bytes(asset.readAll())
+    finally:
+        asset.close()
+
+
+def _device_pixel_ratio(dpr: Optional[float]) -> float:
+    # resolve the device pixel ratio to render for
+    if dpr:
+        return float(dpr)
+    app = QGuiApplication.instance()
+    screen = app.primaryScreen() if app else None
+    return float(screen.devicePixelRatio()) if screen else 1.0
+
+
+def _disk_cache_dir() -> Path:
+    # folder holding pre-scaled variants, next to the database
+    from models.database import DEFAULT_DB_PATH
+    return DEFAULT_DB_PATH.parent / "cache" / "assets"
+
+
+def _file_hash(relative: str) -> str:
+    # content hash of an asset, remembered while size and mtime are unchanged
+    if resources_available():
+        # bundled resources cannot change while the app is running
+        stamp = (0.0, 0)
+    else:
+        stat = os.stat(asset_path(relative))
+        stamp = (stat.st_mtime, stat.st_size)
+    cached = _hash_cache.get(relative)
+    if cached and cached[:2] == stamp:
+        return cached[2]
+    digest = hashlib.sha256(read_asset(relative)).hexdigest()[:16]
+    _hash_cache[relative] = (stamp[0], stamp[1], digest)
+    return digest
+
+
+def _rasterize(path: str, width: int, height: int, dpr: float) -> QImage:
+    # decode and scale the source file to the physical pixel size
+    target = QSize(round(width * dpr), round(height * dpr))
+    if path.lower().endswith(".svg"):
+        from PyQt6.QtSvg import QSvgRenderer
+        renderer = QSvgRenderer(path)
+        if not renderer.isValid():
+            return QImage()
+        # keep the svg aspect ratio inside the target box
+        size = renderer.defaultSize().scaled(target, Qt.AspectRatioMode.KeepAspectRatio)
+        image = QImage(size, QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(image)
+        renderer.render(painter, QRectF(0, 0, size.width(), size.height()))
+        painter.end()
+        return image
+
+    image = QImage(path)
+    if image.isNull():
+        return image
+    return image.scaled(
+        target,
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation
+    )
+
+
+def pixmap(relative: str, width: int, height: int, dpr: Optional[float] = None) -> QPixmap:
+    # scaled pixmap of an asset for the given logical size and pixel ratio
+    dpr = _device_pixel_ratio(dpr)
+    key = f"integra:{relative}:{width}x{height}@{dpr:g}"
+
+    cached = QPixmapCache.find(key)
+    if cached is not None and not cached.isNull():
+        return cached
+
+    if not asset_exists(relative):
+        return QPixmap()
+    path = asset_path(relative)
+
+    image = QImage()
+    disk_file = None
+    if ASSET_CONFIG["disk_cache"]:
+        try:
+            disk_file = _disk_cache_dir() / f"{_file_hash(relative)}_{width}x{height}@{dpr:g}.png"
+            if disk_file.exists():
+                image = QImage(str(disk_file))
+        except OSError:
+            disk_file = None
+
+    if image.isNull():
+        image = _rasterize(path, width, height, dpr)
+        if image.isNull():
+            return QPixmap()
+        if disk_file is not None:
+            try:
+                disk_file.parent.mkdir(parents=True, exist_ok=True)
+                image.save(str(disk_file), "PNG")
+            except OSError:
+                pass  # the disk cache is best effort
+
+    result = QPixmap.fromImage(image)
+    result.setDevicePixelRatio(dpr)
+    QPixmapCache.insert(key, result)
+    return result
+
+
+def icon(relative: str, dpr: Optional[float] = None) -> QIcon:
+    # multi-size icon of an asset, built once per pixel ratio
+    dpr = _device_pixel_ratio(dpr)
+    key = (relative, dpr)
+    cached = _icon_cache.get(key)
+    if cached is not None:
+        return cached
+
+    if not asset_exists(relative):
+        return QIcon()
+    path = asset_path(relative)
+
+    if relative.lower().endswith(".ico"):
+        # .ico files already carry their own resolutions
+        result = QIcon(path)
+    else:
+        result = QIcon()
+        for size in ASSET_CONFIG["icon_sizes"]:
+            result.addPixmap(pixmap(relative, size, size, dpr))
+
+    _icon_cache[key] = result
+    return result
+
+
+def app_icon() -> QIcon:
+    # application icon with the jpeg fallback
+    result = icon(APP_ICON)
+    if result.isNull():
+        result = icon(APP_ICON_FALLBACK)
+    return result
+
+
+def preload(assets: Iterable[Tuple[str, int, int]] = ((DEVELOPER_ICON, 80, 80),)) -> None:
+    # rasterize known assets for every connected screen ratio
+    QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), ASSET_CONFIG["pixmap_cache_kb"]))
+    app = QGuiApplication.instance()
+    ratios = {screen.devicePixelRatio() for screen in app.screens()} if app else {1.0}
+    for dpr in ratios or {1.0}:
+        icon(REFRESH_ICON, dpr)
+        for relative, width, height in assets:
+            pixmap(relative, width, height, dpr)
@@ -0,0 +1,244 @@
+# block delta patches between two builds of the executable, never imports PyQt6
+#
+#     make_patch("1.0.9/Integra.exe", "1.0.10/Integra.exe", "patch-1.0.9-1.0.10.delta")
+#     apply_patch(sys.executable, "patch-1.0.9-1.0.10.delta", "staging/Integra.exe")
+#
+# the new file is described as copies of blocks found anywhere in the old file
+# (rsync style rolling checksum, so inserted or removed bytes do not shift
+# every later block out of alignment) plus literal bytes for the rest. a patch
+# names the sha-256 of the file it applies to and of the file it produces, and
+# apply_patch refuses a wrong source and verifies the result.
+#
+# file layout: MAGIC, 4 byte header length, json header, lzma compressed ops
+#   b"C" + offset (8 bytes) + length (4 bytes)   copy from the old file
+#   b"D" + length (4 bytes) + bytes                literal data
+
+from __future__ import annotations
+
+import hashlib
+import json
+import lzma
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+MAGIC = b"INTEGRA-DELTA\x01"
+DEFAULT_BLOCK_SIZE = 4096
+# file extension of patch assets published with a release
+PATCH_SUFFIX = ".delta"
+
+_COPY = struct.Struct(">QI")
+_DATA = struct.Struct(">I")
+_MOD = 1 << 16
+# literal runs are split so a single op never needs a huge buffer
+_MAX_LITERAL = 1 << 20
+_READ_SIZE = 1 << 20
+
+
+class DeltaError(Exception):
+    pass
+
+
+class PatchInfo(NamedTuple):
+    source_sha256: str
+    target_sha256: str
+    target_size: int
+    block_size: int
+
+
+class PatchStats(NamedTuple):
+    info: PatchInfo
+    patch_bytes: int
+    copied_bytes: int
+    literal_bytes: int
+
+
+def patch_name(source_version, target_version) -> str:
+    # asset name of the patch from one release to the next
+    return f"patch-{source_version}-{target_version}{PATCH_SUFFIX}"
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _weak(block: bytes) -> tuple:
+    # rsync weak checksum parts (a, b) of a block
+    a = sum(block) % _MOD
+    b = sum((len(block) - i) * byte for i, byte in enumerate(block)) % _MOD
+    return a, b
+
+
+def _strong(block: bytes) -> bytes:
+    return hashlib.blake2b(block, digest_size=16).digest()
+
+
+def _index_blocks(data: bytes, block_size: int) -> Dict[int, List[tuple]]:
+    # weak checksum -> [(strong hash, offset)] of every whole block of the old file
+    index: Dict[int, List[tuple]] = {}
+    for offset in range(0, len(data) - block_size + 1, block_size):
+        block = data[offset:offset + block_size]
+        a, b = _weak(block)
+        index.setdefault((b << 16) | a, []).append((_strong(block), offset))
+    return index
+
+
+class _OpWriter(object):
+    # encodes ops, merging copies of consecutive old blocks into one
+
+    def __init__(self) -> None:
+        self.ops = bytearray()
+        self.literal = bytearray()
+        self.copy: Optional[List[int]] = None  # [offset, length]
+        self.copied = 0
+        self.literal_total = 0
+
+    def add_copy(self, offset: int, length: int) -> None:
+        self._flush_literal()
+        if self.copy is not None and self.copy[0] + self.copy[1] == offset:
+            self.copy[1] += length
+        else:
+            self._flush_copy()
+            self.copy = [offset, length]
+        self.copied += length
+
+    def add_literal(self, data: bytes) -> None:
+        self._flush_copy()
+        self.literal += data
+        self.literal_total += len(data)
+        if len(self.literal) >= _MAX_LITERAL:
+            self._flush_literal()
+
+    def _flush_copy(self) -> None:
+        if self.copy is not None:
+            self.ops += b"C" + _COPY.pack(*self.copy)
+            self.copy = None
+
+    def _flush_literal(self) -> None:
+        if self.literal:
+            self.ops += b"D" + _DATA.pack(len(self.literal)) + self.literal
+            self.literal = bytearray()
+
+    def finish(self) -> bytes:
+        self._flush_copy()
+        self._flush_literal()
+        return bytes(self.ops)
+
+
+def make_patch(old_path: Path, new_path: Path, patch_path: Path, block_size: int = DEFAULT_BLOCK_SIZE) -> PatchStats:
+    # write a patch that turns old_path into new_path
+    old = Path(old_path).read_bytes()
+    new = Path(new_path).read_bytes()
+    index = _index_blocks(old, block_size)
+    writer = _OpWriter()
+
+    position = 0
+    literal_start = 0
+    end = len(new)
+    a = b = None
+    while position + block_size <= end:
+        if a is None:
+            a, b = _weak(new[position:position + block_size])
+        match = None
+        candidates = index.get((b << 16) | a)
+        if candidates:
+            strong = _strong(new[position:position + block_size])
+            match = next((offset for digest, offset in candidates if digest == strong), None)
+        if match is not None:
+            if literal_start < position:
+                writer.add_literal(new[literal_start:position])
+            writer.add_copy(match, block_size)
+            position += block_size
+            literal_start = position
+            a = None
+            continue
+        # roll the window one byte forward
+        if position + block_size < end:
+            outgoing, incoming = new[position], new[position + block_size]
+            a = (a - outgoing + incoming) % _MOD
+            b = (b - block_size * outgoing + a) % _MOD
+        position += 1
+    if literal_start < end:
+        writer.add_literal(new[literal_start:end])
+
+    info = PatchInfo(
+        source_sha256=hashlib.sha256(old).hexdigest(),
+        target_sha256=hashlib.sha256(new).hexdigest(),
+        target_size=len(new),
+        block_size=block_size,
+    )
+    header = json.dumps(info._asdict()).encode("utf-8")
+    body = lzma.compress(writer.finish(), preset=9)
+    patch_path = Path(patch_path)
+    with open(patch_path, "wb") as f:
+        f.write(MAGIC + _DATA.pack(len(header)) + header + body)
+    return PatchStats(info, patch_path.stat().st_size, writer.copied, writer.literal_total)
+
+
+def read_patch_info(patch_path: Path) -> PatchInfo:
+    with open(patch_path, "rb") as f:
+        return _read_header(f)
+
+
+def _read_header(f) -> PatchInfo:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise DeltaError("El archivo no es un parche de Integra")
+    (length,) = _DATA.unpack(f.read(_DATA.size))
+    try:
+        return PatchInfo(**json.loads(f.read(length).decode("utf-8")))
+    except (ValueError, TypeError) as e:
+        raise DeltaError(f"Cabecera de parche no valida: {e}") from None
+
+
+def apply_patch(source_path: Path, patch_path: Path, output_path: Path) -> PatchInfo:
+    # rebuild the new file at output_path from source_path and a patch; the
+    # output only appears once its sha-256 matches the one in the patch
+    source_path, output_path = Path(source_path), Path(output_path)
+    with open(patch_path, "rb") as f:
+        info = _read_header(f)
+        compressed = f.read()
+    if _sha256_file(source_path) != info.source_sha256:
+        raise DeltaError("El parche no corresponde a la version instalada")
+    try:
+        ops = memoryview(lzma.decompress(compressed))
+    except lzma.LZMAError as e:
+        raise DeltaError(f"Parche danado: {e}") from None
+
+    temp = output_path.with_name(output_path.name + ".tmp")
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(source_path, "rb") as source, open(temp, "wb") as out:
+            position = 0
+            while position < len(ops):
+                kind = bytes(ops[position:position + 1])
+                position += 1
+                if kind == b"C":
+                    offset, length = _COPY.unpack_from(ops, position)
+                    position += _COPY.size
+                    source.seek(offset)
+                    chunk = source.read(length)
+                    if len(chunk) != length:
+                        raise DeltaError("El parche copia fuera del archivo original")
+                elif kind == b"D":
+                    (length,) = _DATA.unpack_from(ops, position)
+                    position += _DATA.size
+                    chunk = ops[position:position + length]
+                    position += length
+                else:
+                    raise DeltaError("Operacion de parche desconocida")
+                out.write(chunk)
+                digest.update(chunk)
+                written += len(chunk)
+        if written != info.target_size or digest.hexdigest() != info.target_sha256:
+            raise DeltaError("El resultado del parche no coincide con la nueva version")
+        os.replace(temp, output_path)
+    finally:
+        if temp.exists():
+            temp.unlink()
+    return info
@@ -0,0 +1,297 @@
+# performance diagnostics collection and export
+from __future__ import annotations
+
+import json
+import math
+import os
+import platform
+import sys
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# process start reference for startup phase timings
+_process_start = time.perf_counter()
+_startup_phases: List[tuple] = []
+
+# sqlite pragmas shown in the diagnostics panel
+PRAGMAS = (
+    "journal_mode", "synchronous", "page_size", "cache_size", "temp_store",
+    "mmap_size", "auto_vacuum", "foreign_keys", "busy_timeout", "user_version",
+)
+
+
+def mark_phase(name: str) -> None:
+    # record the time (ms since start) a startup phase finished
+    _startup_phases.append((name, (time.perf_counter() - _process_start) * 1000.0))
+
+
+def startup_phases() -> List[dict]:
+    # phases with their own duration and the cumulative time
+    result = []
+    previous = 0.0
+    for name, at_ms in _startup_phases:
+        result.append({"phase": name, "ms": at_ms - previous, "at_ms": at_ms})
+        previous = at_ms
+    return result
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    # nearest-rank percentile, 0 when there are no samples
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def process_rss() -> Optional[int]:
+    # resident set size of this process in bytes
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return int(counters.WorkingSetSize)
+        except Exception:
+            return None
+        return None
+
+    try:
+        import resource
+        # peak rss: kilobytes on linux, bytes on macos
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None
+
+
+def _file_size(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return None
+
+
+def database_info() -> dict:
+    # file sizes, page usage, pragmas, row counts and index usage
+    from models.database import database_path, get_engine
+    from models.instrumentation import operation, snapshot
+
+    db_path = database_path()
+    info: Dict[str, object] = {
+        "path": str(db_path),
+        "file_bytes": _file_size(db_path),
+        "wal_bytes": _file_size(Path(f"{db_path}-wal")),
+    }
+
+    with operation("diagnostics"), get_engine().connect() as conn:
+        info["page_count"] = conn.exec_driver_sql("PRAGMA page_count").scalar()
+        info["freelist_count"] = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        info["pragmas"] = {
+            name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in PRAGMAS
+        }
+
+        tables = [row[0] for row in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        info["row_counts"] = {
+            table: conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{table}"').scalar() for table in tables
+        }
+
+        indexes = {row[0]: row[1] for row in conn.exec_driver_sql(
+            "SELECT name, tbl_name FROM sqlite_master WHERE type = 'index' ORDER BY name"
+        )}
+
+        # sqlite keeps no per-index counters, so explain the busiest statements
+        # seen by the instrumentation and count which indexes their plans use
+        usage = {name: 0 for name in indexes}
+        full_scans = 0
+        statements = sorted(snapshot()["statements"].items(),
+                            key=lambda item: item[1]["total_ms"], reverse=True)
+        for statement, values in statements[:25]:
+            if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+            try:
+                plan = [str(row[-1]) for row in conn.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + statement, tuple([None] * statement.count("?"))
+                )]
+            except Exception:
+                continue
+            for step in plan:
+                if step.startswith("SCAN") and "INDEX" not in step:
+                    full_scans += int(values["count"])
+                for name in indexes:
+                    if f"INDEX {name}" in step:
+                        usage[name] += int(values["count"])
+        info["indexes"] = [
+            {"name": name, "table": table, "uses": usage[name]} for name, table in indexes.items()
+        ]
+        info["full_scan_executions"] = full_scans
+    return info
+
+
+def operation_latencies() -> Dict[str, dict]:
+    # controller operation latency percentiles from the instrumentation
+    from models.instrumentation import snapshot
+
+    data = snapshot()
+    result = {}
+    for name, samples in data["latencies"].items():
+        values = data["operations"].get(name, {})
+        result[name] = {
+            "calls": values.get("calls", 0),
+            "queries": values.get("queries", 0),
+            "p50_ms": percentile(samples, 50),
+            "p95_ms": percentile(samples, 95),
+            "p99_ms": percentile(samples, 99),
+            "max_ms": values.get("max_ms", 0.0),
+        }
+    return result
+
+
+def collect(slow_query_limit: int = 10) -> dict:
+    # full diagnostics report as plain data
+    from models.instrumentation import snapshot
+    from utils.version import CURRENT_VERSION
+
+    queries = snapshot()
+    report: Dict[str, object] = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "version": str(CURRENT_VERSION),
+        "platform": platform.platform(),
+        "python": sys.version.split()[0],
+        "frozen": bool(getattr(sys, "frozen", False)),
+        "process_rss_bytes": process_rss(),
+        "startup_phases": startup_phases(),
+        "operations": operation_latencies(),
+        "queries": {
+            "total": queries["total_queries"],
+            "total_ms": queries["total_ms"],
+            "rows": queries["total_rows"],
+            "n_plus_one": queries["n_plus_one"],
+        },
+        "slow_queries": queries["slow_queries"][-slow_query_limit:],
+    }
+    try:
+        report["database"] = database_info()
+    except Exception as e:
+        report["database"] = {"error": str(e)}
+
+    try:
+        from utils.watchdog import get_watchdog
+        watchdog = get_watchdog()
+        report["ui_stalls"] = watchdog.snapshot() if watchdog else None
+    except ImportError:
+        report["ui_stalls"] = None
+    return report
+
+
+def _fmt_bytes(value: Optional[int]) -> str:
+    if value is None:
+        return "-"
+    if value < 1024 * 1024:
+        return f"{value / 1024:.1f} KB"
+    return f"{value / (1024 * 1024):.1f} MB"
+
+
+def format_report(report: dict) -> str:
+    # human readable text version of a report
+    lines = [
+        f"Integra {report['version']} - {report['generated_at']}",
+        f"{report['platform']} / Python {report['python']}{' (empaquetado)' if report['frozen'] else ''}",
+        f"Memoria del proceso (RSS): {_fmt_bytes(report['process_rss_bytes'])}",
+        "",
+        "== Base de datos ==",
+    ]
+    db = report.get("database") or {}
+    if "error" in db:
+        lines.append(f"Error: {db['error']}")
+    else:
+        lines += [
+            f"Archivo: {db['path']}",
+            f"Tamaño: {_fmt_bytes(db['file_bytes'])}   WAL: {_fmt_bytes(db['wal_bytes'])}",
+            f"Paginas: {db['page_count']}   Libres: {db['freelist_count']}",
+            "Pragmas: " + ", ".join(f"{key}={value}" for key, value in db["pragmas"].items()),
+            "Filas: " + ", ".join(f"{key}={value}" for key, value in db["row_counts"].items()),
+            f"Ejecuciones con recorrido completo: {db['full_scan_executions']}",
+        ]
+        for index in db["indexes"]:
+            lines.append(f"  indice {index['name']} ({index['table']}): {index['uses']} usos")
+
+    lines += ["", "== Operaciones (ms) =="]
+    for name, values in sorted(report["operations"].items()):
+        lines.append(
+            f"{name:<22} n={values['calls']:<5} p50={values['p50_ms']:7.1f} p95={values['p95_ms']:7.1f} "
+            f"p99={values['p99_ms']:7.1f} max={values['max_ms']:7.1f} consultas={values['queries']}"
+        )
+
+    lines += ["", "== Arranque (ms) =="]
+    for phase in report["startup_phases"]:
+        lines.append(f"{phase['phase']:<22} {phase['ms']:8.1f}   (acumulado {phase['at_ms']:8.1f})")
+
+    queries = report["queries"]
+    lines += ["", "== Consultas ==",
+              f"Total: {queries['total']}   Tiempo: {queries['total_ms']:.1f} ms   Filas: {queries['rows']}"]
+    for item in queries["n_plus_one"]:
+        lines.append(f"  posible N+1 en {item['operation']}: {item['count']}x {item['statement'][:80]}")
+
+    lines += ["", f"== Ultimas {len(report['slow_queries'])} consultas lentas =="]
+    for item in report["slow_queries"]:
+        lines.append(f"{item['elapsed_ms']:8.1f} ms  [{item['operation'] or '-'}]  {' '.join(item['statement'].split())[:120]}")
+        for step in item["plan"]:
+            lines.append(f"            {step}")
+
+    stalls = report.get("ui_stalls")
+    if stalls:
+        lines += ["", "== Bloqueos de la interfaz ==",
+                  f"Total: {stalls['stalls']}   Maximo: {stalls['longest_ms']:.0f} ms   Umbral: {stalls['threshold_ms']:.0f} ms",
+                  "Histograma: " + ", ".join(f"{key}: {value}" for key, value in stalls["histogram"].items())]
+    return "\n".join(lines)
+
+
+def export_bundle(destination: str, report: Optional[dict] = None) -> str:
+    # zip with the report (json and text) and the local performance logs
+    # the database itself is never included, it holds client data
+    from models.database import DEFAULT_DB_PATH
+    from utils import tracing
+
+    report = report or collect()
+    tracing.save()  # the session so far, into the logs folder
+    logs_dir = DEFAULT_DB_PATH.parent / "logs"
+    with zipfile.ZipFile(destination, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        bundle.writestr("diagnostics.json", json.dumps(report, indent=2, default=str))
+        bundle.writestr("diagnostics.txt", format_report(report))
+        if logs_dir.is_dir():
+            for log_file in sorted(logs_dir.iterdir()):
+                if log_file.is_file():
+                    bundle.write(log_file, os.path.join("logs", log_file.name))
+    return destination
@@ -0,0 +1,408 @@
+# resumable http downloads for updates, never imports PyQt6
+#
+# the file is written to '<destination>.part' and resumed with a Range request
+# after a dropped connection or a restart of the application; the sha-256 is
+# checked before the file is moved into place. a single stream hashes the bytes
+# as they arrive, a segmented download (several connections, one byte range
+# each) hashes the finished file since ranges complete out of order
+
+from __future__ import annotations
+
+import hashlib
+import http.client
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional
+
+from utils.version import UPDATE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CONFIG = {
+    # bytes read from the socket and written per iteration
+    "chunk_size": int(os.environ.get("INTEGRA_DOWNLOAD_CHUNK", str(64 * 1024))),
+    # seconds to wait for the connection or for the next chunk
+    "timeout": float(os.environ.get("INTEGRA_DOWNLOAD_TIMEOUT", "15")),
+    # consecutive failed attempts without new bytes before giving up
+    "retries": int(os.environ.get("INTEGRA_DOWNLOAD_RETRIES", "5")),
+    # first wait between attempts in seconds, doubled on every retry
+    "backoff": float(os.environ.get("INTEGRA_DOWNLOAD_BACKOFF", "1")),
+    # parallel connections for servers that support byte ranges, 1 to stream
+    "connections": int(os.environ.get("INTEGRA_DOWNLOAD_CONNECTIONS", "4")),
+    # connections for updates fetched in the background while the app is in use
+    "background_connections": int(os.environ.get("INTEGRA_DOWNLOAD_BACKGROUND_CONNECTIONS", "1")),
+    # files are only split into ranges of at least this size
+    "min_segment": int(os.environ.get("INTEGRA_DOWNLOAD_MIN_SEGMENT", str(1024 * 1024))),
+    # partial and finished downloads survive restarts here
+    "directory": Path(os.environ.get("INTEGRA_DOWNLOAD_DIR", Path(tempfile.gettempdir()) / "integra_updates")),
+}
+
+# bytes_downloaded, total_bytes (0 when the server does not say)
+ProgressCallback = Callable[[int, int], None]
+
+# errors worth another attempt: dropped connections, timeouts, truncated bodies
+TRANSIENT_ERRORS = (urllib.error.URLError, socket.timeout, ConnectionError, http.client.HTTPException, TimeoutError)
+
+
+class DownloadError(Exception):
+    pass
+
+
+class ChecksumMismatchError(DownloadError):
+
+    def __init__(self, expected: str, actual: str) -> None:
+        super().__init__(f"La suma SHA-256 no coincide (esperada {expected}, obtenida {actual})")
+        self.expected = expected
+        self.actual = actual
+
+
+class DownloadCancelled(DownloadError):
+
+    def __init__(self) -> None:
+        super().__init__("Descarga cancelada")
+
+
+class DownloadResult(NamedTuple):
+    path: Path
+    size: int
+    sha256: str
+    # bytes that were already on disk from an earlier attempt
+    resumed_from: int
+    attempts: int
+
+
+class _PartialFile(object):
+    # '<destination>.part' plus a json sidecar with the validators of the
+    # response it came from, so a changed file on the server is not resumed
+
+    def __init__(self, destination: Path) -> None:
+        self.path = destination.with_name(destination.name + ".part")
+        self.meta_path = destination.with_name(destination.name + ".part.json")
+
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def load_meta(self, url: str) -> dict:
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return meta if meta.get("url") == url else {}
+
+    def save_meta(self, meta: dict) -> None:
+        self.meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+    def discard(self) -> None:
+        for path in (self.path, self.meta_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _sha256_of(path: Path, chunk_size: int):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest
+
+
+def _total_from(response, offset: int) -> int:
+    # full size of the resource from Content-Range or Content-Length
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    length = response.headers.get("Content-Length")
+    return offset + int(length) if length is not None else 0
+
+
+class _Options(NamedTuple):
+    chunk_size: int
+    timeout: float
+    retries: int
+    backoff: float
+
+
+class _ServerChanged(DownloadError):
+    # the server stopped honouring ranges for a partly fetched file
+
+    def __init__(self) -> None:
+        super().__init__("El archivo ha cambiado en el servidor durante la descarga")
+
+
+def _request(url: str, headers: Optional[dict] = None) -> urllib.request.Request:
+    return urllib.request.Request(url, headers={"User-Agent": UPDATE_CONFIG["user_agent"], **(headers or {})})
+
+
+def download(
+    url: str,
+    destination: Path,
+    expected_sha256: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+    connections: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    backoff: Optional[float] = None,
+) -> DownloadResult:
+    # download `url` to `destination`, resuming a partial file left by an
+    # earlier call; with several connections the file is fetched as parallel
+    # byte ranges when the server supports them, otherwise as one stream.
+    # raises DownloadError when it cannot be completed
+    options = _Options(
+        chunk_size or DOWNLOAD_CONFIG["chunk_size"],
+        timeout or DOWNLOAD_CONFIG["timeout"],
+        DOWNLOAD_CONFIG["retries"] if retries is None else retries,
+        DOWNLOAD_CONFIG["backoff"] if backoff is None else backoff,
+    )
+    connections = connections or DOWNLOAD_CONFIG["connections"]
+    expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    if expected_sha256 and destination.exists():
+        # finished by an earlier run, e.g. an update staged but not installed
+        if _sha256_of(destination, options.chunk_size).hexdigest() == expected_sha256:
+            size = destination.stat().st_size
+            return DownloadResult(destination, size, expected_sha256, size, 0)
+    partial = _PartialFile(destination)
+    meta = partial.load_meta(url)
+    if not meta:
+        partial.discard()
+
+    # a segmented partial file is finished segmented, a streamed one streamed
+    if meta.get("segments") or (connections > 1 and not partial.size()):
+        if not meta.get("segments"):
+            meta = _probe(url, options)
+            meta["segments"] = _plan_segments(meta.get("total", 0), connections) if meta.get("ranges") else None
+        if meta["segments"]:
+            try:
+                return _download_segments(url, destination, partial, meta, expected_sha256,
+                                          progress, cancelled, connections, options)
+            except _ServerChanged:
+                logger.info("%s changed on the server, restarting the download", url)
+                partial.discard()
+        meta = {}
+    return _download_stream(url, destination, partial, meta, expected_sha256, progress, cancelled, options)
+
+
+def _finish(destination: Path, partial: _PartialFile, actual: str, expected_sha256: Optional[str]) -> None:
+    if expected_sha256 and actual != expected_sha256:
+        # a corrupt partial file must not be resumed again
+        partial.discard()
+        raise ChecksumMismatchError(expected_sha256, actual)
+    os.replace(partial.path, destination)
+    partial.discard()
+
+
+def _download_stream(url, destination, partial, meta, expected_sha256, progress, cancelled, options) -> DownloadResult:
+    # one connection, appending to the partial file from where it stopped
+    resumed_from = partial.size()
+    # hashlib state cannot be saved, so resuming re-reads the local bytes
+    digest = _sha256_of(partial.path, options.chunk_size) if resumed_from else hashlib.sha256()
+    offset = resumed_from
+    total = meta.get("total", 0)
+
+    attempts = 0
+    failures = 0
+    # furthest offset reached, a restart from zero only counts as progress past it
+    furthest = offset
+    while True:
+        attempts += 1
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            # only resume if the file on the server is still the same one
+            validator = meta.get("etag") or meta.get("last_modified")
+            if validator:
+                headers["If-Range"] = validator
+        try:
+            with urllib.request.urlopen(_request(url, headers), timeout=options.timeout) as response:
+                if offset and response.status != 206:
+                    # range ignored or the file changed: start over
+                    logger.info("server did not resume %s at %d, restarting", url, offset)
+                    partial.discard()
+                    offset, digest = 0, hashlib.sha256()
+                total = _total_from(response, offset)
+                meta = {
+                    "url": url,
+                    "total": total,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                partial.save_meta(meta)
+                with open(partial.path, "ab") as f:
+                    while True:
+                        if cancelled is not None and cancelled():
+                            raise DownloadCancelled()
+                        block = response.read(options.chunk_size)
+                        if not block:
+                            break
+                        f.write(block)
+                        digest.update(block)
+                        offset += len(block)
+                        if progress is not None:
+                            progress(offset, total)
+            if total and offset < total:
+                raise http.client.IncompleteRead(b"", total - offset)
+            break
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset and offset == total:
+                break  # the partial file was already complete
+            if e.code == 416:
+                partial.discard()
+                offset, digest, meta = 0, hashlib.sha256(), {}
+            elif e.code < 500 and e.code != 408:
+                raise DownloadError(f"Error HTTP {e.code} al descargar {url}") from e
+            error: Exception = e
+        except TRANSIENT_ERRORS as e:
+            error = e
+        failures = 0 if offset > furthest else failures + 1
+        furthest = max(furthest, offset)
+        if failures > options.retries:
+            raise DownloadError(f"No se ha podido completar la descarga tras {attempts} intentos: {error}") from error
+        logger.warning("download of %s interrupted at %d bytes (%s), retrying", url, offset, error)
+        time.sleep(options.backoff * 2 ** max(failures - 1, 0))
+
+    actual = digest.hexdigest()
+    _finish(destination, partial, actual, expected_sha256)
+    return DownloadResult(destination, offset, actual, resumed_from, attempts)
+
+
+def _probe(url: str, options: _Options) -> dict:
+    # size, validators and range support from a one byte ranged request
+    # (HEAD is not used: urllib turns it into GET when following a redirect)
+    try:
+        # the body is never read, a server ignoring the range would send all of it
+        with urllib.request.urlopen(_request(url, {"Range": "bytes=0-0"}), timeout=options.timeout) as response:
+            return {
+                "url": url,
+                "total": _total_from(response, 0) if response.status == 206 else 0,
+                "ranges": response.status == 206,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+    except (urllib.error.HTTPError, *TRANSIENT_ERRORS) as e:
+        # the single stream has its own retries
+        logger.warning("could not probe %s for ranges: %s", url, e)
+        return {}
+
+
+def _plan_segments(total: int, connections: int) -> Optional[List[List[int]]]:
+    # [start, end, bytes done] per connection, None when not worth splitting
+    count = min(connections, total // DOWNLOAD_CONFIG["min_segment"])
+    if count < 2:
+        return None
+    size = -(-total // count)
+    return [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+
+
+def _download_segments(url, destination, partial, meta, expected_sha256, progress, cancelled,
+                       connections, options) -> DownloadResult:
+    # every segment on its own connection, written at its offset of a file
+    # preallocated to the full size; progress of each segment is kept in the
+    # sidecar so an interrupted download resumes every range where it stopped
+    total = meta["total"]
+    segments = meta["segments"]
+    resumed_from = sum(segment[2] for segment in segments)
+    with open(partial.path, "ab") as f:
+        if f.tell() != total:
+            f.truncate(total)
+    partial.save_meta(meta)
+
+    lock = threading.Lock()
+    stop = threading.Event()
+    downloaded = [resumed_from]
+
+    def report(count: int) -> None:
+        with lock:
+            downloaded[0] += count
+            done = downloaded[0]
+        if progress is not None:
+            progress(done, total)
+
+    def should_stop() -> bool:
+        return stop.is_set() or (cancelled is not None and cancelled())
+
+    validator = meta.get("etag") or meta.get("last_modified")
+    pending = [segment for segment in segments if segment[0] + segment[2] <= segment[1]]
+    attempts = 0
+    try:
+        if pending:
+            workers = min(connections, len(pending))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="integra-download") as pool:
+                futures = [
+                    pool.submit(_fetch_segment, url, partial.path, segment, validator, report, should_stop, options)
+                    for segment in pending
+                ]
+                for future in as_completed(futures):
+                    try:
+                        attempts += future.result()
+                    except BaseException:
+                        # the other connections stop at their next chunk
+                        stop.set()
+                        raise
+    finally:
+        partial.save_meta(meta)
+
+    actual = _sha256_of(partial.path, options.chunk_size).hexdigest()
+    _finish(destination, partial, actual, expected_sha256)
+    return DownloadResult(destination, total, actual, resumed_from, attempts)
+
+
+def _fetch_segment(url, path, segment, validator, report, should_stop, options) -> int:
+    # fetch the byte range segment[0]..segment[1] into place, retrying from
+    # where the last attempt stopped; returns the number of attempts
+    start, end = segment[0], segment[1]
+    attempts = 0
+    failures = 0
+    with open(path, "r+b") as f:
+        while start + segment[2] <= end:
+            attempts += 1
+            before = segment[2]
+            headers = {"Range": f"bytes={start + segment[2]}-{end}"}
+            if validator:
+                headers["If-Range"] = validator
+            try:
+                with urllib.request.urlopen(_request(url, headers), timeout=options.timeout) as response:
+                    if response.status != 206:
+                        raise _ServerChanged()
+                    f.seek(start + segment[2])
+                    while start + segment[2] <= end:
+                        if should_stop():
+                            raise DownloadCancelled()
+                        block = response.read(min(options.chunk_size, end - start - segment[2] + 1))
+                        if not block:
+                            break
+                        f.write(block)
+                        segment[2] += len(block)
+                        report(len(block))
+                if start + segment[2] <= end:
+                    raise http.client.IncompleteRead(b"", end - start - segment[2] + 1)
+                continue
+            except urllib.error.HTTPError as e:
+                if e.code < 500 and e.code != 408:
+                    raise DownloadError(f"Error HTTP {e.code} al descargar {url}") from e
+                error: Exception = e
+            except TRANSIENT_ERRORS as e:
+                error = e
+            failures = 0 if segment[2] > before else failures + 1
+            if failures > options.retries:
+                raise DownloadError(f"No se ha podido completar la descarga tras {attempts} intentos: {error}") from error
+            logger.warning("range %d-%d of %s interrupted (%s), retrying", start, end, url, error)
+            time.sleep(options.backoff * 2 ** max(failures - 1, 0))
+    return attempts
@@ -0,0 +1,101 @@
+# rate limited progress reporting with smoothed throughput and eta
+#
+#     throttle = ProgressThrottle(lambda p: print(p.done, p.bytes_per_second, p.eta_seconds))
+#     download(url, path, progress=throttle)
+#     throttle.finish()
+#
+# downloads report every chunk, often from several threads; the throttle
+# forwards at most `max_rate` updates per second and only when the transfer
+# moved by `min_step` of the total (or a second went by, so speed and eta
+# keep moving on slow lines)
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+
+class TransferProgress(NamedTuple):
+    done: int
+    total: int  # 0 when unknown
+    # exponentially weighted average, 0.0 until there are two samples
+    bytes_per_second: float
+    # None when the total or the speed is unknown
+    eta_seconds: Optional[float]
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.total if self.total else 0.0
+
+
+class ProgressThrottle(object):
+
+    def __init__(
+        self,
+        callback: Callable[[TransferProgress], None],
+        max_rate: float = 20.0,
+        min_step: float = 0.01,
+        smoothing: float = 0.3,
+        heartbeat: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.callback = callback
+        self.interval = 1.0 / max_rate
+        self.min_step = min_step
+        # weight of the newest speed sample in the average
+        self.smoothing = smoothing
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self.emitted = 0
+        self.received = 0
+        self._lock = threading.Lock()
+        self._speed = 0.0
+        self._sample: Optional[tuple] = None  # (time, done) of the last speed sample
+        self._last_emit_time = float("-inf")
+        self._last_emit_done = -1
+        self._latest = (0, 0)
+
+    def __call__(self, done: int, total: int) -> None:
+        with self._lock:
+            self.received += 1
+            self._latest = (done, total)
+            now = self.clock()
+            self._update_speed(now, done)
+            elapsed = now - self._last_emit_time
+            if elapsed < self.interval:
+                return
+            moved = done - self._last_emit_done
+            if total and moved < self.min_step * total and elapsed < self.heartbeat:
+                return
+            progress = self._snapshot(now)
+        self.callback(progress)
+
+    def finish(self) -> None:
+        # forward the latest values even if they would be throttled
+        with self._lock:
+            if self._latest[0] == self._last_emit_done:
+                return
+            progress = self._snapshot(self.clock())
+        self.callback(progress)
+
+    def _update_speed(self, now: float, done: int) -> None:
+        if self._sample is None:
+            # a resumed download starts counting from what was already on disk
+            self._sample = (now, done)
+            return
+        sample_time, sample_done = self._sample
+        # very short windows give noisy samples, wait for a tenth of a second
+        if now - sample_time < 0.1:
+            return
+        instant = (done - sample_done) / (now - sample_time)
+        self._speed = instant if self._speed == 0.0 else self.smoothing * instant + (1 - self.smoothing) * self._speed
+        self._sample = (now, done)
+
+    def _snapshot(self, now: float) -> TransferProgress:
+        done, total = self._latest
+        eta = (total - done) / self._speed if total and self._speed > 0 else None
+        self._last_emit_time = now
+        self._last_emit_done = done
+        self.emitted += 1
+        return TransferProgress(done, total, self._speed, eta)
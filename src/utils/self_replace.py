@@ -0,0 +1,337 @@
+# swaps a staged update into place once the running app has exited, never
+# imports PyQt6
+#
+# the app writes a job file, holds its exit lock, starts a helper process
+# (`<app> --apply-update <job>`) and quits. the helper waits for the exit
+# handshake, keeps the current install as a rollback copy, moves the staged
+# one into place with os.replace and starts it. if the new version exits
+# before confirming its start (confirm_started), the rollback copy is put
+# back and the old version is started instead.
+#
+# exit is noticed as it happens instead of after fixed sleeps: on posix the
+# app holds an flock on the job's lock file, which the kernel drops when the
+# process ends; on windows the helper waits on the process handle.
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+APPLY_FLAG = "--apply-update"
+# set by the helper for the new version, see confirm_started()
+CONFIRM_ENV = "INTEGRA_UPDATE_CONFIRM"
+
+SELF_REPLACE_CONFIG = {
+    # the helper waits as long as the app's process is alive (a dialog may
+    # still be open); this is how long it then waits for the exit lock
+    "exit_timeout": float(os.environ.get("INTEGRA_UPDATE_EXIT_TIMEOUT", "60")),
+    # seconds the new version has to confirm it started before it is trusted
+    "confirm_timeout": float(os.environ.get("INTEGRA_UPDATE_CONFIRM_TIMEOUT", "30")),
+    "poll_interval": 0.02,
+}
+
+# project root with integra.py, for running the helper from source
+APP_DIR = Path(__file__).resolve().parents[2]
+
+# open lock file of the running app, released by the os when it exits
+_exit_lock = None
+
+
+class UpdateJob(NamedTuple):
+    pid: int
+    lock_path: str
+    # new install (file or bundle folder) and the one it replaces
+    staged: str
+    target: str
+    backup: str
+    # command starting the installed app afterwards, empty to not restart
+    restart: List[str]
+    # written by the new version once it is up
+    confirm_path: str
+
+    def save(self, path: Path) -> None:
+        Path(path).write_text(json.dumps(self._asdict(), indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> "UpdateJob":
+        return cls(**json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def is_apply_invocation(argv: List[str]) -> bool:
+    return APPLY_FLAG in argv
+
+
+def hold_exit_lock(lock_path: Path) -> None:
+    # take the lock the helper waits on; it stays held until this process exits
+    global _exit_lock
+    if _exit_lock is not None or os.name == "nt":
+        return  # windows waits on the process handle instead
+    import fcntl
+    _exit_lock = open(lock_path, "a+")
+    fcntl.flock(_exit_lock.fileno(), fcntl.LOCK_EX)
+
+
+def prepare(staged: Path, target: Path, restart: List[str], workdir: Path) -> Path:
+    # write the job for a helper and take the exit lock; returns the job path
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    target = Path(target)
+    job = UpdateJob(
+        pid=os.getpid(),
+        lock_path=str(workdir / "update.lock"),
+        staged=str(staged),
+        target=str(target),
+        backup=str(target.with_name(target.name + ".backup")),
+        restart=list(restart),
+        confirm_path=str(workdir / "update.confirmed"),
+    )
+    job_path = workdir / "update_job.json"
+    job.save(job_path)
+    hold_exit_lock(Path(job.lock_path))
+    return job_path
+
+
+def helper_command(job_path: Path) -> List[str]:
+    # how to run the helper: a frozen build runs the installed executable
+    # (a staged one cannot start without the rest of its bundle), from
+    # source it is integra.py
+    if getattr(sys, "frozen", False):
+        return [sys.executable, APPLY_FLAG, str(job_path)]
+    return [sys.executable, str(APP_DIR / "integra.py"), APPLY_FLAG, str(job_path)]
+
+
+def _spawn(command: List[str], env: Optional[dict] = None) -> subprocess.Popen:
+    # start a process that outlives this one
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    return subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        close_fds=True,
+        env=env,
+        **kwargs,
+    )
+
+
+def launch_helper(job_path: Path) -> subprocess.Popen:
+    return _spawn(helper_command(job_path))
+
+
+def process_alive(pid: int) -> bool:
+    # true while a process with this pid is running
+    if os.name == "nt":
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def wait_for_exit(job: UpdateJob, timeout: float) -> bool:
+    # true once the app that wrote the job has exited. there is no limit while
+    # its process is alive; timeout only applies to a lock that is still held
+    # after the process is gone
+    if os.name == "nt":
+        return _wait_for_pid_windows(job.pid)
+    import fcntl
+    deadline = None
+    with open(job.lock_path, "a+") as lock:
+        while True:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+                return True
+            except BlockingIOError:
+                pass
+            if process_alive(job.pid):
+                deadline = None
+            elif deadline is None:
+                deadline = time.monotonic() + timeout
+            elif time.monotonic() >= deadline:
+                return False
+            time.sleep(SELF_REPLACE_CONFIG["poll_interval"])
+
+
+def _wait_for_pid_windows(pid: int) -> bool:
+    import ctypes
+    SYNCHRONIZE = 0x00100000
+    WAIT_OBJECT_0 = 0
+    INFINITE = 0xFFFFFFFF
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(SYNCHRONIZE, False, pid)
+    if not handle:
+        return True  # already gone
+    try:
+        return kernel32.WaitForSingleObject(handle, INFINITE) == WAIT_OBJECT_0
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    elif path.exists() or path.is_symlink():
+        path.unlink()
+
+
+def swap(staged: Path, target: Path, backup: Path) -> None:
+    # put the staged install at target, keeping the current one at backup
+    staged, target, backup = Path(staged), Path(target), Path(backup)
+    _remove(backup)
+    if staged.is_dir():
+        # a folder cannot be renamed over a non-empty one, so the bundle is
+        # moved aside first; if the new one cannot follow it is moved back
+        if target.exists():
+            os.replace(target, backup)
+        try:
+            _move(staged, target)
+        except OSError:
+            if backup.exists():
+                os.replace(backup, target)
+            raise
+        return
+
+    # files are copied next to the target first, so the final rename stays on
+    # one filesystem and is atomic
+    incoming = target.with_name(target.name + ".new")
+    shutil.copy2(staged, incoming)
+    if not target.exists():
+        os.replace(incoming, target)
+        return
+    # keep the permissions of the installed file (e.g. the executable bit)
+    shutil.copymode(target, incoming)
+    if os.name == "nt":
+        # windows cannot replace an executable that is running (the helper
+        # itself) but can rename it out of the way
+        os.replace(target, backup)
+        try:
+            os.replace(incoming, target)
+        except OSError:
+            os.replace(backup, target)
+            raise
+        return
+    os.link(target, backup)  # the target never goes missing
+    os.replace(incoming, target)
+
+
+def _move(source: Path, destination: Path) -> None:
+    try:
+        os.replace(source, destination)
+    except OSError:
+        # different filesystems: copy next to the destination, then rename
+        incoming = destination.with_name(destination.name + ".new")
+        _remove(incoming)
+        shutil.copytree(source, incoming, symlinks=True)
+        os.replace(incoming, destination)
+        shutil.rmtree(source, ignore_errors=True)
+
+
+def rollback(target: Path, backup: Path) -> None:
+    # put the previous install back
+    target, backup = Path(target), Path(backup)
+    if not backup.exists():
+        raise FileNotFoundError(f"No hay copia de seguridad en {backup}")
+    if backup.is_dir():
+        _remove(target)
+    os.replace(backup, target)
+
+
+def confirm_started() -> None:
+    # called by the app once it is up; tells the helper the new version works
+    path = os.environ.pop(CONFIRM_ENV, None)
+    if path:
+        try:
+            Path(path).write_text(str(os.getpid()), encoding="utf-8")
+        except OSError as e:
+            logger.warning("could not confirm the update: %s", e)
+
+
+def _wait_for_confirm(process: subprocess.Popen, confirm_path: Path, timeout: float) -> bool:
+    # false only if the new version exited without confirming
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if confirm_path.exists():
+            return True
+        if process.poll() is not None:
+            return confirm_path.exists()
+        time.sleep(SELF_REPLACE_CONFIG["poll_interval"] * 5)
+    # still running: a slow start is not a failed one
+    return True
+
+
+def apply(job: UpdateJob) -> int:
+    # the helper's work; returns a process exit code
+    if not wait_for_exit(job, SELF_REPLACE_CONFIG["exit_timeout"]):
+        logger.error("exit lock of process %d still held after it ended, update not applied", job.pid)
+        return 2
+    started = time.monotonic()
+    swap(Path(job.staged), Path(job.target), Path(job.backup))
+    logger.info("installed %s in %.3f s after exit", job.target, time.monotonic() - started)
+    if not job.restart:
+        return 0
+
+    confirm_path = Path(job.confirm_path)
+    _remove(confirm_path)
+    env = dict(os.environ, **{CONFIRM_ENV: str(confirm_path)})
+    try:
+        process = _spawn(job.restart, env)
+        confirmed = _wait_for_confirm(process, confirm_path, SELF_REPLACE_CONFIG["confirm_timeout"])
+    except OSError as e:
+        logger.error("could not start the new version: %s", e)
+        confirmed = False
+    if confirmed:
+        _remove(confirm_path)
+        return 0
+
+    logger.error("new version exited before confirming its start, rolling back")
+    rollback(Path(job.target), Path(job.backup))
+    _spawn(job.restart)
+    return 3
+
+
+def main(argv: List[str]) -> int:
+    # entry point for `--apply-update <job>`
+    try:
+        job_path = Path(argv[argv.index(APPLY_FLAG) + 1])
+    except (ValueError, IndexError):
+        print(f"uso: {APPLY_FLAG} <trabajo.json>", file=sys.stderr)
+        return 1
+    # the helper has no console, its log goes next to the job
+    logging.basicConfig(
+        filename=str(job_path.with_suffix(".log")),
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    try:
+        return apply(UpdateJob.load(job_path))
+    except Exception:
+        logger.exception("update failed")
+        return 1
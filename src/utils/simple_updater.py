@@ -2,51 +2,69 @@
 from __future__ import annotations
 
 import json
+import logging
 import os
+import re
 import sys
-import shutil
-import tempfile
-import zipfile
-import subprocess
+import threading
+import time
 from typing import Optional
 import urllib.request
 import urllib.error
 
-from PyQt6.QtCore import QObject, pyqtSignal, QThread
+from PyQt6.QtCore import QObject, pyqtSignal, QThread, QTimer
 
+from utils.delta import DeltaError, apply_patch, patch_name
+from utils.download import DOWNLOAD_CONFIG, DownloadCancelled, DownloadError, download
+from utils import update_staging
+from utils.progress import ProgressThrottle
+from utils.update_archive import extract_selected
+from utils.update_state import UpdateState, release_summary, retry_after_seconds
 from utils.version import Version, CURRENT_VERSION, UPDATE_CONFIG
 
+logger = logging.getLogger(__name__)
+
 
 class UpdateInfo(object):
     # information about an available update
     
-    def __init__(self, version: Version, download_url: str, release_notes: str = ""):
+    def __init__(self, version: Version, download_url: str, release_notes: str = "",
+                 sha256: Optional[str] = None, patch_url: Optional[str] = None,
+                 patch_sha256: Optional[str] = None):
         self.version = version
         self.download_url = download_url
         self.release_notes = release_notes
+        # hex digest published with the release, None for older releases
+        self.sha256 = sha256
+        # delta patch from the running version, when the release has one
+        self.patch_url = patch_url
+        self.patch_sha256 = patch_sha256
 
 
 class SimpleUpdateChecker(QThread):
-    # simple background thread for checking updates when button is clicked
+    # background thread checking for updates, manually or quietly after startup
+    # release metadata is cached in UpdateState and revalidated with
+    # If-None-Match / If-Modified-Since; failures back off exponentially
     
     update_available = pyqtSignal(object)  # UpdateInfo
     no_update = pyqtSignal()
     check_failed = pyqtSignal(str)  # error message
     
+    def __init__(self, state: Optional[UpdateState] = None, quiet: bool = False, parent=None):
+        super().__init__(parent)
+        self.state = state or UpdateState()
+        self.quiet = quiet
+    
     def run(self):
         # check for updates in background thread
+        now = time.time()
         try:
-            # make request to github api
-            request = urllib.request.Request(
-                UPDATE_CONFIG["check_url"],
-                headers={'User-Agent': UPDATE_CONFIG["user_agent"]}
-            )
-            
-            with urllib.request.urlopen(request, timeout=10) as response:
-                data = json.loads(response.read().decode())
+            data = self._fetch_release(now)
+            if data is None:
+                return  # quiet check during backoff
             
             # parse release information
-            tag_name = data.get("tag_name", "").lstrip("v")
+            tag_name = (data.get("tag_name") or "").lstrip("v")
             if not tag_name:
                 self.no_update.emit()
                 return
@@ -54,14 +72,19 @@ class SimpleUpdateChecker(QThread):
             remote_version = Version.from_string(tag_name)
             
             if remote_version > CURRENT_VERSION:
-                # find download url for our platform
-                download_url = self._find_download_url(data.get("assets", []))
+                # find download for our platform
+                assets = data.get("assets", [])
+                asset = self._find_asset(assets)
                 
-                if download_url:
+                if asset:
+                    patch = self._find_patch(assets, remote_version)
                     update_info = UpdateInfo(
                         version=remote_version,
-                        download_url=download_url,
-                        release_notes=data.get("body", "")
+                        download_url=asset.get("browser_download_url"),
+                        release_notes=data.get("body") or "",
+                        sha256=self._find_sha256(asset, assets),
+                        patch_url=patch.get("browser_download_url") if patch else None,
+                        patch_sha256=self._find_sha256(patch, assets) if patch else None
                     )
                     self.update_available.emit(update_info)
                 else:
@@ -72,206 +95,234 @@ class SimpleUpdateChecker(QThread):
         except urllib.error.HTTPError as e:
             if e.code == 404:
                 # no releases found - this is normal for new repositories
+                self.state.record_not_modified(now)
                 self.no_update.emit()
             else:
+                self.state.record_failure(now, retry_after_seconds(e.headers, now))
                 self.check_failed.emit(f"HTTP error {e.code}: {str(e)}")
         except urllib.error.URLError as e:
+            self.state.record_failure(now)
             self.check_failed.emit(f"Error de red: {str(e)}")
         except json.JSONDecodeError:
+            self.state.record_failure(now)
             self.check_failed.emit("No hay respuesta del servidor")
         except ValueError as e:
             self.check_failed.emit(f"Error: {str(e)}")
         except Exception as e:
+            self.state.record_failure(now)
             self.check_failed.emit(f"Error inesperado: {str(e)}")
     
-    def _find_download_url(self, assets: list) -> Optional[str]:
-        # find appropriate download url for current platform
+    def _fetch_release(self, now: float) -> Optional[dict]:
+        # latest release metadata, from the cache while it is fresh or the
+        # server answers 304 Not Modified; None when a quiet check backs off
+        state = self.state
+        interval = UPDATE_CONFIG["quiet_check_interval" if self.quiet else "manual_check_interval"]
+        if state.release is not None and state.age(now) < interval:
+            return state.release
+        if self.quiet and state.backoff_remaining(now) > 0:
+            return None
+        
+        # make request to github api
+        request = urllib.request.Request(
+            UPDATE_CONFIG["check_url"],
+            headers={'User-Agent': UPDATE_CONFIG["user_agent"], **state.conditional_headers()}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                data = json.loads(response.read().decode())
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            # unchanged since the cached copy, nothing to download or parse
+            state.record_not_modified(now)
+            return state.release
+        
+        release = release_summary(data)
+        state.store_release(release, etag, last_modified, now)
+        return release
+    
+    def _find_asset(self, assets: list) -> Optional[dict]:
+        # find appropriate download for current platform
         # look for windows-compatible files
         for asset in assets:
             name = asset.get("name", "").lower()
             if name.endswith((".zip", ".exe")) and "windows" in name:
-                return asset.get("browser_download_url")
+                return asset
         
         # fallback: look for any zip file
         for asset in assets:
             name = asset.get("name", "").lower()
             if name.endswith(".zip"):
-                return asset.get("browser_download_url")
+                return asset
+        
+        return None
+    
+    def _find_patch(self, assets: list, remote_version: Version) -> Optional[dict]:
+        # delta patch from the running version straight to the new one
+        name = patch_name(CURRENT_VERSION, remote_version)
+        for asset in assets:
+            if asset.get("name") == name:
+                return asset
+        return None
+    
+    def _find_sha256(self, asset: dict, assets: list) -> Optional[str]:
+        # sha-256 of the download: the 'digest' github reports for the asset,
+        # or a '<asset name>.sha256' file published next to it
+        digest = asset.get("digest") or ""
+        if digest.startswith("sha256:"):
+            return digest.split(":", 1)[1].lower()
+        
+        checksum_name = asset.get("name", "") + ".sha256"
+        for candidate in assets:
+            if candidate.get("name") != checksum_name:
+                continue
+            try:
+                request = urllib.request.Request(
+                    candidate["browser_download_url"],
+                    headers={'User-Agent': UPDATE_CONFIG["user_agent"]}
+                )
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    # sha256sum format: '<hex digest>  <file name>'
+                    match = re.search(r"\b[0-9a-fA-F]{64}\b", response.read(4096).decode(errors="replace"))
+                return match.group(0).lower() if match else None
+            except (urllib.error.URLError, OSError) as e:
+                logger.warning("could not fetch %s: %s", checksum_name, e)
         
         return None
 
 
 class UpdateDownloader(QThread):
-    # simple background thread for downloading and installing updates
+    # background thread downloading an update into its staging folder and
+    # installing it; with install=False it only stages it (see update_staging)
+    # and runs at low priority while the app is in use
     
     download_progress = pyqtSignal(int, int)  # bytes_downloaded, total_bytes
+    download_rate = pyqtSignal(float, float)  # bytes per second, eta seconds (-1 if unknown)
+    patching_started = pyqtSignal()  # applying a delta patch
     extraction_started = pyqtSignal()  # extraction phase
+    update_staged = pyqtSignal(object)  # StagedUpdate, when not installing
     installation_started = pyqtSignal()  # installation phase
     update_completed = pyqtSignal()  # update installed
     download_failed = pyqtSignal(str)  # error message
     
-    def __init__(self, update_info: UpdateInfo, parent=None):
+    def __init__(self, update_info: UpdateInfo, install: bool = True, parent=None):
         super().__init__(parent)
         self.update_info = update_info
+        self.install = install
         self.download_path = None
+        # guards the switch from staging only to installing, see request_install
+        self._install_lock = threading.Lock()
+        self._install_decided = False
+    
+    def request_install(self) -> bool:
+        # install once staged; False if the thread is already past that point
+        with self._install_lock:
+            if self._install_decided:
+                return False
+            self.install = True
+            return True
     
     def run(self):
-        # download and install update file in background
+        # stage the update (unless an earlier run did) and install it
         try:
-            # step 1. download
-            temp_dir = tempfile.mkdtemp(prefix="integra_update_")
-            filename = f"integra_update_{self.update_info.version}.zip"
-            self.download_path = os.path.join(temp_dir, filename)
-            
-            # download with progress tracking
-            def progress_hook(block_num, block_size, total_size):
-                downloaded = min(block_num * block_size, total_size)
-                self.download_progress.emit(downloaded, total_size)
-            
-            urllib.request.urlretrieve(
-                self.update_info.download_url,
-                self.download_path,
-                progress_hook
-            )
-            
-            # step 2. extract
-            self.extraction_started.emit()
-            extract_dir = os.path.join(temp_dir, "extracted")
-            os.makedirs(extract_dir, exist_ok=True)
+            staged = update_staging.find(self.update_info.version) or self._stage()
             
-            with zipfile.ZipFile(self.download_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
+            with self._install_lock:
+                self._install_decided = True
+                install = self.install
+            if not install:
+                self.update_staged.emit(staged)
+                return
             
-            # step 3. install
             self.installation_started.emit()
-            self._install_update(extract_dir)
-            
+            self._install_update(staged)
             self.update_completed.emit()
                 
         except Exception as e:
             self.download_failed.emit(str(e))
     
-    def _install_update(self, extract_dir):
-        # install the update by replacing the current executable
+    def _stage(self) -> update_staging.StagedUpdate:
+        # step 1. a delta patch against the running executable if the release
+        # has one, otherwise (or when it fails) the full download
+        partial_dir = update_staging.begin(self.update_info.version)
+        new_exe_path = self._apply_delta(str(partial_dir)) or self._download_full(str(partial_dir))
+        staged = update_staging.commit(self.update_info.version, partial_dir, new_exe_path)
+        # the unpacked files are all the install needs
+        if self.download_path:
+            os.remove(self.download_path)
+        return staged
+    
+    def _download(self, url, path, sha256):
+        # resumable, verified download with throttled progress signals
+        # chunks arrive far faster than the dialog needs repainting
+        throttle = ProgressThrottle(self._emit_progress)
+        # a background download leaves the bandwidth to the user
+        connections = DOWNLOAD_CONFIG["connections" if self.install else "background_connections"]
+        download(url, path, expected_sha256=sha256, progress=throttle,
+                 cancelled=self.isInterruptionRequested, connections=connections)
+        throttle.finish()
+    
+    def _apply_delta(self, target_dir) -> Optional[str]:
+        # rebuild the new executable from the running one and a small patch;
+        # None when there is no patch or it cannot be used
+        info = self.update_info
+        if not info.patch_url or not getattr(sys, 'frozen', False):
+            return None
+        patch_path = os.path.join(DOWNLOAD_CONFIG["directory"], patch_name(CURRENT_VERSION, info.version))
         try:
-            # find the new executable in the extracted files
-            new_exe_path = None
-            for root, dirs, files in os.walk(extract_dir):
-                for file in files:
-                    if 'integra' in file.lower() and file.endswith('.exe'):
-                        new_exe_path = os.path.join(root, file)
-                        break
-                if new_exe_path:
-                    break
-            
-            if not new_exe_path:
-                raise Exception("No se ha encontrado el ejecutable")
-            
-            # get current executable path
-            if getattr(sys, 'frozen', False):
-                # running as PyInstaller executable
-                current_exe = sys.executable
-            else:
-                # running in development (not in prod)
-                raise Exception("No se puede actualizar desde desarrollo")
-            
-            # create backup of current executable
-            backup_path = current_exe + ".backup"
-            if os.path.exists(backup_path):
-                os.remove(backup_path)
-            shutil.copy2(current_exe, backup_path)
-            
-            # create a batch script to replace the executable and restart
-            batch_script = self._create_update_script(current_exe, new_exe_path, backup_path)
-            
-            # execute the batch script using os.system for better compatibility
-            # use START to run it in detached mode
-            os.system(f'start /min "" "{batch_script}"')
-            
-        except Exception as e:
-            raise Exception(f"Instalacion fallida: {str(e)}")
+            self._download(info.patch_url, patch_path, info.patch_sha256)
+            self.patching_started.emit()
+            # the patch checks the running executable and the rebuilt one by sha-256
+            new_exe_path = os.path.join(target_dir, os.path.basename(sys.executable))
+            apply_patch(sys.executable, patch_path, new_exe_path)
+            os.remove(patch_path)
+            return new_exe_path
+        except DownloadCancelled:
+            raise
+        except (DownloadError, DeltaError, OSError) as e:
+            logger.warning("delta update to %s failed, using the full download: %s", info.version, e)
+            if os.path.exists(patch_path):
+                os.remove(patch_path)
+            return None
     
-    def _create_update_script(self, current_exe, new_exe_path, backup_path):
-        # create a batch script to handle the file replacement and restart
-        script_dir = os.path.dirname(current_exe)
-        script_path = os.path.join(script_dir, "update_integra.bat")
+    def _download_full(self, staging_dir) -> str:
+        # download the release zip, resuming what an interrupted attempt left
+        # behind, and stream the installer's files out of it
+        filename = f"integra_update_{self.update_info.version}.zip"
+        self.download_path = os.path.join(DOWNLOAD_CONFIG["directory"], filename)
         
-        # use forward slashes converted to backslashes for Windows paths
-        current_exe_win = current_exe.replace('/', '\\')
-        new_exe_win = new_exe_path.replace('/', '\\')
-        backup_path_win = backup_path.replace('/', '\\')
-        script_dir_win = script_dir.replace('/', '\\')
+        if not self.update_info.sha256:
+            logger.warning("release %s publishes no sha-256, download is not verified", self.update_info.version)
         
-        script_content = f'''@echo off
-        title Integra Update
-        echo Updating Integra Client Manager...
-
-        cd /d "{script_dir_win}"
-
-        echo Waiting for application to close...
-        timeout /t 10 /nobreak > nul
-
-        taskkill /f /im "Integra Client Manager.exe" >nul 2>&1
-        timeout /t 3 /nobreak > nul
-
-        :: Wait for all DLLs and modules to be fully unloaded
-        echo Waiting for modules to unload...
-        timeout /t 5 /nobreak > nul        set RETRY_COUNT=0
-                :RETRY
-                set /a RETRY_COUNT+=1
-                echo Attempting to update executable (attempt %RETRY_COUNT%)...
-
-                if exist "{current_exe_win}" (
-                    del /f "{current_exe_win}" >nul 2>&1
-                )
-
-                copy /y "{new_exe_win}" "{current_exe_win}" >nul 2>&1
-
-        if errorlevel 1 (
-            if %RETRY_COUNT% LSS 20 (
-                echo Retrying in 5 seconds...
-                timeout /t 5 /nobreak > nul
-                goto RETRY
-            ) else (
-                echo Maximum retries reached. Restoring backup...
-                copy /y "{backup_path_win}" "{current_exe_win}" >nul 2>&1
-                echo Update failed after 20 attempts.
-                pause
-                exit /b 1
-            )
-        )        if not exist "{current_exe_win}" (
-                    echo Update failed, restoring backup...
-                    copy /y "{backup_path_win}" "{current_exe_win}" >nul 2>&1
-                    echo Update failed. Press any key to exit.
-                    pause
-                    exit /b 1
-                )
-
-                if exist "{backup_path_win}" del /f "{backup_path_win}" >nul 2>&1
-
-                echo Update completed successfully! Restarting application...
-                timeout /t 3 /nobreak > nul
-                
-                :: Start application and allow modules to load properly
-                echo Starting updated application...
-                start "" "{current_exe_win}"
-                
-                :: Wait longer before self-destruct to avoid DLL conflicts
-                timeout /t 5 /nobreak > nul
-                del /f "%~f0" >nul 2>&1
-                exit /b 0
-                '''
-        
-        with open(script_path, 'w') as f:
-            f.write(script_content)
+        self._download(self.update_info.download_url, self.download_path, self.update_info.sha256)
         
-        return script_path
+        self.extraction_started.emit()
+        return str(extract_selected(self.download_path, staging_dir).executable)
+    
+    def _emit_progress(self, progress):
+        # rate first, so the progress handler can show it
+        eta = progress.eta_seconds if progress.eta_seconds is not None else -1.0
+        self.download_rate.emit(progress.bytes_per_second, eta)
+        self.download_progress.emit(progress.done, progress.total)
+    
+    def _install_update(self, staged):
+        # hand the staged update to the self-replace helper, which swaps it in
+        # the moment this process exits and starts the new version
+        try:
+            update_staging.activate(staged, [sys.executable])
+        except Exception as e:
+            raise Exception(f"Instalacion fallida: {str(e)}")
 
 
 class SimpleUpdateManager(QObject):
-    # simplified update management system - only manual checks
+    # simplified update management system - manual checks and a quiet one
+    # after startup; available updates are staged in the background and
+    # installed on exit (see shutdown) or from the update dialog
     
     update_available = pyqtSignal(object)  # UpdateInfo
+    update_staged = pyqtSignal(object)  # UpdateInfo, ready to install
     no_update_available = pyqtSignal()
     update_check_failed = pyqtSignal(str)
     
@@ -279,43 +330,113 @@ class SimpleUpdateManager(QObject):
         super().__init__(parent)
         self.checker = None
         self.downloader = None
-        self.skipped_versions = set()  # track versions user chose to skip
+        self.state = UpdateState()
+        # track versions user chose to skip, kept across restarts in the state file
+        self.skipped_versions = set(self.state.skipped_versions)
+        # true while the running check is a background one with nothing to report
+        self._quiet = False
+        # update staged by a background download, installed on exit
+        self.staged = None
+    
+    def schedule_startup_check(self):
+        # quiet check shortly after startup, so it does not compete with loading
+        if UPDATE_CONFIG["startup_check"]:
+            QTimer.singleShot(UPDATE_CONFIG["startup_check_delay_ms"], lambda: self.check_for_update(quiet=True))
     
-    def check_for_update(self):
-        # check for updates manually when user clicks button
+    def check_for_update(self, quiet: bool = False):
+        # check for updates manually when user clicks button, or quietly:
+        # then only an available update is reported
         if self.checker and self.checker.isRunning():
+            if not quiet:
+                self._quiet = False  # report the running check to the user
             return  # already checking
         
-        self.checker = SimpleUpdateChecker()
+        self._quiet = quiet
+        self.checker = SimpleUpdateChecker(self.state, quiet)
         self.checker.update_available.connect(self._on_update_available)
         self.checker.no_update.connect(self._on_no_update)
         self.checker.check_failed.connect(self._on_check_failed)
         self.checker.start()
     
     def download_update(self, update_info: UpdateInfo):
-        # start downloading an update
-        if self.downloader and self.downloader.isRunning():
-            return None  # already downloading
+        # downloader installing an update; takes over a background download of
+        # the same version, which then carries on at normal priority
+        downloader = self.downloader
+        if downloader and downloader.isRunning():
+            if downloader.update_info.version != update_info.version:
+                return None  # already downloading
+            if downloader.request_install():
+                downloader.setPriority(QThread.Priority.NormalPriority)
+                self.staged = None
+                return downloader
+            downloader.wait()  # staged, only reporting it is left
         
+        # installed right away, not on exit
+        self.staged = None
         self.downloader = UpdateDownloader(update_info)
         return self.downloader
     
+    def shutdown(self):
+        # on exit: stop a background download (it resumes next time) and hand
+        # a staged update to the helper, which installs it once we are gone
+        downloader = self.downloader
+        if downloader and downloader.isRunning() and not downloader.install:
+            downloader.requestInterruption()
+            downloader.wait()
+        if self.staged is not None:
+            try:
+                update_staging.activate(self.staged, [])
+            except (OSError, RuntimeError) as e:
+                logger.warning("could not install update %s on exit: %s", self.staged.version, e)
+            self.staged = None
+    
+    def _stage_in_background(self, update_info: UpdateInfo):
+        # download and unpack the update at low priority while the app is used
+        if not UPDATE_CONFIG["background_download"] or not getattr(sys, 'frozen', False):
+            return
+        if self.downloader and self.downloader.isRunning():
+            return
+        if self.staged is not None and self.staged.version == update_info.version:
+            return
+        
+        self.downloader = UpdateDownloader(update_info, install=False)
+        self.downloader.update_staged.connect(self._on_update_staged)
+        self.downloader.download_failed.connect(self._on_background_failed)
+        self.downloader.start(QThread.Priority.LowestPriority)
+    
     def skip_version(self, version: Version):
         # mark a version as skipped so it won't be notified again
         self.skipped_versions.add(str(version))
+        self.state.skip_version(str(version))
     
     def _on_update_available(self, update_info):
         # handle when update is available
         # check if this version was skipped
         if str(update_info.version) not in self.skipped_versions:
             self.update_available.emit(update_info)
-        else:
+            self._stage_in_background(update_info)
+        elif not self._quiet:
             self.no_update_available.emit()
     
     def _on_no_update(self):
         # handle when no update is available
-        self.no_update_available.emit()
+        if not self._quiet:
+            self.no_update_available.emit()
     
     def _on_check_failed(self, error):
         # handle when update check fails
-        self.update_check_failed.emit(error)
\ No newline at end of file
+        if not self._quiet:
+            self.update_check_failed.emit(error)
+    
+    def _on_update_staged(self, staged):
+        # handle a finished background download
+        downloader = self.sender()
+        if downloader is not self.downloader or downloader.install:
+            return  # taken over by the update dialog
+        self.staged = staged
+        self.update_staged.emit(downloader.update_info)
+    
+    def _on_background_failed(self, error):
+        # the dialog downloads again (resuming) if the user asks for the update
+        if not self.sender().install:
+            logger.warning("background update download failed: %s", error)
@@ -0,0 +1,229 @@
+# request tracing across the ui, the controller's database thread and sql,
+# never imports PyQt6
+#
+# a ui action (search, save, delete, ...) starts a trace with its own
+# correlation id; spans opened while it runs, work handed to another thread
+# with bind() and the queries that work issues all carry that id. events are
+# kept in a bounded buffer and written as chrome trace-event json, which
+# chrome://tracing and ui.perfetto.dev open offline:
+#
+#     INTEGRA_TRACE=1 python integra.py     ->  data/logs/integra_trace.json
+#
+# work handed between threads is linked with flow events, so the viewer
+# draws an arrow from the click to the worker and back to the list refresh
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, NamedTuple, Optional
+
+# tracing configuration, enable with INTEGRA_TRACE=1
+TRACING_CONFIG = {
+    "enabled": os.environ.get("INTEGRA_TRACE", "0") == "1",
+    # newest events kept, older ones are dropped (about 150 bytes each)
+    "max_events": int(os.environ.get("INTEGRA_TRACE_MAX_EVENTS", "200000")),
+    # characters of sql kept per query event
+    "sql_chars": 300,
+}
+
+
+class TraceContext(NamedTuple):
+    trace_id: int  # correlation id shared by everything one action caused
+    span_id: int
+
+
+_current: contextvars.ContextVar[Optional[TraceContext]] = contextvars.ContextVar("integra_trace", default=None)
+_ids = itertools.count(1)
+_epoch = time.perf_counter()
+_started_at = datetime.now().isoformat(timespec="seconds")
+
+
+class _Recorder(object):
+    # bounded event buffer shared by every thread
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.events: Deque[dict] = deque(maxlen=TRACING_CONFIG["max_events"])
+        self.threads: Dict[int, str] = {}
+        self.dropped = 0
+
+    def add(self, event: dict) -> None:
+        tid = threading.get_ident()
+        event["pid"] = os.getpid()
+        event["tid"] = tid
+        with self._lock:
+            if tid not in self.threads:
+                self.threads[tid] = threading.current_thread().name
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+
+    def name_thread(self, name: str) -> None:
+        with self._lock:
+            self.threads[threading.get_ident()] = name
+
+    def snapshot(self) -> list:
+        with self._lock:
+            pid = os.getpid()
+            names = [
+                {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self.threads.items()
+            ]
+            return names + list(self.events)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.events.clear()
+            self.dropped = 0
+
+
+_recorder = _Recorder()
+
+
+def enabled() -> bool:
+    return TRACING_CONFIG["enabled"]
+
+
+def _us(seconds: float) -> float:
+    # perf_counter time to trace microseconds
+    return round((seconds - _epoch) * 1_000_000, 1)
+
+
+def current() -> Optional[TraceContext]:
+    return _current.get()
+
+
+def record(name: str, category: str, start: float, end: float, **args: object) -> None:
+    # a finished span measured elsewhere (perf_counter start and end), in the current trace
+    if not TRACING_CONFIG["enabled"]:
+        return
+    context = _current.get()
+    if context is not None:
+        args["trace"] = context.trace_id
+    _recorder.add({"name": name, "cat": category, "ph": "X", "ts": _us(start),
+                   "dur": round((end - start) * 1_000_000, 1), "args": args})
+
+
+@contextmanager
+def span(name: str, category: str = "app", **args: object) -> Iterator[None]:
+    # time a block as a child of the current span, or as a new trace
+    if not TRACING_CONFIG["enabled"]:
+        yield
+        return
+    parent = _current.get()
+    context = TraceContext(parent.trace_id if parent else next(_ids), next(_ids))
+    token = _current.set(context)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _current.reset(token)
+        args["trace"] = context.trace_id
+        _recorder.add({"name": name, "cat": category, "ph": "X", "ts": _us(start),
+                       "dur": round((end - start) * 1_000_000, 1), "args": args})
+
+
+@contextmanager
+def action(name: str, **args: object) -> Iterator[None]:
+    # a user action: always starts a trace with a new correlation id
+    if not TRACING_CONFIG["enabled"]:
+        yield
+        return
+    token = _current.set(None)
+    try:
+        with span(name, "ui", **args):
+            yield
+    finally:
+        _current.reset(token)
+
+
+def _flow(phase: str, flow_id: int, category: str) -> None:
+    event = {"name": "flow", "cat": category, "ph": phase, "id": flow_id, "ts": _us(time.perf_counter())}
+    if phase == "f":
+        event["bp"] = "e"  # binds to the span that encloses it
+    _recorder.add(event)
+
+
+def bind(func: Callable, name: str, category: str = "app") -> Callable:
+    # func to run later or on another thread, as a span in the current trace
+    if not TRACING_CONFIG["enabled"]:
+        return func
+    parent = _current.get()
+    flow_id = next(_ids) if parent is not None else None
+    if flow_id is not None:
+        _flow("s", flow_id, category)
+
+    @functools.wraps(func)
+    def traced(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            with span(name, category):
+                if flow_id is not None:
+                    _flow("f", flow_id, category)
+                return func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return traced
+
+
+def link() -> Optional[int]:
+    # start a flow from the current span to a later follow()
+    if not TRACING_CONFIG["enabled"] or _current.get() is None:
+        return None
+    flow_id = next(_ids)
+    _flow("s", flow_id, "app")
+    return flow_id
+
+
+def follow(flow_id: Optional[int]) -> None:
+    # end a flow started by link() in the current span
+    if flow_id is not None and TRACING_CONFIG["enabled"]:
+        _flow("f", flow_id, "app")
+
+
+def name_thread(name: str) -> None:
+    # name shown for the calling thread (e.g. a QThread's objectName)
+    if TRACING_CONFIG["enabled"]:
+        _recorder.name_thread(name)
+
+
+def short_sql(statement: str) -> str:
+    return " ".join(statement.split())[:TRACING_CONFIG["sql_chars"]]
+
+
+def trace_path() -> Path:
+    from models.database import DEFAULT_DB_PATH
+    return DEFAULT_DB_PATH.parent / "logs" / "integra_trace.json"
+
+
+def save(path: Optional[Path] = None) -> Optional[Path]:
+    # write the buffered events as chrome trace-event json; None when disabled
+    if not TRACING_CONFIG["enabled"]:
+        return None
+    path = Path(path) if path is not None else trace_path()
+    data = {
+        "traceEvents": _recorder.snapshot(),
+        "displayTimeUnit": "ms",
+        "otherData": {"started_at": _started_at, "dropped_events": _recorder.dropped},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_suffix(".tmp")
+    temp.write_text(json.dumps(data, separators=(",", ":"), default=str), encoding="utf-8")
+    os.replace(temp, path)
+    return path
+
+
+def reset() -> None:
+    _recorder.reset()
@@ -0,0 +1,150 @@
+# selective extraction of release zips for the installer, never imports PyQt6
+#
+# only the members the installer needs are decompressed, streamed straight
+# into the staging folder and verified; the rest of the archive is never
+# written to disk. a release lists those members in a manifest stored in the
+# zip (see tools/make_manifest.py):
+#
+#     {"executable": "Integra Client Manager/Integra Client Manager.exe",
+#      "files": {"Integra Client Manager/Integra Client Manager.exe": "<sha-256>"}}
+#
+# the installer replaces the executable and nothing else, so a manifest
+# listing other files is refused rather than installed in part. older
+# releases without a manifest fall back to the first 'integra*.exe' member,
+# checked against the crc stored in the zip
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, NamedTuple, Optional
+
+MANIFEST_NAME = "integra-manifest.json"
+_COPY_SIZE = 1024 * 1024
+
+
+class ArchiveError(Exception):
+    pass
+
+
+class Manifest(NamedTuple):
+    # member name of the executable the installer replaces
+    executable: str
+    # member name -> sha-256 (None when only the zip crc is checked), the
+    # executable only
+    files: Dict[str, Optional[str]]
+
+
+class ExtractResult(NamedTuple):
+    executable: Path
+    files: List[Path]
+    bytes_written: int
+
+
+def read_manifest(archive: zipfile.ZipFile) -> Manifest:
+    # the release manifest, or the legacy rule for archives without one
+    try:
+        data = json.loads(archive.read(MANIFEST_NAME).decode("utf-8"))
+    except KeyError:
+        return _legacy_manifest(archive)
+    except ValueError as e:
+        raise ArchiveError(f"Manifiesto de actualizacion no valido: {e}") from None
+    executable = data.get("executable")
+    files = dict(data.get("files") or {})
+    if not executable:
+        raise ArchiveError("El manifiesto no indica el ejecutable")
+    files.setdefault(executable, None)
+    extra = sorted(name for name in files if name != executable)
+    if extra:
+        raise ArchiveError(f"El manifiesto incluye archivos que el instalador no reemplaza: {', '.join(extra)}")
+    return Manifest(executable, files)
+
+
+def _legacy_manifest(archive: zipfile.ZipFile) -> Manifest:
+    for info in archive.infolist():
+        base = PurePosixPath(info.filename).name.lower()
+        if not info.is_dir() and "integra" in base and base.endswith(".exe"):
+            return Manifest(info.filename, {info.filename: None})
+    raise ArchiveError("No se ha encontrado el ejecutable")
+
+
+def _staging_path(staging_dir: Path, name: str) -> Path:
+    # member name to a path inside the staging folder, refusing anything
+    # that would land outside it
+    parts = PurePosixPath(name).parts
+    if not parts or PurePosixPath(name).is_absolute() or ".." in parts or ":" in parts[0]:
+        raise ArchiveError(f"Ruta no permitida en la actualizacion: {name}")
+    return staging_dir.joinpath(*parts)
+
+
+def extract_selected(zip_path: Path, staging_dir: Path) -> ExtractResult:
+    # stream the manifest's members into staging_dir, verifying each one;
+    # a member only appears under its final name once it is verified
+    staging_dir = Path(staging_dir)
+    extracted: List[Path] = []
+    written = 0
+    # opening the zip reads only the central directory at the end of the file
+    with zipfile.ZipFile(zip_path) as archive:
+        manifest = read_manifest(archive)
+        for name, expected in manifest.files.items():
+            try:
+                info = archive.getinfo(name)
+            except KeyError:
+                raise ArchiveError(f"Falta {name} en la actualizacion") from None
+            target = _staging_path(staging_dir, name)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            temp = target.with_name(target.name + ".tmp")
+            digest = hashlib.sha256()
+            try:
+                # zipfile checks the member's crc when the stream reaches its end
+                with archive.open(info) as source, open(temp, "wb") as out:
+                    for block in iter(lambda: source.read(_COPY_SIZE), b""):
+                        out.write(block)
+                        digest.update(block)
+            except (zipfile.BadZipFile, OSError) as e:
+                temp.unlink(missing_ok=True)
+                raise ArchiveError(f"{name} esta danado: {e}") from None
+            if expected and digest.hexdigest() != expected.lower():
+                temp.unlink(missing_ok=True)
+                raise ArchiveError(f"La suma SHA-256 de {name} no coincide")
+            os.replace(temp, target)
+            extracted.append(target)
+            written += info.file_size
+    return ExtractResult(_staging_path(staging_dir, manifest.executable), extracted, written)
+
+
+def write_manifest(zip_path: Path, executable: Optional[str] = None) -> Manifest:
+    # add a manifest for the executable to a release zip (replacing an old one)
+    with zipfile.ZipFile(zip_path) as archive:
+        names = [info.filename for info in archive.infolist() if info.filename != MANIFEST_NAME]
+        executable = executable or _legacy_manifest(archive).executable
+        if executable not in names:
+            raise ArchiveError(f"Falta {executable} en {zip_path}")
+        digest = hashlib.sha256()
+        with archive.open(executable) as member:
+            for block in iter(lambda: member.read(_COPY_SIZE), b""):
+                digest.update(block)
+        has_manifest = MANIFEST_NAME in archive.namelist()
+    manifest = Manifest(executable, {executable: digest.hexdigest()})
+    data = json.dumps(manifest._asdict(), indent=2, ensure_ascii=False)
+    if has_manifest:
+        _rewrite_without(zip_path, MANIFEST_NAME)
+    with zipfile.ZipFile(zip_path, "a", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(MANIFEST_NAME, data)
+    return manifest
+
+
+def _rewrite_without(zip_path: Path, name: str) -> None:
+    # zip files cannot drop a member in place, copy the others to a new file
+    zip_path = Path(zip_path)
+    temp = zip_path.with_name(zip_path.name + ".tmp")
+    with zipfile.ZipFile(zip_path) as source, zipfile.ZipFile(temp, "w") as target:
+        for info in source.infolist():
+            if info.filename != name:
+                with source.open(info) as member, target.open(info, "w") as out:
+                    for block in iter(lambda: member.read(_COPY_SIZE), b""):
+                        out.write(block)
+    os.replace(temp, zip_path)
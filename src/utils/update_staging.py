@@ -0,0 +1,171 @@
+# versioned staging of downloaded updates, never imports PyQt6
+#
+# an update is downloaded, verified and unpacked into staged/<version> while
+# the app is in use. it is unpacked under '<version>.partial' and renamed when
+# complete, so a version folder always holds a whole update:
+#
+#     staged/1.0.11/staged.json    {"version": "1.0.11", "executable": "<path in the folder>"}
+#     staged/1.0.11/...            the files of the release
+#
+# a staged update is handed to the self-replace helper when the app exits, or
+# at the next launch if that did not happen. an activation leaves an
+# 'activating' marker with the time and the pid of the app that exits; if the
+# version is still not installed once that app is gone and the helper has had
+# time to finish, the folder is dropped instead of retried forever
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from utils import self_replace
+from utils.download import DOWNLOAD_CONFIG
+from utils.version import CURRENT_VERSION, Version
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = Path(DOWNLOAD_CONFIG["directory"]) / "staged"
+# job, lock and log files of the self-replace helper
+INSTALL_DIR = Path(DOWNLOAD_CONFIG["directory"]) / "install"
+
+_INFO_NAME = "staged.json"
+_ATTEMPT_NAME = "activating"
+_PARTIAL_SUFFIX = ".partial"
+
+
+class StagedUpdate(NamedTuple):
+    version: Version
+    path: Path
+    executable: Path
+
+
+def begin(version: Version) -> Path:
+    # empty folder to unpack an update into, passed to commit() when complete
+    partial = STAGING_DIR / f"{version}{_PARTIAL_SUFFIX}"
+    if partial.exists():
+        shutil.rmtree(partial)
+    partial.mkdir(parents=True)
+    return partial
+
+
+def commit(version: Version, partial: Path, executable: Path) -> StagedUpdate:
+    # give a completely unpacked update its final name
+    partial = Path(partial)
+    relative = Path(executable).resolve().relative_to(partial.resolve())
+    info = {"version": str(version), "executable": relative.as_posix()}
+    (partial / _INFO_NAME).write_text(json.dumps(info, indent=2), encoding="utf-8")
+    final = STAGING_DIR / str(version)
+    if final.exists():
+        shutil.rmtree(final)
+    os.replace(partial, final)
+    return StagedUpdate(version, final, final / relative)
+
+
+def find(version: Version) -> Optional[StagedUpdate]:
+    # the complete staged update for version, if there is one
+    path = STAGING_DIR / str(version)
+    try:
+        info = json.loads((path / _INFO_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    executable = path / info.get("executable", "")
+    if not executable.is_file():
+        return None
+    return StagedUpdate(version, path, executable)
+
+
+def _staged_versions() -> List[Version]:
+    versions = []
+    if STAGING_DIR.is_dir():
+        for entry in STAGING_DIR.iterdir():
+            try:
+                versions.append(Version.from_string(entry.name))
+            except ValueError:
+                continue  # partial folders and stray files
+    return versions
+
+
+def _attempt(path: Path) -> Optional[Tuple[float, int]]:
+    # seconds since the staged update was handed to the helper and the pid of
+    # the app it waits for, None if never
+    try:
+        at, pid = (path / _ATTEMPT_NAME).read_text(encoding="utf-8").split()
+        return time.time() - float(at), int(pid)
+    except (OSError, ValueError):
+        return None
+
+
+def _attempt_failed(path: Path) -> bool:
+    # the helper waits while the app runs, then gives up after exit_timeout
+    # and confirm_timeout
+    attempt = _attempt(path)
+    if attempt is None:
+        return False
+    age, pid = attempt
+    limit = self_replace.SELF_REPLACE_CONFIG["exit_timeout"] + self_replace.SELF_REPLACE_CONFIG["confirm_timeout"]
+    # a recorded pid that is now this process was reused, that app is gone
+    return age > limit and (pid == os.getpid() or not self_replace.process_alive(pid))
+
+
+def prune(current: Version = CURRENT_VERSION) -> None:
+    # drop installed, older and failed updates and unfinished unpacking
+    if not STAGING_DIR.is_dir():
+        return
+    for entry in STAGING_DIR.iterdir():
+        try:
+            version = Version.from_string(entry.name)
+        except ValueError:
+            version = None
+        if version is not None and version > current and not _attempt_failed(entry):
+            continue
+        if version is not None and version > current:
+            logger.warning("staged update %s was not installed, discarding it", version)
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            entry.unlink(missing_ok=True)
+
+
+def pending(current: Version = CURRENT_VERSION) -> Optional[StagedUpdate]:
+    # newest complete update above current that is not being installed already
+    for version in sorted(_staged_versions(), reverse=True):
+        if not version > current:
+            break
+        staged = find(version)
+        if staged is not None and _attempt(staged.path) is None:
+            return staged
+    return None
+
+
+def activate(staged: StagedUpdate, restart: List[str]) -> Path:
+    # hand the staged update to the helper, which installs it once this
+    # process exits and then runs restart (nothing if empty); returns the job
+    if not getattr(sys, "frozen", False):
+        raise RuntimeError("No se puede actualizar desde desarrollo")
+    (staged.path / _ATTEMPT_NAME).write_text(f"{time.time()!r} {os.getpid()}", encoding="utf-8")
+    job_path = self_replace.prepare(staged.executable, Path(sys.executable), restart, INSTALL_DIR)
+    self_replace.launch_helper(job_path)
+    return job_path
+
+
+def activate_pending(argv: List[str]) -> bool:
+    # at launch: install an update staged by an earlier run that did not get
+    # to install it on exit; true when this process should exit right away
+    if not getattr(sys, "frozen", False):
+        return False
+    try:
+        prune()
+        staged = pending()
+        if staged is None:
+            return False
+        activate(staged, [sys.executable] + list(argv[1:]))
+    except (OSError, RuntimeError) as e:
+        logger.warning("could not install the staged update: %s", e)
+        return False
+    return True
@@ -0,0 +1,121 @@
+# update checker state kept in the data folder: the last release metadata with
+# its ETag / Last-Modified validators, failure backoff and skipped versions
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from utils.version import UPDATE_CONFIG
+
+# the parts of a github release the checker uses; the rest is not cached
+_RELEASE_KEYS = ("tag_name", "body")
+_ASSET_KEYS = ("name", "browser_download_url", "digest")
+
+
+def release_summary(data: dict) -> dict:
+    summary = {key: data.get(key) for key in _RELEASE_KEYS}
+    summary["assets"] = [{key: asset.get(key) for key in _ASSET_KEYS} for asset in data.get("assets", [])]
+    return summary
+
+
+class UpdateState(object):
+    # shared by the checker thread and the gui thread, every change is saved
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        if path is None:
+            from models.database import DEFAULT_DB_PATH
+            path = DEFAULT_DB_PATH.parent / "update_state.json"
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self) -> dict:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_suffix(".tmp")
+        temp.write_text(json.dumps(self._data, indent=2, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(temp, self.path)
+
+    @property
+    def release(self) -> Optional[dict]:
+        return self._data.get("release")
+
+    def age(self, now: float) -> float:
+        # seconds since the cached release was last confirmed by the server
+        return now - self._data.get("checked_at", float("-inf"))
+
+    def conditional_headers(self) -> dict:
+        # validators are only sent when there is a cached body to fall back on
+        if self.release is None:
+            return {}
+        headers = {}
+        if self._data.get("etag"):
+            headers["If-None-Match"] = self._data["etag"]
+        if self._data.get("last_modified"):
+            headers["If-Modified-Since"] = self._data["last_modified"]
+        return headers
+
+    def store_release(self, release: dict, etag: Optional[str], last_modified: Optional[str], now: float) -> None:
+        with self._lock:
+            self._data.update(release=release, etag=etag, last_modified=last_modified, checked_at=now)
+            self._clear_failures()
+            self._save()
+
+    def record_not_modified(self, now: float) -> None:
+        with self._lock:
+            self._data["checked_at"] = now
+            self._clear_failures()
+            self._save()
+
+    def record_failure(self, now: float, retry_after: Optional[float] = None) -> float:
+        # exponential backoff, or what the server asked for; returns the delay
+        with self._lock:
+            failures = self._data.get("failures", 0) + 1
+            delay = min(UPDATE_CONFIG["backoff_base"] * 2 ** (failures - 1), UPDATE_CONFIG["backoff_max"])
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            self._data.update(failures=failures, retry_at=now + delay)
+            self._save()
+            return delay
+
+    def _clear_failures(self) -> None:
+        self._data.pop("failures", None)
+        self._data.pop("retry_at", None)
+
+    def backoff_remaining(self, now: float) -> float:
+        return max(self._data.get("retry_at", 0.0) - now, 0.0)
+
+    @property
+    def skipped_versions(self) -> List[str]:
+        return list(self._data.get("skipped_versions", []))
+
+    def skip_version(self, version: str) -> None:
+        with self._lock:
+            skipped = self._data.setdefault("skipped_versions", [])
+            if version not in skipped:
+                skipped.append(version)
+                self._save()
+
+
+def retry_after_seconds(headers, now: Optional[float] = None) -> Optional[float]:
+    # delay asked for by a rate limited response (Retry-After or github's reset time)
+    if headers is None:
+        return None
+    value = headers.get("Retry-After")
+    if value and value.isdigit():
+        return float(value)
+    reset = headers.get("X-RateLimit-Reset")
+    if reset and reset.isdigit() and headers.get("X-RateLimit-Remaining") == "0":
+        return max(float(reset) - (now if now is not None else time.time()), 0.0)
+    return None
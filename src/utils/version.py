@@ -1,6 +1,7 @@
 # application version management
 from __future__ import annotations
 
+import os
 import re
 from typing import NamedTuple
 
@@ -45,5 +46,18 @@ UPDATE_CONFIG = {
     "check_url": "https://api.github.com/repos/chaseG20gam/Integra-App/releases/latest",
     "download_base_url": "https://github.com/chaseG20gam/Integra-App/releases/download/",
     "user_agent": f"Integra-Client-Manager/{CURRENT_VERSION}",
-    "test_mode": False  # set to false when you have actual releases
+    "test_mode": False,  # set to false when you have actual releases
+    # quiet check in the background shortly after startup (0 disables it)
+    "startup_check": os.environ.get("INTEGRA_UPDATE_CHECK", "1") != "0",
+    "startup_check_delay_ms": 10_000,
+    # download and unpack available updates in the background, installed on
+    # exit or at the next launch (0 leaves everything to the update dialog)
+    "background_download": os.environ.get("INTEGRA_UPDATE_BACKGROUND", "1") != "0",
+    # cached release metadata is reused without a request for this long,
+    # for manual checks and for the startup check
+    "manual_check_interval": 60,
+    "quiet_check_interval": 12 * 3600,
+    # failed checks wait backoff_base * 2^(failures - 1) seconds, up to backoff_max
+    "backoff_base": 60,
+    "backoff_max": 6 * 3600,
 }
\ No newline at end of file
@@ -0,0 +1,179 @@
+# ui thread stall watchdog
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PyQt6.QtCore import QObject, pyqtSignal as Signal
+
+# watchdog configuration, enable with INTEGRA_WATCHDOG=1
+WATCHDOG_CONFIG = {
+    "enabled": os.environ.get("INTEGRA_WATCHDOG", "0") == "1",
+    "threshold_ms": float(os.environ.get("INTEGRA_WATCHDOG_THRESHOLD_MS", "250")),
+    "ping_interval_ms": 100.0,
+    "log_max_bytes": 1024 * 1024,
+    "log_backups": 3,
+}
+
+# upper bounds (ms) of the stall duration histogram buckets
+HISTOGRAM_BUCKETS_MS = (250, 500, 1000, 2000, 5000, 10000)
+
+logger = logging.getLogger("integra.watchdog")
+
+
+def _log_path() -> Path:
+    from models.database import DEFAULT_DB_PATH
+    return DEFAULT_DB_PATH.parent / "logs" / "ui_stalls.log"
+
+
+class StallWatchdog(QObject):
+    # pings the gui event loop from a background thread and records late replies
+
+    _ping = Signal(int)
+
+    def __init__(self, threshold_ms: Optional[float] = None,
+                 ping_interval_ms: Optional[float] = None,
+                 parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.threshold = (threshold_ms or WATCHDOG_CONFIG["threshold_ms"]) / 1000.0
+        self.ping_interval = (ping_interval_ms or WATCHDOG_CONFIG["ping_interval_ms"]) / 1000.0
+
+        # created in the gui thread, so the queued ping is answered by its event loop
+        self._gui_thread_id = threading.get_ident()
+        self._ping.connect(self._pong)
+
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._sent_at = 0.0
+        self._answered = True
+        self._stack: Optional[List[str]] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stall_count = 0
+        self.longest_stall_ms = 0.0
+        self.histogram: Dict[str, int] = {self._bucket_label(i): 0 for i in range(len(HISTOGRAM_BUCKETS_MS) + 1)}
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="integra-ui-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self.stall_count:
+            logger.info("resumen de bloqueos: %d, maximo %.0f ms, histograma %s",
+                        self.stall_count, self.longest_stall_ms, self.histogram)
+
+    def snapshot(self) -> dict:
+        # counters for diagnostics
+        with self._lock:
+            return {
+                "stalls": self.stall_count,
+                "longest_ms": self.longest_stall_ms,
+                "threshold_ms": self.threshold * 1000.0,
+                "histogram": dict(self.histogram),
+            }
+
+    def _run(self) -> None:
+        # watcher thread: send a ping, then check it comes back in time
+        while not self._stop_event.is_set():
+            with self._lock:
+                if self._answered:
+                    self._sequence += 1
+                    self._sent_at = time.monotonic()
+                    self._answered = False
+                    self._stack = None
+                    sequence = self._sequence
+                else:
+                    sequence = None
+                    late = time.monotonic() - self._sent_at > self.threshold
+                    if late and self._stack is None:
+                        self._stack = self._capture_gui_stack()
+            if sequence is not None:
+                self._ping.emit(sequence)
+            self._stop_event.wait(self.ping_interval)
+
+    def _capture_gui_stack(self) -> List[str]:
+        # python stack of the gui thread while it is blocked
+        frame = sys._current_frames().get(self._gui_thread_id)
+        if frame is None:
+            return []
+        return traceback.format_stack(frame)
+
+    def _pong(self, sequence: int) -> None:
+        # runs in the gui thread once the event loop gets to the ping
+        with self._lock:
+            if sequence != self._sequence:
+                return
+            delay = time.monotonic() - self._sent_at
+            self._answered = True
+            stack = self._stack
+        if delay > self.threshold:
+            self._record_stall(delay * 1000.0, stack)
+
+    def _record_stall(self, duration_ms: float, stack: Optional[List[str]]) -> None:
+        with self._lock:
+            self.stall_count += 1
+            self.longest_stall_ms = max(self.longest_stall_ms, duration_ms)
+            label = self._bucket_label(bisect_left(HISTOGRAM_BUCKETS_MS, duration_ms))
+            self.histogram[label] += 1
+        logger.warning("ui bloqueada %.0f ms (bloqueo #%d)\n%s", duration_ms, self.stall_count,
+                       "".join(stack) if stack else "  (sin pila capturada)")
+
+    @staticmethod
+    def _bucket_label(index: int) -> str:
+        if index >= len(HISTOGRAM_BUCKETS_MS):
+            return f">{HISTOGRAM_BUCKETS_MS[-1]}ms"
+        return f"<={HISTOGRAM_BUCKETS_MS[index]}ms"
+
+
+_watchdog: Optional[StallWatchdog] = None
+
+
+def install(force: bool = False) -> Optional[StallWatchdog]:
+    # start the watchdog when enabled, writing stall reports to a rotating log
+    global _watchdog
+    if _watchdog is not None:
+        return _watchdog
+    if not (force or WATCHDOG_CONFIG["enabled"]):
+        return None
+
+    try:
+        path = _log_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=WATCHDOG_CONFIG["log_max_bytes"],
+                                      backupCount=WATCHDOG_CONFIG["log_backups"], encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    except OSError:
+        pass  # still keep in-memory counters
+
+    _watchdog = StallWatchdog()
+    _watchdog.start()
+    return _watchdog
+
+
+def get_watchdog() -> Optional[StallWatchdog]:
+    return _watchdog
+
+
+def uninstall() -> None:
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None
@@ -0,0 +1,168 @@
+# compile src/integra.qrc into the src/resources_rc.py resource module
+#
+# PyQt6 no longer ships pyrcc, so this writes the rcc binary format directly
+# and embeds it in a python module that registers it with QResource on
+# import. run before pyinstaller (integra.spec does it automatically):
+#
+#     python tools/build_resources.py
+
+from __future__ import annotations
+
+import argparse
+import struct
+import sys
+import xml.etree.ElementTree as ET
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+DEFAULT_QRC = SRC_DIR / "integra.qrc"
+DEFAULT_OUTPUT = SRC_DIR / "resources_rc.py"
+
+# rcc format constants
+FORMAT_VERSION = 1
+FLAG_COMPRESSED = 0x01
+FLAG_DIRECTORY = 0x02
+LANGUAGE_C = 1
+TERRITORY_ANY = 0
+# only keep zlib output when it saves at least this much
+COMPRESS_RATIO = 0.7
+
+
+def qt_hash(name: str) -> int:
+    # same hash qresource uses for its binary child lookup
+    h = 0
+    for (unit,) in struct.iter_unpack(">H", name.encode("utf-16-be")):
+        h = ((h << 4) + unit) & 0xFFFFFFFF
+        h ^= (h & 0xF0000000) >> 23
+        h &= 0x0FFFFFFF
+    return h
+
+
+class _Node(object):
+    # file or directory entry of the resource tree
+
+    def __init__(self, name: str, source: Optional[Path] = None):
+        self.name = name
+        self.source = source
+        self.children: Dict[str, _Node] = {}
+        self.name_offset = 0
+        self.data_offset = 0
+        self.child_offset = 0
+        self.flags = 0 if source else FLAG_DIRECTORY
+
+    def sorted_children(self) -> List['_Node']:
+        return sorted(self.children.values(), key=lambda child: qt_hash(child.name))
+
+
+def parse_qrc(qrc_path: Path) -> _Node:
+    # build the resource tree from a .qrc file
+    root = _Node("")
+    base = qrc_path.parent
+    for resource in ET.parse(qrc_path).getroot().iter("qresource"):
+        prefix = [part for part in resource.get("prefix", "/").split("/") if part]
+        for entry in resource.iter("file"):
+            alias = entry.get("alias") or entry.text.strip()
+            parts = prefix + [part for part in alias.split("/") if part]
+            node = root
+            for part in parts[:-1]:
+                node = node.children.setdefault(part, _Node(part))
+            node.children[parts[-1]] = _Node(parts[-1], base / entry.text.strip())
+    return root
+
+
+def compile_rcc(root: _Node) -> bytes:
+    # serialize the tree using the rcc binary layout (header, data, names, tree)
+    # breadth-first order keeps every directory's children contiguous
+    ordered = [root]
+    index = 0
+    while index < len(ordered):
+        node = ordered[index]
+        if node.flags & FLAG_DIRECTORY:
+            node.child_offset = len(ordered)
+            ordered.extend(node.sorted_children())
+        index += 1
+
+    data = bytearray()
+    for node in ordered:
+        if node.flags & FLAG_DIRECTORY:
+            continue
+        payload = node.source.read_bytes()
+        compressed = zlib.compress(payload, 9)
+        if len(compressed) + 4 <= len(payload) * COMPRESS_RATIO:
+            # qUncompress layout: big endian original size then zlib stream
+            payload = struct.pack(">I", len(payload)) + compressed
+            node.flags |= FLAG_COMPRESSED
+        node.data_offset = len(data)
+        data += struct.pack(">I", len(payload)) + payload
+
+    names = bytearray()
+    name_offsets: Dict[str, int] = {}
+    for node in ordered[1:]:
+        if node.name not in name_offsets:
+            name_offsets[node.name] = len(names)
+            encoded = node.name.encode("utf-16-be")
+            names += struct.pack(">HI", len(node.name), qt_hash(node.name)) + encoded
+        node.name_offset = name_offsets[node.name]
+
+    tree = bytearray()
+    for node in ordered:
+        if node.flags & FLAG_DIRECTORY:
+            tree += struct.pack(">IHII", node.name_offset, node.flags,
+                                len(node.children), node.child_offset)
+        else:
+            tree += struct.pack(">IHHHI", node.name_offset, node.flags,
+                                TERRITORY_ANY, LANGUAGE_C, node.data_offset)
+
+    header_size = 20
+    data_offset = header_size
+    names_offset = data_offset + len(data)
+    tree_offset = names_offset + len(names)
+    header = b"qres" + struct.pack(">IIII", FORMAT_VERSION, tree_offset, data_offset, names_offset)
+    return header + bytes(data) + bytes(names) + bytes(tree)
+
+
+def write_module(rcc_data: bytes, output: Path) -> None:
+    # embed the compiled bundle in an importable python module
+    lines = [
+        "# generated by tools/build_resources.py from src/integra.qrc - do not edit",
+        "from PyQt6.QtCore import QResource",
+        "",
+        "qt_resource_data = (",
+    ]
+    for start in range(0, len(rcc_data), 64):
+        lines.append(f"    {rcc_data[start:start + 64]!r}")
+    lines += [
+        ")",
+        "",
+        "",
+        "def qInitResources() -> bool:",
+        "    # qt keeps a pointer to the buffer, so it must live as long as the module",
+        "    return QResource.registerResourceData(qt_resource_data)",
+        "",
+        "",
+        "def qCleanupResources() -> bool:",
+        "    return QResource.unregisterResourceData(qt_resource_data)",
+        "",
+        "",
+        "qInitResources()",
+        "",
+    ]
+    output.write_text("\n".join(lines), encoding="utf-8")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compila los recursos Qt de Integra")
+    parser.add_argument("qrc", nargs="?", type=Path, default=DEFAULT_QRC)
+    parser.add_argument("-o", "--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    rcc_data = compile_rcc(parse_qrc(args.qrc))
+    write_module(rcc_data, args.output)
+    print(f"{args.output} ({len(rcc_data) / 1024:.1f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# add the installer manifest to a release zip before publishing it
+#
+#     python tools/make_manifest.py dist/integra-windows.zip
+#     python tools/make_manifest.py dist/integra-windows.zip --executable "Integra Client Manager/Integra Client Manager.exe"
+#
+# the updater then streams only the listed members out of the zip and checks
+# their sha-256 (see src/utils/update_archive.py)
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from utils.update_archive import ArchiveError, write_manifest  # noqa: E402
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Añadir el manifiesto del instalador a un zip de version")
+    parser.add_argument("zip", type=Path)
+    parser.add_argument("--executable", help="ruta del ejecutable dentro del zip (por defecto el primer integra*.exe)")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = write_manifest(args.zip, args.executable)
+    except ArchiveError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for name, digest in manifest.files.items():
+        print(f"{digest}  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
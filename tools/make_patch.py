@@ -0,0 +1,71 @@
+# build a delta patch between two releases for the updater
+#
+#     python tools/make_patch.py dist/1.0.9.zip dist/1.0.10.zip --from 1.0.9 --to 1.0.10
+#
+# accepts the executables or the release zips (the executable inside is used)
+# and writes patch-<from>-<to>.delta, to be published as an asset of the new
+# release next to the full download
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import List, Optional
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+from utils.delta import DEFAULT_BLOCK_SIZE, apply_patch, make_patch, patch_name  # noqa: E402
+
+
+def _executable(path: Path, workdir: Path) -> Path:
+    # the path itself, or the integra executable inside a release zip
+    if not zipfile.is_zipfile(path):
+        return path
+    with zipfile.ZipFile(path) as archive:
+        for name in archive.namelist():
+            base = name.rsplit("/", 1)[-1].lower()
+            if "integra" in base and base.endswith(".exe"):
+                target = workdir / f"{path.stem}.exe"
+                with archive.open(name) as member, open(target, "wb") as out:
+                    shutil.copyfileobj(member, out)
+                return target
+    raise SystemExit(f"{path} no contiene el ejecutable de Integra")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Crear un parche delta entre dos versiones")
+    parser.add_argument("old", type=Path, help="ejecutable o zip de la version anterior")
+    parser.add_argument("new", type=Path, help="ejecutable o zip de la nueva version")
+    parser.add_argument("--from", dest="source_version", required=True, help="version anterior, p. ej. 1.0.9")
+    parser.add_argument("--to", dest="target_version", required=True, help="nueva version, p. ej. 1.0.10")
+    parser.add_argument("-o", "--output-dir", type=Path, default=Path("dist"))
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args(argv)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    output = args.output_dir / patch_name(args.source_version, args.target_version)
+    with tempfile.TemporaryDirectory(prefix="integra_patch_") as temp:
+        workdir = Path(temp)
+        old = _executable(args.old, workdir)
+        new = _executable(args.new, workdir)
+        stats = make_patch(old, new, output, block_size=args.block_size)
+
+        # the patch is only published if it reproduces the new build exactly
+        apply_patch(old, output, workdir / "check.exe")
+
+    size = stats.info.target_size
+    print(f"parche:           {output}")
+    print(f"nueva version:    {size / 1_048_576:8.2f} MB")
+    print(f"parche:           {stats.patch_bytes / 1_048_576:8.2f} MB ({stats.patch_bytes / size:.1%})")
+    print(f"bytes copiados:   {stats.copied_bytes}")
+    print(f"bytes nuevos:     {stats.literal_bytes}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())